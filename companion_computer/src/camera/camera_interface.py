@@ -167,43 +167,48 @@ class CameraInterface:
         
         logger.info("OpenCV camera started (fallback mode)")
     
-    def read_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+    def read_frame(self, into: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], int]:
         """
         Đọc frame từ camera và trả về kèm timestamp
+        Args:
+            into: Buffer (H, W, 3) uint8 cấp phát sẵn để ghi frame vào (tránh
+                cấp phát mới mỗi frame). Nếu None hoặc sai kích thước, OpenCV
+                sẽ tự cấp phát buffer mới.
         Returns:
-            (frame, timestamp) hoặc None nếu lỗi
+            (frame, timestamp_ns) - frame là None nếu lỗi. timestamp_ns (int) lấy từ
+            time.monotonic_ns() (không nhảy khi NTP chỉnh giờ)
         """
+        timestamp = time.monotonic_ns()
         if not self.is_running:
             logger.warning("Camera not running")
-            return None
+            return None, timestamp
         try:
-            timestamp = time.time()
             if self.camera == "MOCK":
                 width = self.config.get('width', 640)
                 height = self.config.get('height', 480)
                 frame = np.zeros((height, width, 3), dtype=np.uint8)
                 noise = np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)
-                frame = cv2.addWeighted(frame, 0.7, noise, 0.3, 0)
+                frame = cv2.addWeighted(frame, 0.7, noise, 0.3, 0, dst=into)
                 cv2.putText(frame, f"MOCK CAMERA {self.frame_count}", (50, 50), 
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
                 import time as _t
                 _t.sleep(1.0 / self.config.get('fps', 30))
             elif PICAMERA_AVAILABLE and isinstance(self.camera, Picamera2):
                 frame = self.camera.capture_array()
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=into)
             else:
-                ret, frame = self.camera.read()
+                ret, frame = self.camera.read(into)
                 if not ret:
                     if self.frame_count % 30 == 0:
                         logger.error("Failed to read frame from OpenCV source")
-                    return None
+                    return None, timestamp
             if self.camera != "MOCK":
                 frame = self._apply_transformations(frame)
             self.frame_count += 1
-            return (frame, timestamp)
+            return frame, timestamp
         except Exception as e:
             logger.error(f"Error reading frame: {e}")
-            return None
+            return None, timestamp
     
     def _apply_transformations(self, frame: np.ndarray) -> np.ndarray:
         """Áp dụng flip và rotation"""
@@ -228,12 +233,25 @@ class CameraInterface:
         Lấy kích thước frame
         
         Returns:
-            (width, height)
+            (width, height) của frame do read_frame() trả về (đã tính rotation)
         """
-        return (
-            self.config['resolution']['width'],
-            self.config['resolution']['height']
-        )
+        if self.camera == "MOCK":
+            return (self.config.get('width', 640), self.config.get('height', 480))
+        
+        width = self.config['resolution']['width']
+        height = self.config['resolution']['height']
+        
+        # VideoCapture (OpenCV / IP Webcam) có thể không dùng đúng resolution đã set
+        if isinstance(self.camera, cv2.VideoCapture):
+            actual_width = int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))
+            actual_height = int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if actual_width > 0 and actual_height > 0:
+                width, height = actual_width, actual_height
+        
+        if self.config.get('rotation', 0) in (90, 270):
+            width, height = height, width
+        
+        return (width, height)
     
     def stop(self):
         """Dừng camera"""
@@ -272,7 +290,7 @@ def main():
     
     try:
         while True:
-            frame = camera.read_frame()
+            frame, _ = camera.read_frame()
             if frame is not None:
                 cv2.putText(frame, f"Frame: {camera.frame_count}", 
                            (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
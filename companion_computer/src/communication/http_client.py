@@ -22,6 +22,20 @@ from loguru import logger
 import cv2
 import numpy as np
 
+# orjson (C) encode nhanh hơn json.dumps nhiều lần - optional
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def encode_json(data) -> bytes:
+    """Encode payload thành JSON bytes (orjson nếu có, fallback json)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data).encode('utf-8')
+
 
 class HTTPUploadClient:
     """HTTP client for uploading data to ground station"""
@@ -161,10 +175,11 @@ class HTTPUploadClient:
         Giải thích:
             - Đây là pipeline chuẩn: Sau khi tính toán vị trí mục tiêu, gọi hàm này để gửi lên server.
             - Dữ liệu sẽ được POST tới /api/target trên ground station.
+            - Payload được encode JSON ngay tại đây (thread gọi), worker chỉ POST bytes.
         """
         try:
             target['timestamp'] = datetime.now().isoformat()
-            self.target_queue.put_nowait(target)
+            self.target_queue.put_nowait(encode_json(target))
             logger.debug(f"Queued target geolocation (queue size: {self.target_queue.qsize()})")
         except Exception as e:
             logger.warning(f"Failed to queue target geolocation: {e}")
@@ -349,24 +364,24 @@ class HTTPUploadClient:
             logger.error(f"Detection upload error: {e}")
             return False
     
-    def _upload_target_geolocation(self, target: Dict) -> bool:
+    def _upload_target_geolocation(self, target: bytes) -> bool:
         """
         Upload vị trí mục tiêu lên server (POST /api/target)
         Args:
-            target: dict {'lat': ..., 'lon': ..., ...}
+            target: JSON bytes đã encode sẵn của dict {'lat': ..., 'lon': ..., ...}
         Returns:
             True nếu thành công, False nếu lỗi
         """
         try:
             url = f"{self.server_url}/api/target"
             
-            headers = {}
+            headers = {'Content-Type': 'application/json'}
             if self.api_key:
                 headers['Authorization'] = f'Bearer {self.api_key}'
             
             response = requests.post(
                 url,
-                json=target,
+                data=target,
                 headers=headers,
                 timeout=5.0
             )
@@ -6,6 +6,7 @@ Ghi log telemetry, GPS, video, và các sự kiện
 import os
 import json
 import time
+from dataclasses import asdict, is_dataclass
 from datetime import datetime
 from typing import Dict, Any, Optional
 from loguru import logger
@@ -27,15 +28,15 @@ class DataLogger:
         self.session_id = self._generate_session_id()
         self.session_dir = None
         
-        # Create log directory
-        self._setup_logging()
-        
-        # Log files
+        # Log files (được mở trong _setup_logging)
         self.telemetry_log = None
         self.gps_log = None
         self.events_log = None
         self.target_log = None
         
+        # Create log directory
+        self._setup_logging()
+        
         logger.info(f"Data logger initialized - Session: {self.session_id}")
     
     def _load_config(self, config_path: str) -> dict:
@@ -145,6 +146,44 @@ class DataLogger:
         except Exception as e:
             logger.error(f"Failed to log GPS: {e}")
     
+    def log_batch(self, records: list):
+        """
+        Ghi một batch telemetry/GPS records với một lần write + flush mỗi file
+        
+        Args:
+            records: List of (kind, timestamp, payload) tuples
+                - ('telemetry', timestamp, telemetry_dict hoặc dataclass)
+                - ('gps', timestamp, (lat, lon, alt))
+        """
+        telemetry_lines = []
+        gps_lines = []
+        
+        try:
+            for kind, timestamp, payload in records:
+                if kind == 'telemetry' and self.telemetry_log is not None:
+                    data = asdict(payload) if is_dataclass(payload) else dict(payload)
+                    data.setdefault('timestamp', timestamp)
+                    telemetry_lines.append(json.dumps(data) + '\n')
+                elif kind == 'gps' and self.gps_log is not None:
+                    lat, lon, alt = payload
+                    gps_lines.append(json.dumps({
+                        'timestamp': timestamp,
+                        'lat': lat,
+                        'lon': lon,
+                        'alt': alt,
+                    }) + '\n')
+            
+            if telemetry_lines:
+                self.telemetry_log.write(''.join(telemetry_lines))
+                self.telemetry_log.flush()
+            
+            if gps_lines:
+                self.gps_log.write(''.join(gps_lines))
+                self.gps_log.flush()
+            
+        except Exception as e:
+            logger.error(f"Failed to log batch: {e}")
+    
     def log_event(self, event_type: str, description: str, 
                   data: Optional[Dict] = None):
         """
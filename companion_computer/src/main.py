@@ -10,10 +10,30 @@ import sys
 import os
 import time
 import argparse
+import math
 import threading
-from queue import Queue, Full, Empty
+import tempfile
+from collections import deque
+from queue import LifoQueue, Full, Empty
+from dataclasses import dataclass
+from typing import Any, Optional
 from loguru import logger
+import json
 import yaml
+import numpy as np
+
+# orjson (C) parse nhanh hơn json/PyYAML - optional
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -23,7 +43,42 @@ from camera import CameraInterface
 from ai import AdaptiveDetector
 from communication.mavlink_handler import MAVLinkHandler
 from data_logging import DataLogger
-from navigation.geolocation import calculate_target_geolocation
+from navigation.geolocation import geolocate_bbox
+
+# Optional modules - resolve một lần ở module level thay vì trong setup()
+try:
+    from watchdog import WatchdogTimer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+try:
+    from communication.http_client import HTTPUploadClient
+    HTTP_CLIENT_AVAILABLE = True
+except ImportError:
+    HTTP_CLIENT_AVAILABLE = False
+
+
+@dataclass
+class TelemetrySnapshot:
+    """Telemetry chụp cùng thời điểm với frame (slots: không dict per-instance)"""
+    __slots__ = ('lat', 'lon', 'alt', 'roll', 'pitch', 'yaw', 'battery')
+    lat: Optional[float]
+    lon: Optional[float]
+    alt: float
+    roll: float
+    pitch: float
+    yaw: float
+    battery: Any
+
+
+@dataclass
+class FramePackage:
+    """Gói frame + telemetry truyền từ camera thread sang AI thread"""
+    __slots__ = ('frame', 'timestamp', 'tel')
+    frame: Any
+    timestamp: int  # time.monotonic_ns()
+    tel: Optional[TelemetrySnapshot]
 
 
 class CompanionComputer:
@@ -54,29 +109,110 @@ class CompanionComputer:
         self.current_ai_mode = "reconnaissance"  # Default
         self.ai_mode_changes = 0
         
-        self.is_running = False
+        # Shutdown signal: set = đã dừng. Các luồng wait() trên event này
+        # nên thoát ngay khi shutdown thay vì đợi hết timeout
+        self._stop_event = threading.Event()
+        self._stop_event.set()
         self.frame_count = 0
         self.watchdog = None
         
-        # Pipeline queues (size=2 để drop frame cũ, ưu tiên real-time)
-        self.frame_queue = Queue(maxsize=2)
-        self.upload_queue = Queue(maxsize=50)
+        # Frame timestamps dùng monotonic_ns; offset này đổi sang epoch
+        # chỉ ở biên ghi log / upload
+        self._epoch_offset_ns = time.time_ns() - time.monotonic_ns()
+        
+        # Cache process handle một lần (tránh mở lại /proc mỗi lần đo RAM)
+        self._proc = psutil.Process(os.getpid()) if PSUTIL_AVAILABLE else None
+        
+        # Frame pipeline: deque(maxlen=2) tự drop frame cũ khi append (ưu tiên real-time)
+        self._frame_deque = deque(maxlen=2)
+        self._frame_cv = threading.Condition()
+        
+        # Frame buffer pool (LIFO: buffer vừa trả còn nóng trong cache).
+        # Cần >= maxlen deque + 1 (AI đang xử lý) + 1 (camera đang ghi)
+        self._frame_pool_size = 4
+        self._frame_pool = LifoQueue(maxsize=self._frame_pool_size)
+        self._frame_shape = None
+        
+        # Kích thước ảnh cố định theo cấu hình camera (đọc một lần trong setup)
+        self._img_w = None
+        self._img_h = None
+        # Upload: AI thread đẩy thẳng vào queue của HTTPUploadClient (đã có worker riêng),
+        # không cần thêm một thread trung gian tranh GIL
+        
+        # Geolocation cache: bỏ qua tính toán khi bbox/UAV gần như đứng yên
+        self._geo_cache_key = None
+        self._geo_cache_result = None
+        self._geo_reuse_px = 1.0       # pixels
+        self._geo_reuse_dist_m = 0.5   # meters (vị trí + độ cao UAV)
+        self._geo_reuse_att_deg = 0.1  # degrees (roll/pitch/yaw)
+        
+        # Log ring buffer: camera thread chỉ append (O(1), không I/O),
+        # log thread drain và ghi theo batch
+        self._log_ring = deque(maxlen=4096)
+        self._log_batch_size = 64
         
         # Pipeline threads
         self.camera_thread = None
         self.ai_thread = None
-        self.upload_thread = None
+        self.log_thread = None
+        
+        # Performance monitor chạy định kỳ (ngoài camera thread)
+        self._perf_interval_s = 5.0
+        self._perf_timer = None
+        self._last_perf_ns = 0
+        self._last_perf_frame = 0
         
         logger.info("Companion computer initialized")
     
+    @property
+    def is_running(self) -> bool:
+        """Pipeline đang chạy (chưa shutdown)"""
+        return not self._stop_event.is_set()
+    
     def _load_config(self, config_path: str) -> dict:
-        """Load system configuration"""
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                return yaml.safe_load(f)
-        else:
+        """
+        Load system configuration
+        
+        Ưu tiên file JSON cache cạnh file YAML (parse nhanh hơn nhiều trên Pi),
+        chỉ parse lại YAML khi cache chưa có hoặc cũ hơn YAML.
+        """
+        if not os.path.exists(config_path):
             logger.warning(f"Config not found: {config_path}, using defaults")
             return {'system': {'debug': True}}
+        
+        json_path = os.path.splitext(config_path)[0] + '.json'
+        try:
+            if os.path.getmtime(json_path) >= os.path.getmtime(config_path):
+                with open(json_path, 'rb') as f:
+                    data = f.read()
+                return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+        except (OSError, ValueError):
+            pass  # Chưa có cache hoặc cache hỏng -> parse YAML
+        
+        with open(config_path, 'r') as f:
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        
+        # Ghi cache JSON cho lần khởi động sau (best effort): ghi ra file tạm cùng thư mục
+        # rồi os.replace -> process khác / lần boot sau không bao giờ đọc phải file ghi dở
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(json_path) or '.',
+                prefix=os.path.basename(json_path) + '.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f)
+            os.replace(tmp_path, json_path)
+            tmp_path = None
+        except (OSError, TypeError) as e:
+            logger.debug(f"Could not write config cache {json_path}: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        
+        return config
     
     def setup(self) -> bool:
         """
@@ -96,18 +232,22 @@ class CompanionComputer:
                 self.data_logger = DataLogger()
                 self.data_logger.log_event("STARTUP", "Companion computer starting")
             # Watchdog Timer
-            from watchdog import WatchdogTimer
-            self.watchdog = WatchdogTimer(timeout_s=15)
-            self.watchdog.start()
+            if WATCHDOG_AVAILABLE:
+                self.watchdog = WatchdogTimer(timeout_s=15)
+                self.watchdog.start()
+            else:
+                logger.warning("Watchdog not available")
             # HTTP Client
             self.http_client = None
             http_config = system_config.get('http_upload', {})
             if http_config.get('enabled', True):
-                from communication.http_client import HTTPUploadClient
-                server_url = http_config.get('server_url', 'http://192.168.1.100:5000')
-                api_key = http_config.get('api_key', None)
-                self.http_client = HTTPUploadClient(server_url=server_url, api_key=api_key)
-                self.http_client.start()
+                if HTTP_CLIENT_AVAILABLE:
+                    server_url = http_config.get('server_url', 'http://192.168.1.100:5000')
+                    api_key = http_config.get('api_key', None)
+                    self.http_client = HTTPUploadClient(server_url=server_url, api_key=api_key)
+                    self.http_client.start()
+                else:
+                    logger.warning("HTTP upload client not available")
             
             # Camera
             if auto_start.get('camera', True):
@@ -115,13 +255,10 @@ class CompanionComputer:
                 if not self.camera.start():
                     logger.warning("Camera failed to start")
                 else:
+                    self._img_w, self._img_h = self.camera.get_frame_dimensions()
+                    self._init_frame_pool(self._img_w, self._img_h)
                     logger.info("✓ Camera ready")
             
-                        # AI Detector với RC mode switching
-            if auto_start.get('ai', True) and self.comm:
-                self.detector = AdaptiveDetector(self.comm)
-                logger.info("✓ Adaptive AI Detector with RC mode switching ready")
-            
             # MAVLink Communication (ArduPilot)
             # Check for connection config (Simulation/TCP) or Serial config
             conn_config = self.config.get('connection', {})
@@ -138,6 +275,13 @@ class CompanionComputer:
             else:
                 logger.warning("MAVLink communication failed (normal on test systems)")
             
+            # AI Detector với RC mode switching (cần self.comm nên tạo sau MAVLink)
+            if auto_start.get('ai', True) and self.comm:
+                self.detector = AdaptiveDetector(self.comm)
+                logger.info("✓ Adaptive AI Detector with RC mode switching ready")
+            
+            self._warmup()
+            
             logger.info("Setup completed")
             return True
             
@@ -152,25 +296,30 @@ class CompanionComputer:
         if self.data_logger:
             self.data_logger.log_event("RUNNING", "Parallel pipeline started")
         
-        self.is_running = True
+        self._stop_event.clear()
+        stop_event = self._stop_event
         
         try:
             # Start 3 parallel threads
             self.camera_thread = threading.Thread(target=self._camera_telemetry_loop, daemon=True)
             self.ai_thread = threading.Thread(target=self._ai_geolocation_loop, daemon=True)
-            self.upload_thread = threading.Thread(target=self._upload_loop, daemon=True)
+            self.log_thread = threading.Thread(target=self._log_drain_loop, daemon=True)
             
             self.camera_thread.start()
             self.ai_thread.start()
-            self.upload_thread.start()
+            self.log_thread.start()
             
             logger.info("✓ All 3 parallel threads started")
             
+            self._last_perf_ns = time.monotonic_ns()
+            self._last_perf_frame = self.frame_count
+            self._schedule_perf_monitor()
+            
             # Main thread chỉ monitor và kick watchdog
-            while self.is_running:
+            while not stop_event.is_set():
                 if self.watchdog:
                     self.watchdog.kick()
-                time.sleep(1)
+                stop_event.wait(1)
         
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
@@ -186,177 +335,342 @@ class CompanionComputer:
     def _camera_telemetry_loop(self):
         """Luồng 1: Camera & Telemetry (Real-time)"""
         logger.info("Thread 1: Camera & Telemetry started")
-        while self.is_running:
+        realtime_config = self._realtime_config()
+        self._apply_thread_placement(
+            "camera", realtime_config.get('camera_cores'),
+            realtime_config.get('camera_fifo_priority', 0))
+        
+        # Đợi camera sẵn sàng trước khi pre-bind
+        stop_event = self._stop_event
+        while not stop_event.is_set() and self.camera is None:
+            stop_event.wait(0.1)
+        
+        # Pre-bind methods thành local names (bỏ LOAD_ATTR mỗi frame)
+        read_frame = self.camera.read_frame if self.camera else None
+        pool_get = self._frame_pool.get_nowait
+        release_frame = self._release_frame
+        frame_deque = self._frame_deque
+        comm = self.comm
+        if comm:
+            get_gps = comm.get_gps
+            get_attitude = comm.get_attitude
+            get_battery = comm.get_battery
+        frame_cv = self._frame_cv
+        frame_append = self._frame_deque.append
+        frame_notify = frame_cv.notify
+        log_append = self._log_ring.append
+        
+        while not stop_event.is_set():
             try:
-                if self.camera is None:
-                    time.sleep(0.1)
-                    continue
+                # Lấy buffer từ pool (None -> camera tự cấp phát)
+                try:
+                    buf = pool_get()
+                except Empty:
+                    buf = None
                 
                 # Chụp frame và lấy timestamp ngay lập tức
-                result = self.camera.read_frame()
-                if result is None:
+                frame, frame_timestamp = read_frame(into=buf)
+                if frame is None:
+                    # Camera lỗi/mock không có frame: nhường CPU (thread có thể chạy SCHED_FIFO)
+                    release_frame(buf)
+                    stop_event.wait(0.01)
                     continue
                 
-                frame, frame_timestamp = result
-                
                 # Lấy telemetry NGAY sau khi chụp để đồng bộ thời gian
                 telemetry_snapshot = None
-                if self.comm and self.comm.is_connected:
-                    gps = self.comm.get_gps()
-                    attitude = self.comm.get_attitude()
-                    battery = self.comm.get_battery()
+                if comm and comm.is_connected:
+                    gps = get_gps()
+                    attitude = get_attitude()
+                    battery = get_battery()
                     if gps and attitude:
-                        telemetry_snapshot = {
-                            'lat': gps.get('lat'),
-                            'lon': gps.get('lon'),
-                            'alt': gps.get('alt', 0),
-                            'roll': attitude.get('roll', 0),
-                            'pitch': attitude.get('pitch', 0),
-                            'yaw': attitude.get('yaw', 0),
-                            'battery': battery
-                        }
+                        telemetry_snapshot = TelemetrySnapshot(
+                            gps.get('lat'),
+                            gps.get('lon'),
+                            gps.get('alt', 0),
+                            attitude.get('roll', 0),
+                            attitude.get('pitch', 0),
+                            attitude.get('yaw', 0),
+                            battery
+                        )
                 
-                # Đưa vào queue (drop frame cũ nếu đầy)
-                package = {
-                    'frame': frame,
-                    'timestamp': frame_timestamp,
-                    'telemetry': telemetry_snapshot
-                }
+                # Đưa vào deque (frame cũ tự bị drop khi đầy)
+                package = FramePackage(frame, frame_timestamp, telemetry_snapshot)
                 
-                try:
-                    self.frame_queue.put_nowait(package)
-                except Full:
-                    # Drop frame cũ, lấy frame mới (real-time strategy)
-                    try:
-                        self.frame_queue.get_nowait()
-                        self.frame_queue.put_nowait(package)
-                    except:
-                        pass
+                with frame_cv:
+                    if len(frame_deque) == frame_deque.maxlen:
+                        # Frame cũ nhất sắp bị drop - thu hồi buffer của nó
+                        release_frame(frame_deque.popleft().frame)
+                    frame_append(package)
+                    frame_notify()
                 
                 self.frame_count += 1
                 
-                # Log telemetry
+                # Log telemetry qua ring buffer (I/O nằm ở log thread)
                 if self.data_logger and telemetry_snapshot:
-                    self.data_logger.log_telemetry(telemetry_snapshot)
-                    if 'lat' in telemetry_snapshot and 'lon' in telemetry_snapshot:
-                        self.data_logger.log_gps(
-                            telemetry_snapshot['lat'],
-                            telemetry_snapshot['lon'],
-                            telemetry_snapshot.get('alt', 0)
-                        )
+                    log_append(('telemetry', frame_timestamp, telemetry_snapshot))
+                    if telemetry_snapshot.lat is not None and telemetry_snapshot.lon is not None:
+                        log_append(('gps', frame_timestamp, (
+                            telemetry_snapshot.lat,
+                            telemetry_snapshot.lon,
+                            telemetry_snapshot.alt
+                        )))
                 
-                # Performance monitor
-                if self.frame_count % 300 == 0:
-                    now = time.time()
-                    if not hasattr(self, '_last_perf_time'):
-                        self._last_perf_time = now
-                        self._last_perf_frame = self.frame_count
-                    elapsed = now - self._last_perf_time
-                    frames = self.frame_count - getattr(self, '_last_perf_frame', 0)
-                    fps = frames / elapsed if elapsed > 0 else 0
-                    import psutil
-                    process = psutil.Process(os.getpid())
-                    mem_mb = process.memory_info().rss / (1024 * 1024)
-                    logger.info(f"Camera: {self.frame_count} frames | FPS: {fps:.2f} | RAM: {mem_mb:.1f}MB | Queue: {self.frame_queue.qsize()}")
-                    self._last_perf_time = now
-                    self._last_perf_frame = self.frame_count
-                
-                time.sleep(0.001)  # Minimal delay
+                # Không sleep khi có frame: camera.read_frame() đã block theo nhịp sensor
                 
             except Exception as e:
                 logger.error(f"Error in camera thread: {e}")
-                time.sleep(0.1)
+                stop_event.wait(0.1)
+    
+    def _init_frame_pool(self, width: int, height: int):
+        """Cấp phát trước các frame buffer (H, W, 3) uint8"""
+        self._frame_shape = (height, width, 3)
+        for _ in range(self._frame_pool_size):
+            self._release_frame(np.empty(self._frame_shape, dtype=np.uint8))
+    
+    def _release_frame(self, frame):
+        """Trả frame buffer về pool (bỏ qua nếu sai kích thước hoặc pool đầy)"""
+        if frame is None or frame.shape != self._frame_shape:
+            return
+        try:
+            self._frame_pool.put_nowait(frame)
+        except Full:
+            pass
+    
+    def _warmup(self):
+        """
+        Chạy inference + geolocation một lần với frame giả để trả trước chi phí
+        khởi tạo (graph optimization, lazy init) thay vì trên frame thật đầu tiên
+        
+        Chỉ gọi ObjectDetector.detect() (không trạng thái), không gọi
+        AdaptiveDetector.process_frame() - frame giả sẽ làm lệch frame_count,
+        tracking state và thống kê thời gian của detector thật
+        """
+        width = self._img_w or 640
+        height = self._img_h or 480
+        dummy_frame = np.zeros((height, width, 3), dtype=np.uint8)
+        
+        start = time.monotonic()
+        try:
+            if self.detector:
+                self.detector.detector.detect(dummy_frame)
+            geolocate_bbox((0, 0, 10, 10), 0.0, 0.0, 100.0, 0.0, 0.0, 0.0, width, height)
+            logger.info(f"✓ Warmup completed in {(time.monotonic() - start) * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"Warmup failed: {e}")
+    
+    def _realtime_config(self) -> dict:
+        """Cấu hình pin core / SCHED_FIFO ({} nếu tắt)"""
+        realtime_config = self.config.get('system', {}).get('realtime', {})
+        return realtime_config if realtime_config.get('enabled', False) else {}
+    
+    def _apply_thread_placement(self, name: str, cores=None, fifo_priority: int = 0):
+        """
+        Pin thread hiện tại vào các core chỉ định và (tùy chọn) đặt SCHED_FIFO
+        
+        Args:
+            name: Tên thread (để log)
+            cores: List core IDs, None = không pin
+            fifo_priority: Priority SCHED_FIFO (1-99), 0 = giữ scheduler mặc định
+        """
+        # pid 0 = thread đang gọi (Linux áp dụng affinity/scheduler theo thread)
+        if cores and hasattr(os, 'sched_setaffinity'):
+            try:
+                available = os.sched_getaffinity(0)
+                target = set(cores) & available
+                if target:
+                    os.sched_setaffinity(0, target)
+                    logger.info(f"Thread {name} pinned to cores {sorted(target)}")
+            except OSError as e:
+                logger.warning(f"Could not pin thread {name}: {e}")
+        
+        if fifo_priority and hasattr(os, 'sched_setscheduler'):
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_priority))
+                logger.info(f"Thread {name} using SCHED_FIFO priority {fifo_priority}")
+            except OSError as e:
+                logger.warning(f"Could not set SCHED_FIFO for thread {name} (need CAP_SYS_NICE): {e}")
+    
+    def _schedule_perf_monitor(self):
+        """Hẹn giờ lần log performance tiếp theo"""
+        self._perf_timer = threading.Timer(self._perf_interval_s, self._log_perf)
+        self._perf_timer.daemon = True
+        self._perf_timer.start()
+    
+    def _log_perf(self):
+        """Log FPS / RSS / queue depth mỗi _perf_interval_s giây"""
+        if not self.is_running:
+            return
+        
+        try:
+            now_ns = time.monotonic_ns()
+            frame_count = self.frame_count
+            elapsed = (now_ns - self._last_perf_ns) * 1e-9
+            fps = (frame_count - self._last_perf_frame) / elapsed if elapsed > 0 else 0
+            mem_mb = self._get_memory_mb()
+            logger.info(f"Camera: {frame_count} frames | FPS: {fps:.2f} | RSS: {mem_mb:.1f}MB | Queue: {len(self._frame_deque)}")
+            self._last_perf_ns = now_ns
+            self._last_perf_frame = frame_count
+        except Exception as e:
+            logger.error(f"Error in performance monitor: {e}")
+        
+        self._schedule_perf_monitor()
+    
+    def _to_epoch_s(self, timestamp_ns: int) -> float:
+        """Đổi monotonic_ns timestamp sang epoch seconds (cho log / upload)"""
+        return (timestamp_ns + self._epoch_offset_ns) * 1e-9
+    
+    def _get_memory_mb(self) -> float:
+        """RSS hiện tại của process (MB) qua psutil handle đã cache, 0 nếu không có psutil"""
+        if self._proc is not None:
+            return self._proc.memory_info().rss / (1024 * 1024)
+        return 0.0
     
     def _ai_geolocation_loop(self):
         """Luồng 2: AI & Geolocation (Heavy Processing)"""
         logger.info("Thread 2: AI & Geolocation started")
-        while self.is_running:
+        self._apply_thread_placement("ai", self._realtime_config().get('ai_cores'))
+        stop_event = self._stop_event
+        frame_deque = self._frame_deque
+        while not stop_event.is_set():
             try:
-                # Lấy package từ queue (timeout 1s)
-                try:
-                    package = self.frame_queue.get(timeout=1.0)
-                except Empty:
+                # Lấy package từ deque (shutdown notify_all đánh thức ngay)
+                with self._frame_cv:
+                    self._frame_cv.wait_for(
+                        lambda: frame_deque or stop_event.is_set(), timeout=1.0)
+                    package = frame_deque.popleft() if frame_deque else None
+                if package is None:
                     continue
                 
-                frame = package['frame']
-                frame_timestamp = package['timestamp']
-                telemetry_snapshot = package['telemetry']
+                try:
+                    self._process_package(package)
+                finally:
+                    # Trả frame buffer về pool cho camera thread tái sử dụng
+                    self._release_frame(package.frame)
+            
+            except Exception as e:
+                logger.error(f"Error in AI thread: {e}")
+                stop_event.wait(0.1)
+    
+    def _process_package(self, package: FramePackage):
+        """AI detection + geolocation cho một frame package"""
+        frame = package.frame
+        tel = package.tel
+        
+        # AI Detection
+        if self.detector:
+            detections = self.detector.process_frame(frame)
+            
+            if detections:
+                detector_status = self.detector.get_status()
+                current_mode = detector_status.get('current_mode', 'unknown')
+                
+                if current_mode != self.current_ai_mode:
+                    self.current_ai_mode = current_mode
+                    self.ai_mode_changes += 1
+                    logger.info(f"AI Mode: {current_mode.upper()} (Change #{self.ai_mode_changes})")
+                
+                # Log detection
+                if self.data_logger:
+                    self.data_logger.log_detection(detections, {
+                        'ai_mode': current_mode,
+                        'detection_frequency': detector_status.get('detection_frequency'),
+                        'is_tracking': detector_status.get('is_tracking', False),
+                        'frame_timestamp': self._to_epoch_s(package.timestamp)
+                    })
                 
-                # AI Detection
-                if self.detector:
-                    detections = self.detector.process_frame(frame)
+                # Tính toán geolocation
+                target_bbox = detections[0]['bbox'] if 'bbox' in detections[0] else None
+                if target_bbox and tel:
+                    if self._img_w is None:
+                        self._img_h, self._img_w = frame.shape[:2]
+                    target_geolocation = self._geolocate_cached(
+                        target_bbox, tel, self._img_w, self._img_h)
                     
-                    if detections:
-                        detector_status = self.detector.get_status()
-                        current_mode = detector_status.get('current_mode', 'unknown')
+                    if target_geolocation:
+                        target_geolocation['frame_timestamp'] = self._to_epoch_s(package.timestamp)
+                        logger.info(f"Target geolocation: {target_geolocation}")
                         
-                        if current_mode != self.current_ai_mode:
-                            self.current_ai_mode = current_mode
-                            self.ai_mode_changes += 1
-                            logger.info(f"AI Mode: {current_mode.upper()} (Change #{self.ai_mode_changes})")
+                        # Đưa thẳng vào upload queue của HTTP client (non-blocking)
+                        if self.http_client:
+                            self.http_client.queue_target_geolocation(target_geolocation)
                         
-                        # Log detection
+                        # Log ngay
                         if self.data_logger:
-                            self.data_logger.log_detection(detections, {
-                                'ai_mode': current_mode,
-                                'detection_frequency': detector_status.get('detection_frequency'),
-                                'is_tracking': detector_status.get('is_tracking', False),
-                                'frame_timestamp': frame_timestamp
-                            })
-                        
-                        # Tính toán geolocation
-                        target_bbox = detections[0]['bbox'] if 'bbox' in detections[0] else None
-                        if target_bbox and telemetry_snapshot:
-                            image_height, image_width = frame.shape[:2]
-                            target_geolocation = calculate_target_geolocation(
-                                target_bbox, telemetry_snapshot, image_width, image_height)
-                            
-                            if target_geolocation:
-                                target_geolocation['frame_timestamp'] = frame_timestamp
-                                logger.info(f"Target geolocation: {target_geolocation}")
-                                
-                                # Đưa vào upload queue
-                                try:
-                                    self.upload_queue.put_nowait({
-                                        'type': 'target',
-                                        'data': target_geolocation
-                                    })
-                                except Full:
-                                    logger.warning("Upload queue full, dropping data")
-                                
-                                # Log ngay
-                                if self.data_logger:
-                                    self.data_logger.log_target_geolocation(target_geolocation)
-            
-            except Exception as e:
-                logger.error(f"Error in AI thread: {e}")
-                time.sleep(0.1)
+                            self.data_logger.log_target_geolocation(target_geolocation)
     
-    def _upload_loop(self):
-        """Luồng 3: Network Upload (Background)"""
-        logger.info("Thread 3: Network Upload started")
-        while self.is_running:
+    def _geolocate_cached(self, bbox, tel: TelemetrySnapshot,
+                          image_width: int, image_height: int) -> Optional[dict]:
+        """
+        Geolocation có cache: nếu tâm bbox dịch < 1px và UAV gần như không
+        đổi vị trí / attitude so với lần trước thì dùng lại kết quả cũ.
+        """
+        if tel.lat is None or tel.lon is None:
+            return None
+        
+        cx = (bbox[0] + bbox[2]) * 0.5
+        cy = (bbox[1] + bbox[3]) * 0.5
+        key = (cx, cy, tel.lat, tel.lon, tel.alt, tel.roll, tel.pitch, tel.yaw)
+        
+        last = self._geo_cache_key
+        if last is not None and self._geo_cache_result is not None:
+            px_tol = self._geo_reuse_px
+            att_tol = self._geo_reuse_att_deg
+            # Khoảng cách xấp xỉ equirectangular (đủ chính xác ở mức < 1m)
+            d_north = (tel.lat - last[2]) * 111320.0
+            d_east = (tel.lon - last[3]) * 111320.0 * math.cos(math.radians(tel.lat))
+            if (abs(cx - last[0]) < px_tol and abs(cy - last[1]) < px_tol
+                    and d_north * d_north + d_east * d_east < self._geo_reuse_dist_m ** 2
+                    and abs(tel.alt - last[4]) < self._geo_reuse_dist_m
+                    and abs(tel.roll - last[5]) < att_tol
+                    and abs(tel.pitch - last[6]) < att_tol
+                    and abs(tel.yaw - last[7]) < att_tol):
+                return dict(self._geo_cache_result)
+        
+        result = geolocate_bbox(
+            bbox, tel.lat, tel.lon, tel.alt,
+            tel.roll, tel.pitch, tel.yaw,
+            image_width, image_height)
+        
+        self._geo_cache_key = key
+        self._geo_cache_result = dict(result) if result else None
+        return result
+    
+    def _log_drain_loop(self):
+        """Luồng 3: Drain log ring buffer và ghi batch xuống SD card"""
+        logger.info("Thread 3: Log writer started")
+        self._apply_thread_placement("log", self._realtime_config().get('log_cores'))
+        batch_size = self._log_batch_size
+        to_epoch_s = self._to_epoch_s
+        stop_event = self._stop_event
+        while True:
             try:
-                # Lấy package từ upload queue
-                try:
-                    package = self.upload_queue.get(timeout=1.0)
-                except Empty:
-                    continue
+                records = []
+                while self._log_ring and len(records) < batch_size:
+                    kind, timestamp_ns, payload = self._log_ring.popleft()
+                    records.append((kind, to_epoch_s(timestamp_ns), payload))
                 
-                # Upload qua HTTP client
-                if self.http_client:
-                    if package['type'] == 'target':
-                        self.http_client.queue_target_geolocation(package['data'])
+                if records:
+                    if self.data_logger:
+                        self.data_logger.log_batch(records)
+                elif stop_event.is_set():
+                    break  # Đã drain hết sau khi shutdown
+                else:
+                    stop_event.wait(0.05)
             
             except Exception as e:
-                logger.error(f"Error in upload thread: {e}")
-                time.sleep(0.5)
+                logger.error(f"Error in log thread: {e}")
+                stop_event.wait(0.5)
     
     def shutdown(self):
         """Shutdown tất cả modules và threads"""
         logger.info("Shutting down...")
         
-        self.is_running = False
+        self._stop_event.set()
+        with self._frame_cv:
+            self._frame_cv.notify_all()
+        
+        if self._perf_timer:
+            self._perf_timer.cancel()
         
         if self.data_logger:
             self.data_logger.log_event("SHUTDOWN", "Companion computer shutting down")
@@ -366,8 +680,8 @@ class CompanionComputer:
             self.camera_thread.join(timeout=2)
         if self.ai_thread:
             self.ai_thread.join(timeout=2)
-        if self.upload_thread:
-            self.upload_thread.join(timeout=2)
+        if self.log_thread:
+            self.log_thread.join(timeout=2)
         
         # Stop watchdog
         if self.watchdog:
@@ -1,5 +1,7 @@
 """Navigation module for autonomous flight and GPS denial handling"""
 
+import importlib
+
 from .autonomous import (
     Position,
     Velocity,
@@ -11,40 +13,43 @@ from .autonomous import (
 )
 
 from .geolocation import (
-    calculate_target_geolocation
+    calculate_target_geolocation,
+    calculate_target_geolocations,
+    get_target_geolocations_for_frame,
+    geolocate_bbox,
+    geolocate_bboxes,
+    geolocate_bbox_series
 )
 
-# EKF-Integrated GPS Denial - import with fallback
-try:
-    from .ekf_integrated_gps_denial import (
-        ExtendedKalmanFilter,
-        EKFIntegratedDeadReckoningNavigator,
-        EKFIntegratedGPSDenialHandler
-    )
-    EKF_AVAILABLE = True
-except ImportError:
-    EKF_AVAILABLE = False
+# EKF / Hybrid GPS Denial được import lazily (PEP 562) khi truy cập lần đầu,
+# tránh kéo các module nặng vào lúc startup nếu không dùng tới
+_LAZY_SUBMODULES = {
+    # EKF-Integrated GPS Denial
+    'ExtendedKalmanFilter': '.ekf_integrated_gps_denial',
+    'EKFIntegratedDeadReckoningNavigator': '.ekf_integrated_gps_denial',
+    'EKFIntegratedGPSDenialHandler': '.ekf_integrated_gps_denial',
+    # Hybrid GPS Denial System
+    'NavigationMode': '.hybrid_gps_denial_system',
+    'ComputeLocation': '.hybrid_gps_denial_system',
+    'AirspeedReading': '.hybrid_gps_denial_system',
+    'MS4525DOAirspeedSensor': '.hybrid_gps_denial_system',
+    'QuantumFilterComparator': '.hybrid_gps_denial_system',
+    'MLAdaptiveTuner': '.hybrid_gps_denial_system',
+    'HybridGPSDenialSystem': '.hybrid_gps_denial_system',
+    'assess_rpi_capability': '.hybrid_gps_denial_system',
+}
 
-# Hybrid GPS Denial System - import with fallback
-try:
-    from .hybrid_gps_denial_system import (
-        NavigationMode,
-        ComputeLocation,
-        AirspeedReading,
-        MS4525DOAirspeedSensor,
-        QuantumFilterComparator,
-        MLAdaptiveTuner,
-        HybridGPSDenialSystem,
-        assess_rpi_capability
-    )
-    HYBRID_SYSTEM_AVAILABLE = True
-except ImportError:
-    HYBRID_SYSTEM_AVAILABLE = False
+# EKF_AVAILABLE / HYBRID_SYSTEM_AVAILABLE (và __all__, phụ thuộc vào chúng) cũng được tính lazily:
+# cờ = submodule import thành công (import thật, không chỉ kiểm tra file tồn tại)
+_AVAILABILITY_FLAGS = {
+    'EKF_AVAILABLE': '.ekf_integrated_gps_denial',
+    'HYBRID_SYSTEM_AVAILABLE': '.hybrid_gps_denial_system',
+}
 
-__all__ = [
+_EAGER_ALL = [
     # Autonomous navigation
     'Position',
-    'Velocity', 
+    'Velocity',
     'NavigationAlgorithms',
     'PathFollower',
     'LoiterController',
@@ -52,27 +57,39 @@ __all__ = [
     'WindEstimator',
     # Geolocation
     'calculate_target_geolocation',
+    'calculate_target_geolocations',
+    'get_target_geolocations_for_frame',
+    'geolocate_bbox',
+    'geolocate_bboxes',
+    'geolocate_bbox_series',
     # EKF GPS Denial (if available)
     'EKF_AVAILABLE',
     # Hybrid System (if available)
     'HYBRID_SYSTEM_AVAILABLE',
 ]
 
-if EKF_AVAILABLE:
-    __all__.extend([
-        'ExtendedKalmanFilter',
-        'EKFIntegratedDeadReckoningNavigator',
-        'EKFIntegratedGPSDenialHandler'
-    ])
 
-if HYBRID_SYSTEM_AVAILABLE:
-    __all__.extend([
-        'NavigationMode',
-        'ComputeLocation',
-        'AirspeedReading',
-        'MS4525DOAirspeedSensor',
-        'QuantumFilterComparator',
-        'MLAdaptiveTuner',
-        'HybridGPSDenialSystem',
-        'assess_rpi_capability'
-    ])
+def _submodule_available(submodule):
+    """Import submodule; False nếu nó (hoặc dependency của nó) không import được"""
+    try:
+        importlib.import_module(submodule, __name__)
+        return True
+    except ImportError:
+        return False
+
+
+def __getattr__(name):
+    """Lazy import cho các symbol EKF / Hybrid, cờ availability và __all__ (PEP 562)"""
+    if name in _AVAILABILITY_FLAGS:
+        value = _submodule_available(_AVAILABILITY_FLAGS[name])
+    elif name == '__all__':
+        # Symbol EKF / Hybrid chỉ có trong __all__ khi submodule import được
+        value = _EAGER_ALL + [symbol for symbol, submodule in _LAZY_SUBMODULES.items()
+                              if _submodule_available(submodule)]
+    else:
+        submodule = _LAZY_SUBMODULES.get(name)
+        if submodule is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(submodule, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,42 @@
+"""Type stub for navigation - exposes the lazily imported EKF / Hybrid symbols"""
+
+from .autonomous import (
+    Position as Position,
+    Velocity as Velocity,
+    NavigationAlgorithms as NavigationAlgorithms,
+    PathFollower as PathFollower,
+    LoiterController as LoiterController,
+    ObstacleAvoidance as ObstacleAvoidance,
+    WindEstimator as WindEstimator,
+)
+
+from .geolocation import (
+    calculate_target_geolocation as calculate_target_geolocation,
+    calculate_target_geolocations as calculate_target_geolocations,
+    get_target_geolocations_for_frame as get_target_geolocations_for_frame,
+    geolocate_bbox as geolocate_bbox,
+    geolocate_bboxes as geolocate_bboxes,
+    geolocate_bbox_series as geolocate_bbox_series,
+)
+
+from .ekf_integrated_gps_denial import (
+    ExtendedKalmanFilter as ExtendedKalmanFilter,
+    EKFIntegratedDeadReckoningNavigator as EKFIntegratedDeadReckoningNavigator,
+    EKFIntegratedGPSDenialHandler as EKFIntegratedGPSDenialHandler,
+)
+
+from .hybrid_gps_denial_system import (
+    NavigationMode as NavigationMode,
+    ComputeLocation as ComputeLocation,
+    AirspeedReading as AirspeedReading,
+    MS4525DOAirspeedSensor as MS4525DOAirspeedSensor,
+    QuantumFilterComparator as QuantumFilterComparator,
+    MLAdaptiveTuner as MLAdaptiveTuner,
+    HybridGPSDenialSystem as HybridGPSDenialSystem,
+    assess_rpi_capability as assess_rpi_capability,
+)
+
+EKF_AVAILABLE: bool
+HYBRID_SYSTEM_AVAILABLE: bool
+
+__all__: list[str]
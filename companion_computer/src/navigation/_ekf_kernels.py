@@ -0,0 +1,342 @@
+"""
+EKF math kernels
+Predict/update inner math of the 15-state EKF on plain arrays, JIT-compiled with Numba when available
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Fallback: run kernels as plain Python"""
+        return lambda func: func
+
+
+GRAVITY = 9.81  # m/s^2
+
+# Same JIT policy as _nav_kernels: compiled at import with explicit signatures, GIL released,
+# disk cache only when imported as navigation._ekf_kernels, fastmath without nnan/ninf/nsz
+_FASTMATH = {'contract', 'afn', 'reassoc', 'arcp'}
+_JIT_OPTIONS = dict(cache=bool(__package__), fastmath=_FASTMATH, nogil=True)
+
+# Shape/layout-locked types for the filter's own arrays (state, P, Q, scratch are always owned,
+# C-contiguous buffers): unit-stride loads let LLVM unroll and vectorize the fixed-width row
+# updates and small matmuls instead of generic strided loops. Measurements/IMU stay any-layout
+_VEC = 'float64[::1]'
+_MAT = 'float64[:, ::1]'
+
+
+@njit(f'{_MAT}({_MAT}, {_MAT}, {_MAT})', **_JIT_OPTIONS)
+def _matmul(a, b, out):
+    """out = a @ b for the small EKF matrices (explicit loops: Numba's matmul needs SciPy/BLAS)"""
+    n, m = a.shape
+    p = b.shape[1]
+    for i in range(n):
+        for j in range(p):
+            acc = 0.0
+            for k in range(m):
+                acc += a[i, k] * b[k, j]
+            out[i, j] = acc
+    return out
+
+
+if not NUMBA_AVAILABLE:
+    def _matmul(a, b, out):
+        """Fallback: NumPy (BLAS) matmul - loops would be slow in plain Python"""
+        return np.matmul(a, b, out=out)
+
+
+@njit(f'void({_MAT}, {_MAT})', **_JIT_OPTIONS)
+def _cholesky_inv3(S, out):
+    """
+    Inverse of a symmetric positive-definite 3x3 S via Cholesky: S = L L^T -> S^-1 = L^-T L^-1
+    Uses the SPD structure (3 sqrt, triangular inverse) instead of a generic LU/adjugate inverse
+    """
+    l00 = math.sqrt(S[0, 0])
+    l10 = S[1, 0] / l00
+    l20 = S[2, 0] / l00
+    l11 = math.sqrt(S[1, 1] - l10 * l10)
+    l21 = (S[2, 1] - l20 * l10) / l11
+    l22 = math.sqrt(S[2, 2] - l20 * l20 - l21 * l21)
+
+    # M = L^-1 (lower triangular)
+    m00 = 1.0 / l00
+    m11 = 1.0 / l11
+    m22 = 1.0 / l22
+    m10 = -l10 * m00 * m11
+    m21 = -l21 * m11 * m22
+    m20 = -(l20 * m00 + l21 * m10) * m22
+
+    # S^-1 = M^T M (symmetric)
+    out[0, 0] = m00 * m00 + m10 * m10 + m20 * m20
+    out[1, 1] = m11 * m11 + m21 * m21
+    out[2, 2] = m22 * m22
+    out[0, 1] = out[1, 0] = m10 * m11 + m20 * m21
+    out[0, 2] = out[2, 0] = m20 * m22
+    out[1, 2] = out[2, 1] = m21 * m22
+
+
+@njit('float64[:, :](float64[:])', **_JIT_OPTIONS)
+def _quat_to_rot(q):
+    """Rotation matrix (body to NED) from quaternion [q0, q1, q2, q3]"""
+    q0, q1, q2, q3 = q[0], q[1], q[2], q[3]
+
+    R = np.empty((3, 3))
+    R[0, 0] = 1 - 2*(q2*q2 + q3*q3)
+    R[0, 1] = 2*(q1*q2 - q0*q3)
+    R[0, 2] = 2*(q1*q3 + q0*q2)
+    R[1, 0] = 2*(q1*q2 + q0*q3)
+    R[1, 1] = 1 - 2*(q1*q1 + q3*q3)
+    R[1, 2] = 2*(q2*q3 - q0*q1)
+    R[2, 0] = 2*(q1*q3 - q0*q2)
+    R[2, 1] = 2*(q2*q3 + q0*q1)
+    R[2, 2] = 1 - 2*(q1*q1 + q2*q2)
+    return R
+
+
+@njit('UniTuple(float64, 3)(float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _quat_to_euler(q0, q1, q2, q3):
+    """Euler angles (roll, pitch, yaw) in radians from quaternion, shared squares computed once"""
+    q1q1 = q1 * q1
+    q2q2 = q2 * q2
+    q3q3 = q3 * q3
+
+    roll = math.atan2(2*(q0*q1 + q2*q3), 1 - 2*(q1q1 + q2q2))
+    # Clamp: rounding can push |sin(pitch)| just above 1 near +-90 deg
+    pitch = math.asin(max(-1.0, min(1.0, 2*(q0*q2 - q3*q1))))
+    yaw = math.atan2(2*(q0*q3 + q1*q2), 1 - 2*(q2q2 + q3q3))
+
+    return roll, pitch, yaw
+
+
+@njit('UniTuple(float64, 3)(float64, float64, float64, float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _rotate_by_quat(q0, q1, q2, q3, vx, vy, vz):
+    """
+    Rotate vector v by unit quaternion q (body to NED) without building the 3x3 matrix
+    v' = v + q0*t + cross(q_vec, t), t = 2*cross(q_vec, v)
+    """
+    tx = 2.0 * (q2*vz - q3*vy)
+    ty = 2.0 * (q3*vx - q1*vz)
+    tz = 2.0 * (q1*vy - q2*vx)
+
+    return (vx + q0*tx + (q2*tz - q3*ty),
+            vy + q0*ty + (q3*tx - q1*tz),
+            vz + q0*tz + (q1*ty - q2*tx))
+
+
+@njit('float64(float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _qnorm(q0, q1, q2, q3):
+    """Quaternion norm as a scalar sqrt (inlined into the calling kernels, no np.linalg.norm dispatch)"""
+    return math.sqrt(q0*q0 + q1*q1 + q2*q2 + q3*q3)
+
+
+@njit('void(float64[:])', **_JIT_OPTIONS)
+def _qnormalize(q):
+    """Normalize a 4-element quaternion (array or state[6:10] view) in place"""
+    n = _qnorm(q[0], q[1], q[2], q[3])
+    q[0], q[1], q[2], q[3] = q[0] / n, q[1] / n, q[2] / n, q[3] / n
+
+
+@njit('UniTuple(float64, 4)(float64[:], float64[:], float64, float64[:])', **_JIT_OPTIONS)
+def _predict_attitude(q, omega, dt, q_out):
+    """
+    Attitude part of the prediction in one pass: normalizes q and writes it integrated with
+    angular velocity omega (rad/s) over dt to q_out (may alias q - inputs are read into locals first)
+    Returns: normalized q before integration (q0, q1, q2, q3)
+    """
+    q0, q1, q2, q3 = q[0], q[1], q[2], q[3]
+    n = _qnorm(q0, q1, q2, q3)
+    q0, q1, q2, q3 = q0 / n, q1 / n, q2 / n, q3 / n
+
+    omega_norm = math.sqrt(omega[0]*omega[0] + omega[1]*omega[1] + omega[2]*omega[2])
+    if omega_norm < 1e-6:
+        q_out[0], q_out[1], q_out[2], q_out[3] = q0, q1, q2, q3
+        return q0, q1, q2, q3
+
+    # Quaternion delta: rotation of omega_norm*dt around omega/omega_norm (sin/cos once)
+    half_angle = omega_norm * dt / 2
+    dq0 = math.cos(half_angle)
+    s = math.sin(half_angle) / omega_norm
+    dq1, dq2, dq3 = omega[0] * s, omega[1] * s, omega[2] * s
+
+    # Hamilton product dq * q, renormalized
+    p0 = dq0*q0 - dq1*q1 - dq2*q2 - dq3*q3
+    p1 = dq0*q1 + dq1*q0 + dq2*q3 - dq3*q2
+    p2 = dq0*q2 - dq1*q3 + dq2*q0 + dq3*q1
+    p3 = dq0*q3 + dq1*q2 - dq2*q1 + dq3*q0
+    n = _qnorm(p0, p1, p2, p3)
+    q_out[0], q_out[1], q_out[2], q_out[3] = p0 / n, p1 / n, p2 / n, p3 / n
+
+    return q0, q1, q2, q3
+
+
+@njit('void(float64[:, :], float64)', **_JIT_OPTIONS)
+def _compute_jacobian(F, dt):
+    """
+    State transition Jacobian (simplified): writes only the dt-dependent entries into F (15x15)
+    F must hold the identity elsewhere. Dense reference for _propagate_covariance
+    In real implementation, need proper Jacobian
+    """
+    for i in range(3):
+        # Position depends on velocity
+        F[i, 3 + i] = dt
+        # Velocity depends on attitude (simplified linearization)
+        F[3 + i, 6 + i] = 0.1 * dt
+
+    # Attitude depends on gyro bias - only columns 13, 14 exist in the 15-element state
+    F[6, 13] = 0.5 * dt
+    F[7, 14] = 0.5 * dt
+
+
+@njit(f'void({_MAT}, float64, {_MAT})', **_JIT_OPTIONS)
+def _propagate_covariance(P, dt, Q):
+    """
+    P = F P F^T + Q in place, using the block structure of F = I + N (_compute_jacobian):
+    N only couples pos <- vel (dt), vel <- att (0.1*dt) and att <- gyro bias (0.5*dt),
+    so F P is a few row updates and (F P) F^T the same column updates - no 15x15 products
+    """
+    # F P: each row block reads a row block that has not been updated yet
+    P[0:3, :] += dt * P[3:6, :]
+    P[3:6, :] += 0.1 * dt * P[6:9, :]
+    P[6:8, :] += 0.5 * dt * P[13:15, :]
+
+    # (F P) F^T: same updates on the columns
+    P[:, 0:3] += dt * P[:, 3:6]
+    P[:, 3:6] += 0.1 * dt * P[:, 6:9]
+    P[:, 6:8] += 0.5 * dt * P[:, 13:15]
+
+    P += Q
+
+
+@njit(f'void({_VEC}, {_MAT}, float64[:], float64[:], float64, {_MAT})', **_JIT_OPTIONS)
+def _predict_kernel(state, P, accel, gyro, dt, Q):
+    """
+    EKF prediction in place
+    state (15,), P (15, 15); accel/gyro: raw IMU (body frame)
+    """
+    # Attitude: integrated quaternion written straight back to the state
+    # (gyro bias has no full slot in the 15-element state -> not removed; biases assumed constant)
+    q0, q1, q2, q3 = _predict_attitude(state[6:10], gyro, dt, state[6:10])
+
+    # Acceleration (bias removed) rotated from body frame to NED by the pre-integration attitude,
+    # plus gravity - R(q) is only needed for this one vector, so it is never built
+    an, ae, ad = _rotate_by_quat(q0, q1, q2, q3,
+                                 accel[0] - state[10], accel[1] - state[11], accel[2] - state[12])
+    ad += GRAVITY
+
+    # Position: p = p + v*dt + 0.5*a*dt^2; Velocity: v = v + a*dt
+    half_dt2 = 0.5 * dt * dt
+    state[0] += state[3] * dt + an * half_dt2
+    state[1] += state[4] * dt + ae * half_dt2
+    state[2] += state[5] * dt + ad * half_dt2
+    state[3] += an * dt
+    state[4] += ae * dt
+    state[5] += ad * dt
+
+    # Covariance: P = F P F^T + Q
+    _propagate_covariance(P, dt, Q)
+
+
+@njit(f'void(float64[:, ::1], float64[:, :, ::1], float64[:, :], float64[:], {_MAT})',
+      parallel=True, **_JIT_OPTIONS)
+def _predict_batch_kernel(states, Ps, imus, dts, Q):
+    """
+    Independent EKF predictions for a batch of filters in place (log replay / Monte-Carlo tuning)
+    states (B, 15), Ps (B, 15, 15), imus (B, 10) in IMUReading field order, dts (B,)
+    Each filter is exactly _predict_kernel; filters are spread across cores with prange
+    """
+    for b in prange(states.shape[0]):
+        _predict_kernel(states[b], Ps[b], imus[b, 7:10], imus[b, 4:7], dts[b], Q)
+
+
+@njit(f'void({_VEC}, {_MAT}, float64[:], int64, float64[:, :], {_MAT}, {_MAT}, {_MAT}, {_MAT}, {_MAT})',
+      **_JIT_OPTIONS)
+def _update_kernel(state, P, z, offset, R, PHt, K, S, HP, KHP):
+    """
+    EKF measurement update in place for a 3-D measurement z of state[offset:offset + 3]
+    H = [0 .. I3 .. 0] is a selector -> S and P H^T are slices of P, no dense H
+    The quaternion is left unnormalized (see ExtendedKalmanFilter._finalize)
+    R: 3x3 measurement noise
+    PHt, K (15, 3), S (3, 3), HP (3, 15), KHP (15, 15): caller-owned scratch, nothing is allocated
+    """
+    # Innovation
+    y0 = z[0] - state[offset]
+    y1 = z[1] - state[offset + 1]
+    y2 = z[2] - state[offset + 2]
+
+    PHt[:, :] = P[:, offset:offset + 3]
+    S[:, :] = P[offset:offset + 3, offset:offset + 3]
+    S += R
+    _cholesky_inv3(S, S)  # reads all of S before writing -> inverted in place
+    _matmul(PHt, S, K)
+
+    # Update state
+    state += K[:, 0] * y0 + K[:, 1] * y1 + K[:, 2] * y2
+
+    # Covariance: P - K (H P) == (I - K H) P without the 15x15 identity and 15x15x15 product;
+    # H P = P[offset:offset + 3, :] (a copy - those rows change in the subtraction)
+    HP[:, :] = P[offset:offset + 3, :]
+    P -= _matmul(K, HP, KHP)
+
+
+@njit(f'void({_VEC}, {_MAT}, float64, float64, float64, float64, float64, float64, {_MAT})', **_JIT_OPTIONS)
+def _scalar_quat_update(state, P, j0, j1, j2, j3, target, r, KV):
+    """
+    Scalar measurement update with H = [0 .. j .. 0] nonzero only on the quaternion columns 6:10
+    Innovation is target - j . q (target folds in the linearization point); r: measurement variance
+    Rank-1 covariance update P -= (P H^T)(P H^T)^T / s - no matrix inverse; KV: 15x15 scratch
+    """
+    v = P[:, 6] * j0 + P[:, 7] * j1 + P[:, 8] * j2 + P[:, 9] * j3  # P H^T
+    s = v[6] * j0 + v[7] * j1 + v[8] * j2 + v[9] * j3 + r
+    k = v / s
+
+    state += k * (target - (j0 * state[6] + j1 * state[7] + j2 * state[8] + j3 * state[9]))
+
+    # K (H P) with H P = (P H^T)^T since P is symmetric
+    np.multiply(k.reshape((15, 1)), v.reshape((1, 15)), KV)
+    P -= KV
+
+
+@njit(f'void({_VEC}, {_MAT}, float64[:], float64[:], float64[:, :], {_MAT})', **_JIT_OPTIONS)
+def _mag_update_kernel(state, P, z, m_ref, R, KV):
+    """
+    Magnetometer update in place: z is the measured body-frame field, m_ref the unit NED reference field
+    Model h(q) = R(q)^T m_ref on directions (z is normalized); the 3x4 Jacobian dh/dq is taken at the
+    prior quaternion and the axes are folded in as 3 sequential scalar updates (R diagonal),
+    which equals the batch 3-D update with the same linearization but needs no 3x3 inverse
+    The quaternion is left unnormalized (see ExtendedKalmanFilter._finalize)
+    """
+    n = math.sqrt(z[0] * z[0] + z[1] * z[1] + z[2] * z[2])
+    if n == 0.0:
+        return  # no field reading
+    z0, z1, z2 = z[0] / n, z[1] / n, z[2] / n
+
+    q0, q1, q2, q3 = state[6], state[7], state[8], state[9]
+    mx, my, mz = m_ref[0], m_ref[1], m_ref[2]
+
+    # Predicted body-frame field h = R(q)^T m_ref
+    h0 = (1 - 2*(q2*q2 + q3*q3)) * mx + 2*(q1*q2 + q0*q3) * my + 2*(q1*q3 - q0*q2) * mz
+    h1 = 2*(q1*q2 - q0*q3) * mx + (1 - 2*(q1*q1 + q3*q3)) * my + 2*(q2*q3 + q0*q1) * mz
+    h2 = 2*(q1*q3 + q0*q2) * mx + 2*(q2*q3 - q0*q1) * my + (1 - 2*(q1*q1 + q2*q2)) * mz
+
+    # Jacobian rows dh_i/d(q0, q1, q2, q3)
+    a0, a1 = 2*(q3*my - q2*mz), 2*(q2*my + q3*mz)
+    a2, a3 = 2*(-2*q2*mx + q1*my - q0*mz), 2*(-2*q3*mx + q0*my + q1*mz)
+    b0, b1 = 2*(-q3*mx + q1*mz), 2*(q2*mx - 2*q1*my + q0*mz)
+    b2, b3 = 2*(q1*mx + q3*mz), 2*(-q0*mx - 2*q3*my + q2*mz)
+    c0, c1 = 2*(q2*mx - q1*my), 2*(q3*mx - q0*my - 2*q1*mz)
+    c2, c3 = 2*(q0*mx + q3*my - 2*q2*mz), 2*(q1*mx + q2*my)
+
+    # Linearized h(q) = h(q_prior) + J (q - q_prior) -> innovation z - h - J (q - q_prior)
+    _scalar_quat_update(state, P, a0, a1, a2, a3,
+                        z0 - h0 + a0*q0 + a1*q1 + a2*q2 + a3*q3, R[0, 0], KV)
+    _scalar_quat_update(state, P, b0, b1, b2, b3,
+                        z1 - h1 + b0*q0 + b1*q1 + b2*q2 + b3*q3, R[1, 1], KV)
+    _scalar_quat_update(state, P, c0, c1, c2, c3,
+                        z2 - h2 + c0*q0 + c1*q1 + c2*q2 + c3*q3, R[2, 2], KV)
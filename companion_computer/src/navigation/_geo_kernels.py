@@ -0,0 +1,125 @@
+"""
+Geolocation kernels
+Camera ray -> flat-ground intersection on plain floats, JIT-compiled with Numba when available
+"""
+
+import math
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback: run kernels as plain Python"""
+        return lambda func: func
+
+
+EARTH_RADIUS_EQ = 6378137.0  # meters (WGS-84 equatorial, as in geolocation.py)
+
+# Meters north -> degrees latitude: degrees(north / R) == north * degrees(1 / R) (degrees() is linear)
+_INV_EARTH_R_DEG = math.degrees(1.0 / EARTH_RADIUS_EQ)
+
+# Same JIT policy as _nav_kernels: compiled at import with explicit signatures, GIL released,
+# disk cache only when imported as navigation._geo_kernels, fastmath without nnan/ninf/nsz
+_FASTMATH = {'contract', 'afn', 'reassoc', 'arcp'}
+_JIT_OPTIONS = dict(cache=bool(__package__), fastmath=_FASTMATH, nogil=True)
+
+
+@njit('UniTuple(float64, 3)(float64, float64, float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _camera_ray(target_px, target_py, image_width, image_height, hfov_rad, vfov_rad):
+    """Unit ray (OpenCV camera axes: X right, Y down, Z forward) through pixel (target_px, target_py)"""
+    # Pixel -> angles off the optical axis (radians() is linear: FOV converted once by the caller)
+    angle_x = (target_px / image_width - 0.5) * hfov_rad
+    angle_y = (target_py / image_height - 0.5) * vfov_rad
+
+    # Ray as scalars - no 3-element array
+    c0 = math.tan(angle_x)
+    c1 = math.tan(angle_y)
+    inv_norm = 1.0 / math.sqrt(c0 * c0 + c1 * c1 + 1.0)
+    return c0 * inv_norm, c1 * inv_norm, inv_norm
+
+
+@njit('float64(float64)', **_JIT_OPTIONS)
+def _lon_deg_per_meter(uav_lat):
+    """Meters east -> degrees longitude at latitude uav_lat (one cos, shared by a whole frame)"""
+    return _INV_EARTH_R_DEG / math.cos(math.radians(uav_lat))
+
+
+@njit('Tuple((float64, float64, boolean))(float64, float64, float64, float64, float64, float64, float64)',
+      **_JIT_OPTIONS)
+def _ground_point(n0, n1, n2, uav_lat, uav_lon, uav_alt_msl, lon_deg_per_meter):
+    """
+    Intersection of the NED ray (n0, n1, n2) from the UAV with flat ground at MSL 0
+    lon_deg_per_meter: _lon_deg_per_meter(uav_lat)
+    Returns: (lat, lon, ok) - ok is False when the ray does not point below the horizon
+    """
+    if n2 <= 0:
+        return 0.0, 0.0, False
+
+    scale = uav_alt_msl / n2
+    north_offset = n0 * scale
+    east_offset = n1 * scale
+
+    # Offsets (meters) -> lat/lon with constant factors, no degrees()/radians() per point
+    return (uav_lat + north_offset * _INV_EARTH_R_DEG,
+            uav_lon + east_offset * lon_deg_per_meter, True)
+
+
+@njit('Tuple((float64, float64, boolean))(float64, float64, float64, float64, float64, float64, '
+      'float64, float64, float64, float64, float64, float64, float64[:, ::1])', **_JIT_OPTIONS)
+def _geolocate_ray(target_px, target_py, image_width, image_height, hfov_rad, vfov_rad,
+                   uav_lat, uav_lon, uav_alt_msl, roll, pitch, yaw, R_cam):
+    """
+    Ground intersection (MSL 0) of the camera ray through pixel (target_px, target_py)
+    R_cam: camera (OpenCV axes) to body rotation; roll/pitch/yaw: UAV attitude (radians)
+    Returns: (lat, lon, ok) - ok is False when the ray does not point below the horizon
+    """
+    c0, c1, c2 = _camera_ray(target_px, target_py, image_width, image_height, hfov_rad, vfov_rad)
+
+    # Camera -> body (3x3 matvec written out: Numba's np.dot needs SciPy/BLAS)
+    b0 = R_cam[0, 0] * c0 + R_cam[0, 1] * c1 + R_cam[0, 2] * c2
+    b1 = R_cam[1, 0] * c0 + R_cam[1, 1] * c1 + R_cam[1, 2] * c2
+    b2 = R_cam[2, 0] * c0 + R_cam[2, 1] * c1 + R_cam[2, 2] * c2
+
+    # Body -> NED with the closed-form ZYX rotation R_z(yaw) R_y(pitch) R_x(roll)
+    cos_r, sin_r = math.cos(roll), math.sin(roll)
+    cos_p, sin_p = math.cos(pitch), math.sin(pitch)
+    cos_y, sin_y = math.cos(yaw), math.sin(yaw)
+
+    n0 = (cos_y * cos_p * b0 + (cos_y * sin_p * sin_r - sin_y * cos_r) * b1
+          + (cos_y * sin_p * cos_r + sin_y * sin_r) * b2)
+    n1 = (sin_y * cos_p * b0 + (sin_y * sin_p * sin_r + cos_y * cos_r) * b1
+          + (sin_y * sin_p * cos_r - cos_y * sin_r) * b2)
+    n2 = -sin_p * b0 + cos_p * sin_r * b1 + cos_p * cos_r * b2
+
+    return _ground_point(n0, n1, n2, uav_lat, uav_lon, uav_alt_msl, _lon_deg_per_meter(uav_lat))
+
+
+@njit('void(float64[:], float64[:], float64, float64, float64, float64, '
+      'float64, float64, float64, float64[:, ::1], float64[:, ::1])', **_JIT_OPTIONS)
+def _geolocate_frame(target_px, target_py, image_width, image_height, hfov_rad, vfov_rad,
+                     uav_lat, uav_lon, uav_alt_msl, R_total, out):
+    """
+    Ground intersections for all detections of one frame
+    R_total: camera (OpenCV axes) to NED rotation, built once per frame (attitude is shared)
+    -> one 3x3 matvec per detection; out (N, 2) lat/lon, NaN where the ray misses the ground
+    """
+    lon_deg_per_meter = _lon_deg_per_meter(uav_lat)  # UAV position is shared too
+
+    for k in range(target_px.shape[0]):
+        c0, c1, c2 = _camera_ray(target_px[k], target_py[k], image_width, image_height,
+                                 hfov_rad, vfov_rad)
+
+        n0 = R_total[0, 0] * c0 + R_total[0, 1] * c1 + R_total[0, 2] * c2
+        n1 = R_total[1, 0] * c0 + R_total[1, 1] * c1 + R_total[1, 2] * c2
+        n2 = R_total[2, 0] * c0 + R_total[2, 1] * c1 + R_total[2, 2] * c2
+
+        lat, lon, ok = _ground_point(n0, n1, n2, uav_lat, uav_lon, uav_alt_msl, lon_deg_per_meter)
+        if ok:
+            out[k, 0] = lat
+            out[k, 1] = lon
+        else:
+            out[k, 0] = math.nan
+            out[k, 1] = math.nan
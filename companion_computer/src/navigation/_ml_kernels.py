@@ -0,0 +1,78 @@
+"""
+ML tuner kernels
+Training-set extraction and standardization on the SoA sample buffers, JIT-compiled with Numba when available
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback: run kernels as plain Python"""
+        return lambda func: func
+
+
+# Same JIT policy as _nav_kernels: compiled at import with explicit signatures, GIL released,
+# disk cache only when imported as navigation._ml_kernels, fastmath without nnan/ninf/nsz
+# (nnan would let the compiler drop the NaN-target test below)
+_FASTMATH = {'contract', 'afn', 'reassoc', 'arcp'}
+_JIT_OPTIONS = dict(cache=bool(__package__), fastmath=_FASTMATH, nogil=True)
+
+
+@njit('Tuple((float32[:, ::1], float32[::1], float64[::1], float64[::1]))(float32[:, :], float32[:])',
+      **_JIT_OPTIONS)
+def _standardize_samples(features, targets):
+    """
+    Rows with a target (non-NaN) -> (X_scaled, y, mean, scale), StandardScaler semantics
+    features (N, F) float32, targets (N,) float32 with NaN for samples without a DR error.
+    mean/scale are accumulated in float64 (scale = population std, 1.0 for constant columns);
+    X_scaled is written once, straight into its output - no masked copy and no scaler copy
+    """
+    n_rows, n_cols = features.shape
+
+    count = 0
+    for k in range(n_rows):
+        if not math.isnan(targets[k]):
+            count += 1
+
+    mean = np.zeros(n_cols)
+    scale = np.ones(n_cols)
+    X = np.empty((count, n_cols), dtype=np.float32)
+    y = np.empty(count, dtype=np.float32)
+    if count == 0:
+        return X, y, mean, scale
+
+    # Pass 1: compact the rows that have a target and sum the columns
+    i = 0
+    for k in range(n_rows):
+        if not math.isnan(targets[k]):
+            for j in range(n_cols):
+                X[i, j] = features[k, j]
+                mean[j] += features[k, j]
+            y[i] = targets[k]
+            i += 1
+    for j in range(n_cols):
+        mean[j] /= count
+
+    # Pass 2: variance about the mean (two-pass, no catastrophic cancellation in float32 data)
+    var = np.zeros(n_cols)
+    for i in range(count):
+        for j in range(n_cols):
+            d = X[i, j] - mean[j]
+            var[j] += d * d
+    for j in range(n_cols):
+        std = math.sqrt(var[j] / count)
+        if std > 0.0:
+            scale[j] = std
+
+    # Pass 3: standardize in place
+    for i in range(count):
+        for j in range(n_cols):
+            X[i, j] = (X[i, j] - mean[j]) / scale[j]
+
+    return X, y, mean, scale
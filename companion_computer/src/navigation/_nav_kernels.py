@@ -0,0 +1,161 @@
+"""
+Navigation math kernels
+Great-circle kernels on plain floats (radians), JIT-compiled with Numba when available
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback: run kernels as plain Python"""
+        return lambda func: func
+
+
+EARTH_RADIUS = 6371000.0  # meters
+
+# Explicit signatures -> compiled at import (and cached on disk), never inside the control loop.
+# nogil: the kernels release the GIL so camera/AI threads keep running during navigation math.
+# Disk cache only when imported as navigation._nav_kernels (cached code is bound to the module name).
+# fastmath without nnan/ninf/nsz: NaN telemetry and signed zeros (atan2 tie-breaks) behave as in Python
+_FASTMATH = {'contract', 'afn', 'reassoc', 'arcp'}
+_JIT_OPTIONS = dict(cache=bool(__package__), fastmath=_FASTMATH, nogil=True)
+_SIG_4F = 'float64(float64, float64, float64, float64)'
+_SIG_5F = 'float64(float64, float64, float64, float64, float64)'
+
+
+@njit(_SIG_4F, **_JIT_OPTIONS)
+def _haversine(dlat, dlon, cos_lat1, cos_lat2):
+    """Haversine distance (meters) from lat/lon deltas and cos of both latitudes"""
+    sin_dlat = math.sin(dlat * 0.5)
+    sin_dlon = math.sin(dlon * 0.5)
+    a = sin_dlat * sin_dlat + cos_lat1 * cos_lat2 * sin_dlon * sin_dlon
+
+    # asin(sqrt(a)) == atan2(sqrt(a), sqrt(1 - a)) for a in [0, 1]; clamp guards rounding
+    return EARTH_RADIUS * 2.0 * math.asin(math.sqrt(min(1.0, a)))
+
+
+@njit(_SIG_5F, **_JIT_OPTIONS)
+def _bearing_rad(dlon, sin_lat1, cos_lat1, sin_lat2, cos_lat2):
+    """Initial bearing (radians, 0=North, (-pi, pi]) from lon delta and sin/cos of both latitudes"""
+    x = math.sin(dlon) * cos_lat2
+    y = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * math.cos(dlon)
+
+    return math.atan2(x, y)
+
+
+@njit(_SIG_5F, **_JIT_OPTIONS)
+def _bearing_trig(dlon, sin_lat1, cos_lat1, sin_lat2, cos_lat2):
+    """Initial bearing (degrees, 0=North, [0, 360)) from lon delta and sin/cos of both latitudes"""
+    return math.degrees(_bearing_rad(dlon, sin_lat1, cos_lat1, sin_lat2, cos_lat2)) % 360.0
+
+
+@njit('UniTuple(float64, 2)(float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _dest_point(lat1, lon1, distance, brng):
+    """Destination (lat, lon in radians) given distance (meters) and bearing (radians)"""
+    ang = distance / EARTH_RADIUS
+
+    sin_lat1, cos_lat1 = math.sin(lat1), math.cos(lat1)
+    sin_ang, cos_ang = math.sin(ang), math.cos(ang)
+
+    sin_lat2 = sin_lat1 * cos_ang + cos_lat1 * sin_ang * math.cos(brng)
+    lat2 = math.asin(sin_lat2)
+    lon2 = lon1 + math.atan2(math.sin(brng) * sin_ang * cos_lat1, cos_ang - sin_lat1 * sin_lat2)
+
+    return lat2, lon2
+
+
+@njit('UniTuple(float64, 2)(float64, float64, float64, float64, float64, float64, float64, float64, float64)',
+      **_JIT_OPTIONS)
+def _cross_and_along_track(dlat13, dlon13, dlon12, sin_lat1, cos_lat1, sin_lat3, cos_lat3, sin_lat2, cos_lat2):
+    """
+    Cross-track error and along-track distance (meters) sharing one distance and two bearings
+    1 = start, 2 = end, 3 = current; deltas are relative to start
+    """
+    d13 = _haversine(dlat13, dlon13, cos_lat1, cos_lat3) / EARTH_RADIUS
+    brng12 = _bearing_rad(dlon12, sin_lat1, cos_lat1, sin_lat2, cos_lat2)
+    brng13 = _bearing_rad(dlon13, sin_lat1, cos_lat1, sin_lat3, cos_lat3)
+
+    dxt = math.asin(math.sin(d13) * math.sin(brng13 - brng12))
+    # Clamp: rounding can push the ratio just above 1 when on track
+    dat = math.acos(min(1.0, math.cos(d13) / math.cos(dxt)))
+
+    return dxt * EARTH_RADIUS, dat * EARTH_RADIUS
+
+
+@njit('float64(float64, float64, float64, float64)', **_JIT_OPTIONS)
+def _steer_bank(desired_heading, vx, vy, max_bank):
+    """Proportional bank (degrees) from heading error to desired_heading, clamped to max_bank"""
+    current_heading = math.degrees(math.atan2(vy, vx))
+
+    # Heading error normalized to [-180, 180)
+    heading_error = (desired_heading - current_heading + 180.0) % 360.0 - 180.0
+    return max(-max_bank, min(max_bank, heading_error * 0.5))
+
+
+@njit('UniTuple(float64, 2)(float64, float64, float64, float64, float64, float64, float64, float64)',
+      **_JIT_OPTIONS)
+def _path_steer(dlon, sin_lat1, cos_lat1, sin_lat2, cos_lat2, vx, vy, max_bank):
+    """
+    Path-following steering toward a waypoint in one call
+    Returns: (desired_heading, desired_bank) in degrees
+    """
+    desired_heading = _bearing_trig(dlon, sin_lat1, cos_lat1, sin_lat2, cos_lat2)
+    return desired_heading, _steer_bank(desired_heading, vx, vy, max_bank)
+
+
+@njit(_SIG_5F, **_JIT_OPTIONS)
+def _distance_local(lat1, lon1, lat2, lon2, cos_lat):
+    """Equirectangular distance (meters) - sub-km accuracy < 1 cm"""
+    dlat = lat2 - lat1
+    dlon = (lon2 - lon1) * cos_lat
+    return EARTH_RADIUS * math.sqrt(dlat * dlat + dlon * dlon)
+
+
+@njit('UniTuple(float64, 2)(float64, float64, float64, float64, float64[:], float64[:], float64)',
+      **_JIT_OPTIONS)
+def _avoidance_force(lat1, lon1, sin_lat1, cos_lat1, lats, lons, threshold):
+    """
+    Summed potential-field repulsion (x=north, y=east) from obstacles (radians) within threshold (meters)
+    Cheap squared-distance prefilter over all obstacles, full force/bearing math only for the near ones
+    """
+    dlat = lats - lat1
+    dlon = lons - lon1
+    east = dlon * cos_lat1
+
+    # Equirectangular squared angular distance vs (threshold / R)^2 - no sqrt/trig for far obstacles
+    d2 = dlat * dlat + east * east
+    thr_norm = threshold / EARTH_RADIUS
+    near = d2 < thr_norm * thr_norm
+    if not near.any():
+        return 0.0, 0.0
+
+    dlat = dlat[near]
+    dlon = dlon[near]
+    near_lats = lats[near]
+
+    # Inverse-square force
+    dist = EARTH_RADIUS * np.sqrt(d2[near])
+    force = ((threshold - dist) / threshold) ** 2
+
+    # Bearing vector (y=north, x=east components of atan2) to each obstacle.
+    # cos/sin of the bearing are y/r, x/r exactly - no atan2/sin/cos needed.
+    # y uses the cancellation-free form sin(dlat) + 2 sin(lat1) cos(lat2) sin^2(dlon/2),
+    # so a coincident obstacle gives exactly r = 0 and keeps the atan2(0, 0) = 0 convention (north)
+    cos_lats = np.cos(near_lats)
+    x = np.sin(dlon) * cos_lats
+    y = np.sin(dlat) + 2.0 * sin_lat1 * cos_lats * np.sin(dlon * 0.5) ** 2
+    r = np.sqrt(x * x + y * y)
+    coincident = r == 0.0
+    y = np.where(coincident, 1.0, y)
+    r = np.where(coincident, 1.0, r)
+    scale = force / r
+
+    # Push away from the obstacle: cos/sin(bearing + pi) = -cos/-sin(bearing)
+    # (0.0 - sum keeps +0.0 rather than -0.0 -> same atan2 tie-break at exactly 180 deg as before)
+    return 0.0 - np.sum(scale * y), 0.0 - np.sum(scale * x)
@@ -4,114 +4,238 @@ Path planning, obstacle avoidance, and intelligent behaviors
 """
 
 import math
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Union
 from dataclasses import dataclass
 import numpy as np
 from loguru import logger
 
+# Try relative import first, then absolute (direct execution)
+try:
+    from ._nav_kernels import (
+        EARTH_RADIUS,
+        _haversine,
+        _bearing_rad as _bearing_rad_kernel,
+        _bearing_trig,
+        _dest_point,
+        _cross_and_along_track as _cross_and_along_track_kernel,
+        _distance_local as _distance_local_kernel,
+        _path_steer,
+        _steer_bank,
+        _avoidance_force
+    )
+except ImportError:
+    from _nav_kernels import (
+        EARTH_RADIUS,
+        _haversine,
+        _bearing_rad as _bearing_rad_kernel,
+        _bearing_trig,
+        _dest_point,
+        _cross_and_along_track as _cross_and_along_track_kernel,
+        _distance_local as _distance_local_kernel,
+        _path_steer,
+        _steer_bank,
+        _avoidance_force
+    )
 
-@dataclass
+
+@dataclass(frozen=True)
 class Position:
-    """3D position in GPS coordinates"""
+    """3D position in GPS coordinates (immutable)"""
+    # Explicit __slots__ (dataclass(slots=True) needs Python 3.10+);
+    # lat_rad / lon_rad / sin_lat / cos_lat are derived in __post_init__ for the navigation math
+    __slots__ = ('lat', 'lon', 'alt', 'lat_rad', 'lon_rad', 'sin_lat', 'cos_lat')
+    
     lat: float
     lon: float
     alt: float  # meters MSL
+    
+    def __post_init__(self):
+        # Frozen -> set derived slots via object.__setattr__
+        set_attr = object.__setattr__
+        lat_rad = math.radians(self.lat)
+        set_attr(self, 'lat_rad', lat_rad)
+        set_attr(self, 'lon_rad', math.radians(self.lon))
+        set_attr(self, 'sin_lat', math.sin(lat_rad))
+        set_attr(self, 'cos_lat', math.cos(lat_rad))
+    
+    def __reduce__(self):
+        # Frozen + hand-written __slots__: default copy/pickle sets slots with setattr (FrozenInstanceError)
+        # -> rebuild through the constructor, derived slots recomputed by __post_init__
+        return (self.__class__, (self.lat, self.lon, self.alt))
+    
+    @classmethod
+    def from_degrees(cls, lat: float, lon: float, alt: float = 0.0) -> 'Position':
+        """Create a Position (radians / sin / cos of lat computed once here)"""
+        return cls(lat, lon, alt)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Velocity:
-    """3D velocity vector"""
+    """3D velocity vector (immutable)"""
+    __slots__ = ('vx', 'vy', 'vz')
+    
     vx: float  # m/s north
     vy: float  # m/s east
     vz: float  # m/s up
+    
+    def __reduce__(self):
+        # Same as Position: copy/pickle through the constructor (frozen slots reject setattr)
+        return (self.__class__, (self.vx, self.vy, self.vz))
+
+
+# Obstacles: list of Position or SoA (lats, lons, alts) arrays in degrees
+Obstacles = Union[List[Position], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+
+# Module-level functions: internal callers use them directly (no class attribute /
+# staticmethod lookup per call); NavigationAlgorithms keeps the public API as aliases
+def _distance(pos1: Position, pos2: Position) -> float:
+    """Calculate horizontal distance between two positions (meters)"""
+    return _haversine(pos2.lat_rad - pos1.lat_rad, pos2.lon_rad - pos1.lon_rad,
+                      pos1.cos_lat, pos2.cos_lat)
+
+
+def _bearing(pos1: Position, pos2: Position) -> float:
+    """Calculate bearing from pos1 to pos2 (degrees, 0=North)"""
+    return _bearing_trig(pos2.lon_rad - pos1.lon_rad, pos1.sin_lat, pos1.cos_lat,
+                         pos2.sin_lat, pos2.cos_lat)
+
+
+def _bearing_rad(pos1: Position, pos2: Position) -> float:
+    """Bearing from pos1 to pos2 in radians ((-pi, pi], 0=North) - no degree round-trip"""
+    return _bearing_rad_kernel(pos2.lon_rad - pos1.lon_rad, pos1.sin_lat, pos1.cos_lat,
+                               pos2.sin_lat, pos2.cos_lat)
+
+
+def _distance_local(pos1: Position, pos2: Position, cos_lat_cache: Optional[float] = None) -> float:
+    """
+    Equirectangular distance (meters) - for sub-km checks instead of full haversine
+    cos_lat_cache: cos(latitude) reused by the caller, pos1.cos_lat if None
+    """
+    if cos_lat_cache is None:
+        cos_lat_cache = pos1.cos_lat
+    return _distance_local_kernel(pos1.lat_rad, pos1.lon_rad, pos2.lat_rad, pos2.lon_rad, cos_lat_cache)
+
+
+def _distance_batch(lat1: float, lon1: float, lat_arr: np.ndarray, lon_arr: np.ndarray,
+                    out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Vectorized haversine: distances (meters) from (lat1, lon1) to arrays of points"""
+    R = 6371000  # Earth radius in meters
+
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    lat2 = np.radians(lat_arr)
+
+    dlat = lat2 - lat1
+    dlon = np.radians(lon_arr) - lon1
+
+    a = np.sin(dlat/2)**2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    return np.multiply(c, 2 * R, out=out)
+
+
+def _bearing_batch(lat1: float, lon1: float, lat_arr: np.ndarray, lon_arr: np.ndarray,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Vectorized bearing from (lat1, lon1) to arrays of points (degrees, 0=North)"""
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    lat2 = np.radians(lat_arr)
+
+    dlon = np.radians(lon_arr) - lon1
+
+    cos_lat2 = np.cos(lat2)
+    x = np.sin(dlon) * cos_lat2
+    y = math.cos(lat1) * np.sin(lat2) - math.sin(lat1) * cos_lat2 * np.cos(dlon)
+
+    bearing = np.degrees(np.arctan2(x, y))
+    return np.remainder(bearing, 360, out=out)
+
+
+def _destination_point(pos: Position, distance: float, bearing: float) -> Position:
+    """Calculate destination point given distance and bearing"""
+    lat2, lon2 = _dest_point(pos.lat_rad, pos.lon_rad, distance, math.radians(bearing))
+    return Position(math.degrees(lat2), math.degrees(lon2), pos.alt)
+
+
+def _cross_and_along_track(current: Position, start: Position, end: Position) -> Tuple[float, float]:
+    """
+    Cross-track error and along-track distance in one pass (meters)
+    Returns: (cross_track_error, along_track_distance)
+    """
+    return _cross_and_along_track_kernel(current.lat_rad - start.lat_rad, current.lon_rad - start.lon_rad,
+                                         end.lon_rad - start.lon_rad,
+                                         start.sin_lat, start.cos_lat, current.sin_lat, current.cos_lat,
+                                         end.sin_lat, end.cos_lat)
+
+
+def _cross_track_error(current: Position, start: Position, end: Position) -> float:
+    """
+    Calculate cross-track error (distance from current position to line between start and end)
+    Positive = right of track, Negative = left of track
+    """
+    return _cross_and_along_track(current, start, end)[0]
+
+
+def _along_track_distance(current: Position, start: Position, end: Position) -> float:
+    """Calculate distance along track from start"""
+    return _cross_and_along_track(current, start, end)[1]
 
 
 class NavigationAlgorithms:
     """Collection of autonomous navigation algorithms"""
     
-    @staticmethod
-    def distance(pos1: Position, pos2: Position) -> float:
-        """Calculate horizontal distance between two positions (meters)"""
-        R = 6371000  # Earth radius in meters
-        
-        lat1, lon1 = math.radians(pos1.lat), math.radians(pos1.lon)
-        lat2, lon2 = math.radians(pos2.lat), math.radians(pos2.lon)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
-    
-    @staticmethod
-    def bearing(pos1: Position, pos2: Position) -> float:
-        """Calculate bearing from pos1 to pos2 (degrees, 0=North)"""
-        lat1, lon1 = math.radians(pos1.lat), math.radians(pos1.lon)
-        lat2, lon2 = math.radians(pos2.lat), math.radians(pos2.lon)
-        
-        dlon = lon2 - lon1
-        
-        x = math.sin(dlon) * math.cos(lat2)
-        y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-        
-        bearing = math.atan2(x, y)
-        return (math.degrees(bearing) + 360) % 360
-    
-    @staticmethod
-    def destination_point(pos: Position, distance: float, bearing: float) -> Position:
-        """Calculate destination point given distance and bearing"""
-        R = 6371000  # Earth radius in meters
-        
-        lat1 = math.radians(pos.lat)
-        lon1 = math.radians(pos.lon)
-        brng = math.radians(bearing)
-        
-        lat2 = math.asin(math.sin(lat1) * math.cos(distance/R) +
-                        math.cos(lat1) * math.sin(distance/R) * math.cos(brng))
-        
-        lon2 = lon1 + math.atan2(math.sin(brng) * math.sin(distance/R) * math.cos(lat1),
-                                 math.cos(distance/R) - math.sin(lat1) * math.sin(lat2))
-        
-        return Position(math.degrees(lat2), math.degrees(lon2), pos.alt)
-    
-    @staticmethod
-    def cross_track_error(current: Position, start: Position, end: Position) -> float:
-        """
-        Calculate cross-track error (distance from current position to line between start and end)
-        Positive = right of track, Negative = left of track
-        """
-        R = 6371000  # Earth radius
-        
-        d13 = NavigationAlgorithms.distance(start, current) / R
-        brng12 = math.radians(NavigationAlgorithms.bearing(start, end))
-        brng13 = math.radians(NavigationAlgorithms.bearing(start, current))
-        
-        dxt = math.asin(math.sin(d13) * math.sin(brng13 - brng12)) * R
-        return dxt
-    
-    @staticmethod
-    def along_track_distance(current: Position, start: Position, end: Position) -> float:
-        """Calculate distance along track from start"""
-        R = 6371000
-        
-        d13 = NavigationAlgorithms.distance(start, current) / R
-        dxt = NavigationAlgorithms.cross_track_error(current, start, end) / R
-        
-        dat = math.acos(math.cos(d13) / math.cos(dxt)) * R
-        return dat
+    distance = staticmethod(_distance)
+    bearing = staticmethod(_bearing)
+    _bearing_rad = staticmethod(_bearing_rad)
+    distance_local = staticmethod(_distance_local)
+    distance_batch = staticmethod(_distance_batch)
+    bearing_batch = staticmethod(_bearing_batch)
+    destination_point = staticmethod(_destination_point)
+    cross_and_along_track = staticmethod(_cross_and_along_track)
+    cross_track_error = staticmethod(_cross_track_error)
+    along_track_distance = staticmethod(_along_track_distance)
 
 
 class PathFollower:
     """Path following controller for waypoint navigation"""
     
-    def __init__(self, lookahead_distance: float = 20.0, max_bank_angle: float = 30.0):
+    # Reached-waypoint radius (meters)
+    WAYPOINT_RADIUS = 10.0
+    
+    def __init__(self, lookahead_distance: float = 20.0, max_bank_angle: float = 30.0,
+                 cache_radius: float = 1.0):
         self.lookahead_distance = lookahead_distance  # meters
         self.max_bank_angle = max_bank_angle  # degrees
+        self.cache_radius = cache_radius  # meters, 0 disables heading reuse
         
         self.current_waypoint_index = 0
-        self.waypoints: List[Position] = []
+        
+        # Temporal cache: at 50 Hz the UAV moves < 0.5 m per tick, so the bearing to the
+        # waypoint barely changes -> reuse it while within cache_radius of the last fix
+        self._cache_wp = -1
+        self._cache_lat = 0.0
+        self._cache_lon = 0.0
+        self._cache_reuse2 = 0.0  # squared reuse radius (radians^2)
+        self._cache_heading = 0.0
+        
+        # Waypoints as SoA arrays (lat/lon in radians) for the hot path, built by the setter
+        self.waypoints = ()
+    
+    @property
+    def waypoints(self) -> Tuple[Position, ...]:
+        """Waypoints (read-only tuple: the hot path uses arrays built on assignment)"""
+        return self._waypoints
+    
+    @waypoints.setter
+    def waypoints(self, waypoints: List[Position]):
+        waypoints = tuple(waypoints)
+        n = len(waypoints)
+        self._waypoints = waypoints
+        self._wp_lat = np.radians(np.fromiter((wp.lat for wp in waypoints), dtype=np.float64, count=n))
+        self._wp_lon = np.radians(np.fromiter((wp.lon for wp in waypoints), dtype=np.float64, count=n))
+        self._wp_alt = np.fromiter((wp.alt for wp in waypoints), dtype=np.float64, count=n)
+        self._wp_sin_lat = np.sin(self._wp_lat)
+        self._wp_cos_lat = np.cos(self._wp_lat)
+        self._cache_wp = -1
         
     def set_waypoints(self, waypoints: List[Position]):
         """Set waypoint list"""
@@ -124,69 +248,122 @@ class PathFollower:
         Calculate desired heading and bank angle to follow path
         Returns: (desired_heading, desired_bank_angle)
         """
-        if not self.waypoints or self.current_waypoint_index >= len(self.waypoints):
+        n_wp = len(self._wp_lat)
+        i = self.current_waypoint_index
+        if i >= n_wp:
             return 0.0, 0.0
         
-        # Get current and next waypoint
-        target_wp = self.waypoints[self.current_waypoint_index]
+        cur_lat, cur_lon = current_pos.lat_rad, current_pos.lon_rad
+        
+        # Moved less than the reuse radius since the last full computation: the waypoint
+        # cannot have been reached and the cached bearing is off by < ~0.6 deg
+        if i == self._cache_wp:
+            dlat = cur_lat - self._cache_lat
+            dlon = (cur_lon - self._cache_lon) * current_pos.cos_lat
+            if dlat * dlat + dlon * dlon < self._cache_reuse2:
+                return self._cache_heading, _steer_bank(self._cache_heading, current_velocity.vx,
+                                                        current_velocity.vy, self.max_bank_angle)
         
         # Check if reached waypoint
-        distance_to_wp = NavigationAlgorithms.distance(current_pos, target_wp)
-        if distance_to_wp < 10.0:  # Within 10m
-            self.current_waypoint_index += 1
-            logger.info(f"Reached waypoint {self.current_waypoint_index}")
+        distance_to_wp = _distance_local_kernel(cur_lat, cur_lon, self._wp_lat[i], self._wp_lon[i],
+                                                current_pos.cos_lat)
+        if distance_to_wp < self.WAYPOINT_RADIUS:
+            i += 1
+            self.current_waypoint_index = i
+            logger.info(f"Reached waypoint {i}")
             
-            if self.current_waypoint_index >= len(self.waypoints):
+            if i >= n_wp:
                 logger.success("Mission complete!")
                 return 0.0, 0.0
-            
-            target_wp = self.waypoints[self.current_waypoint_index]
-        
-        # Calculate desired heading to waypoint
-        desired_heading = NavigationAlgorithms.bearing(current_pos, target_wp)
-        
-        # Calculate current heading from velocity
-        current_heading = math.degrees(math.atan2(current_velocity.vy, current_velocity.vx))
-        current_heading = (current_heading + 360) % 360
         
-        # Calculate heading error
-        heading_error = desired_heading - current_heading
-        
-        # Normalize to [-180, 180]
-        if heading_error > 180:
-            heading_error -= 360
-        elif heading_error < -180:
-            heading_error += 360
-        
-        # Calculate bank angle (simple proportional control)
-        desired_bank = np.clip(heading_error * 0.5, -self.max_bank_angle, self.max_bank_angle)
+        # Desired heading to waypoint, heading error from velocity and bank in one kernel call
+        desired_heading, desired_bank = _path_steer(self._wp_lon[i] - cur_lon, current_pos.sin_lat,
+                                                    current_pos.cos_lat, self._wp_sin_lat[i],
+                                                    self._wp_cos_lat[i], current_velocity.vx,
+                                                    current_velocity.vy, self.max_bank_angle)
+        
+        # Reuse radius: cache_radius, shrunk to 1% of the distance (bearing error < ~0.6 deg)
+        # and kept clear of the reached-waypoint radius
+        reuse = min(self.cache_radius, 0.01 * distance_to_wp,
+                    distance_to_wp - self.WAYPOINT_RADIUS) / EARTH_RADIUS
+        self._cache_wp = i
+        self._cache_lat = cur_lat
+        self._cache_lon = cur_lon
+        self._cache_reuse2 = reuse * reuse if reuse > 0.0 else 0.0
+        self._cache_heading = desired_heading
         
         return desired_heading, desired_bank
     
     def calculate_altitude_command(self, current_pos: Position) -> float:
         """Calculate desired altitude"""
-        if not self.waypoints or self.current_waypoint_index >= len(self.waypoints):
+        if self.current_waypoint_index >= len(self._wp_alt):
             return current_pos.alt
         
-        target_wp = self.waypoints[self.current_waypoint_index]
-        return target_wp.alt
+        return float(self._wp_alt[self.current_waypoint_index])
 
 
 class LoiterController:
     """Loiter (circular orbit) controller"""
     
     def __init__(self, center: Position, radius: float = 50.0, clockwise: bool = True):
-        self.center = center
-        self.radius = radius  # meters
-        self.clockwise = clockwise
+        self._center = center
+        self._radius = radius  # meters
+        self._clockwise = clockwise
+        self._update_geometry()
+    
+    # center / radius / clockwise are properties: changing one recomputes the cached values below
+    @property
+    def center(self) -> Position:
+        return self._center
+    
+    @center.setter
+    def center(self, center: Position):
+        self._center = center
+        self._update_geometry()
+    
+    @property
+    def radius(self) -> float:
+        return self._radius
+    
+    @radius.setter
+    def radius(self, radius: float):
+        self._radius = radius
+        self._update_geometry()
+    
+    @property
+    def clockwise(self) -> bool:
+        return self._clockwise
+    
+    @clockwise.setter
+    def clockwise(self, clockwise: bool):
+        self._clockwise = clockwise
+        self._update_geometry()
+    
+    def _update_geometry(self):
+        """Center trig and bank angle, computed once per center/radius/direction change"""
+        self._center_lat = math.radians(self._center.lat)
+        self._center_lon = math.radians(self._center.lon)
+        self._sin_lat_center = math.sin(self._center_lat)
+        self._cos_lat_center = math.cos(self._center_lat)
+        
+        # Bank angle = atan(v^2 / (r * g)), assuming v = 15 m/s
+        v = 15.0
+        g = 9.81
+        self._bank_angle = math.degrees(math.atan(v**2 / (self._radius * g)))
+        if not self._clockwise:
+            self._bank_angle = -self._bank_angle
         
     def calculate_steering(self, current_pos: Position) -> Tuple[float, float]:
         """Calculate heading and bank to maintain loiter"""
         # Calculate bearing to center
-        bearing_to_center = NavigationAlgorithms.bearing(current_pos, self.center)
+        bearing_to_center = _bearing_trig(self._center_lon - current_pos.lon_rad,
+                                          current_pos.sin_lat, current_pos.cos_lat,
+                                          self._sin_lat_center, self._cos_lat_center)
         
-        # Calculate distance from center
-        distance_from_center = NavigationAlgorithms.distance(current_pos, self.center)
+        # Calculate distance from center (loiter radius is sub-km -> equirectangular)
+        distance_from_center = _distance_local_kernel(current_pos.lat_rad, current_pos.lon_rad,
+                                               self._center_lat, self._center_lon,
+                                               self._cos_lat_center)
         
         # Calculate tangent heading (perpendicular to radius)
         if self.clockwise:
@@ -196,7 +373,7 @@ class LoiterController:
         
         # Proportional control to maintain radius
         radius_error = distance_from_center - self.radius
-        correction_angle = np.clip(radius_error * 2.0, -30, 30)  # degrees
+        correction_angle = max(-30.0, min(30.0, radius_error * 2.0))  # degrees
         
         # Adjust heading based on radius error
         if radius_error > 0:  # Too far from center
@@ -204,17 +381,8 @@ class LoiterController:
         else:  # Too close to center
             desired_heading = (tangent_heading - correction_angle) % 360
         
-        # Calculate bank angle (for circular motion)
-        # Bank angle = atan(v^2 / (r * g))
-        # Assuming v = 15 m/s
-        v = 15.0
-        g = 9.81
-        bank_angle = math.degrees(math.atan(v**2 / (self.radius * g)))
-        
-        if not self.clockwise:
-            bank_angle = -bank_angle
-        
-        return desired_heading, bank_angle
+        # Bank angle for circular motion (precomputed)
+        return desired_heading, self._bank_angle
 
 
 class ObstacleAvoidance:
@@ -224,37 +392,40 @@ class ObstacleAvoidance:
         self.obstacle_threshold = obstacle_threshold  # meters
         self.max_avoidance_angle = max_avoidance_angle  # degrees
         
+    @staticmethod
+    def _obstacle_arrays(obstacles: Obstacles) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (lat, lon) radian arrays for the obstacles
+        Rebuilt on every call (N is small): a cache keyed on the list object would miss
+        in-place element replacement and silently use stale obstacle positions
+        """
+        if isinstance(obstacles, tuple) and isinstance(obstacles[0], np.ndarray):
+            # Already SoA (lats, lons, alts) in degrees
+            lats = np.radians(np.asarray(obstacles[0], dtype=np.float64))
+            lons = np.radians(np.asarray(obstacles[1], dtype=np.float64))
+            return lats, lons
+        
+        n = len(obstacles)
+        lats = np.radians(np.fromiter((o.lat for o in obstacles), dtype=np.float64, count=n))
+        lons = np.radians(np.fromiter((o.lon for o in obstacles), dtype=np.float64, count=n))
+        return lats, lons
+        
     def calculate_avoidance_vector(self, current_pos: Position, 
-                                   obstacles: List[Position]) -> Tuple[float, float]:
+                                   obstacles: Obstacles) -> Tuple[float, float]:
         """
         Calculate avoidance heading correction
+        obstacles: List[Position] or (lats, lons, alts) arrays in degrees
         Returns: (avoidance_heading_correction, urgency_factor)
         """
         if not obstacles:
             return 0.0, 0.0
         
-        # Calculate repulsive force from obstacles
-        total_force_x = 0.0
-        total_force_y = 0.0
+        obs_lat, obs_lon = self._obstacle_arrays(obstacles)
         
-        for obstacle in obstacles:
-            distance = NavigationAlgorithms.distance(current_pos, obstacle)
-            
-            if distance < self.obstacle_threshold:
-                # Calculate repulsive force (inverse square law)
-                force_magnitude = (self.obstacle_threshold - distance) / self.obstacle_threshold
-                force_magnitude = force_magnitude ** 2
-                
-                # Direction away from obstacle
-                bearing_to_obstacle = NavigationAlgorithms.bearing(current_pos, obstacle)
-                away_bearing = (bearing_to_obstacle + 180) % 360
-                
-                # Convert to x, y components
-                force_x = force_magnitude * math.cos(math.radians(away_bearing))
-                force_y = force_magnitude * math.sin(math.radians(away_bearing))
-                
-                total_force_x += force_x
-                total_force_y += force_y
+        # Repulsive force (inverse square law) summed over obstacles inside the threshold
+        total_force_x, total_force_y = _avoidance_force(
+            current_pos.lat_rad, current_pos.lon_rad, current_pos.sin_lat, current_pos.cos_lat,
+            obs_lat, obs_lon, self.obstacle_threshold)
         
         if total_force_x == 0 and total_force_y == 0:
             return 0.0, 0.0
@@ -264,9 +435,8 @@ class ObstacleAvoidance:
         avoidance_magnitude = math.sqrt(total_force_x**2 + total_force_y**2)
         
         # Clamp avoidance angle
-        avoidance_correction = np.clip(avoidance_angle, 
-                                      -self.max_avoidance_angle, 
-                                      self.max_avoidance_angle)
+        avoidance_correction = max(-self.max_avoidance_angle,
+                                   min(self.max_avoidance_angle, avoidance_angle))
         
         return avoidance_correction, min(avoidance_magnitude, 1.0)
 
@@ -277,31 +447,88 @@ class WindEstimator:
     def __init__(self):
         self.wind_vx = 0.0  # m/s north
         self.wind_vy = 0.0  # m/s east
-        self.samples = []
+        
+        # Moving-average window as a fixed ring buffer of (vx, vy)
+        self.window_size = 10
+        self._buf = np.zeros((self.window_size, 2), dtype=np.float64)
+        self._idx = 0
+        self._n = 0
+        
+        # Running sums -> O(1) average, re-summed from the buffer periodically to cancel FP drift
+        self._sum_vx = 0.0
+        self._sum_vy = 0.0
+        self._updates = 0
+        self._resum_interval = 1000
         
     def update(self, ground_velocity: Velocity, airspeed: float, heading: float):
         """Update wind estimate"""
         # Airspeed vector
-        air_vx = airspeed * math.cos(math.radians(heading))
-        air_vy = airspeed * math.sin(math.radians(heading))
+        heading_rad = math.radians(heading)
+        air_vx = airspeed * math.cos(heading_rad)
+        air_vy = airspeed * math.sin(heading_rad)
         
         # Wind = Ground velocity - Air velocity
         wind_vx = ground_velocity.vx - air_vx
         wind_vy = ground_velocity.vy - air_vy
         
         # Moving average filter
-        self.samples.append((wind_vx, wind_vy))
-        if len(self.samples) > 10:
-            self.samples.pop(0)
+        buf, idx = self._buf, self._idx
+        old_vx, old_vy = buf[idx].tolist()
+        buf[idx] = (wind_vx, wind_vy)
+        self._idx = (idx + 1) % self.window_size
+        if self._n < self.window_size:
+            self._n += 1
+        
+        self._updates += 1
+        if self._updates % self._resum_interval == 0:
+            self._sum_vx, self._sum_vy = buf[:self._n].sum(axis=0).tolist()
+        else:
+            self._sum_vx += wind_vx - old_vx
+            self._sum_vy += wind_vy - old_vy
         
-        self.wind_vx = sum(s[0] for s in self.samples) / len(self.samples)
-        self.wind_vy = sum(s[1] for s in self.samples) / len(self.samples)
+        inv_n = 1.0 / self._n
+        self.wind_vx = self._sum_vx * inv_n
+        self.wind_vy = self._sum_vy * inv_n
+    
+    def update_batch(self, ground_vx: np.ndarray, ground_vy: np.ndarray,
+                     airspeed: np.ndarray, heading: np.ndarray):
+        """
+        Update wind estimate with a burst of samples (same result as calling update() per sample)
+        ground_vx/ground_vy: m/s north/east, airspeed: m/s (array or scalar), heading: degrees
+        """
+        heading_rad = np.radians(np.asarray(heading, dtype=np.float64))
+        airspeed = np.asarray(airspeed, dtype=np.float64)
+        
+        # Wind = Ground velocity - Air velocity, for all samples in one pass
+        wind_vx = np.asarray(ground_vx, dtype=np.float64) - airspeed * np.cos(heading_rad)
+        wind_vy = np.asarray(ground_vy, dtype=np.float64) - airspeed * np.sin(heading_rad)
+        
+        count = wind_vx.size
+        if count == 0:
+            return
+        
+        # Only the newest window_size samples survive in the ring buffer
+        w = self.window_size
+        m = min(count, w)
+        slots = (self._idx + count - m + np.arange(m)) % w
+        self._buf[slots, 0] = wind_vx[-m:]
+        self._buf[slots, 1] = wind_vy[-m:]
+        
+        self._idx = (self._idx + count) % w
+        self._n = min(self._n + count, w)
+        self._updates += count
+        
+        # Re-sum from the buffer (O(window), also resets FP drift)
+        self._sum_vx, self._sum_vy = self._buf[:self._n].sum(axis=0).tolist()
+        inv_n = 1.0 / self._n
+        self.wind_vx = self._sum_vx * inv_n
+        self.wind_vy = self._sum_vy * inv_n
     
     def get_wind_speed_direction(self) -> Tuple[float, float]:
         """Get wind speed and direction"""
         speed = math.sqrt(self.wind_vx**2 + self.wind_vy**2)
         direction = math.degrees(math.atan2(self.wind_vy, self.wind_vx))
-        direction = (direction + 360) % 360
+        direction %= 360
         
         return speed, direction
 
@@ -40,7 +40,8 @@ from loguru import logger
 try:
     from ..safety.gps_denial_handler import (
         GPSState, EscapeAction, GPSReading, IMUReading,
-        DeadReckonPosition, GPSAnomalyDetector, DeadReckoningNavigator
+        DeadReckonPosition, GPSAnomalyDetector, DeadReckoningNavigator,
+        summarize_denial_events
     )
 except ImportError:
     # Fallback for direct execution
@@ -49,7 +50,19 @@ except ImportError:
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from safety.gps_denial_handler import (
         GPSState, EscapeAction, GPSReading, IMUReading,
-        DeadReckonPosition, GPSAnomalyDetector, DeadReckoningNavigator
+        DeadReckonPosition, GPSAnomalyDetector, DeadReckoningNavigator,
+        summarize_denial_events
+    )
+
+try:
+    from ._ekf_kernels import (
+        _predict_kernel, _predict_batch_kernel, _update_kernel, _mag_update_kernel,
+        _qnormalize, _quat_to_rot, _quat_to_euler
+    )
+except ImportError:
+    from navigation._ekf_kernels import (
+        _predict_kernel, _predict_batch_kernel, _update_kernel, _mag_update_kernel,
+        _qnormalize, _quat_to_rot, _quat_to_euler
     )
 
 
@@ -64,6 +77,7 @@ class GPSDenialEvent:
     escape_action: EscapeAction
     max_dr_error: float
     recovered: bool
+    end_position: Optional[Tuple[float, float, float]] = None  # lat, lon, alt khi GPS phục hồi
 
 
 class ExtendedKalmanFilter:
@@ -83,6 +97,8 @@ class ExtendedKalmanFilter:
     
     def __init__(self):
         # State vector (15x1)
+        # float64: với float32, vị trí lệch ~2.4 cm sau 60 s propagate ở 15 m/s (ulp ~6e-5 m ở 900 m),
+        # còn kernel 15x15 compiled không nhanh hơn - EKF chỉ ~2 KB, nằm gọn trong L1
         self.state = np.zeros(15)
         self.state[6] = 1.0  # q0 = 1 (no rotation)
         
@@ -95,7 +111,10 @@ class ExtendedKalmanFilter:
         # Measurement noise covariance
         self.R_gps = np.eye(3) * 1.0  # GPS position noise
         self.R_vel = np.eye(3) * 0.1  # GPS velocity noise
-        self.R_mag = np.eye(3) * 0.05  # Magnetometer noise
+        self.R_mag = np.eye(3) * 0.05  # Magnetometer noise (hướng trường, chỉ dùng đường chéo)
+        
+        # Trường từ tham chiếu (NED, vector đơn vị): Hà Nội, inclination ~30° hướng xuống
+        self.mag_reference = np.array([math.cos(math.radians(30.0)), 0.0, math.sin(math.radians(30.0))])
         
         # Time
         self.last_update = time.time()
@@ -108,6 +127,27 @@ class ExtendedKalmanFilter:
         self.wind_n = 0.0
         self.wind_e = 0.0
         
+        # Scratch buffers, allocated once and reused every step (nothing allocated in the 50 Hz loop):
+        # 15x15 (symmetrization / K H P), P H^T, gain K, S, H P, the GPS measurement vector and IMU inputs
+        self._tmp15 = np.empty((15, 15))
+        self._PHt = np.empty((15, 3))
+        self._K = np.empty((15, 3))
+        self._S = np.empty((3, 3))
+        self._HP = np.empty((3, 15))
+        self._z_gps = np.zeros(3)
+        self._imu_accel = np.empty(3)
+        self._imu_gyro = np.empty(3)
+        
+        # P = 0.5 * (P + P^T) every ~1 s (50 predicts at 50 Hz) against asymmetry drift
+        self._symmetrize_interval = 50
+        self._predict_count = 0
+        
+        # Cache confidence/attitude (telemetry đọc get_status 10+ Hz): chỉ tính lại khi state/P đổi.
+        # Code ghi trực tiếp vào state/P từ bên ngoài phải đặt lại _cache_dirty = True
+        self._cache_dirty = True
+        self._cached_confidence = 0.0
+        self._cached_attitude = (0.0, 0.0, 0.0)
+        
         logger.info("Extended Kalman Filter initialized")
     
     def predict(self, imu_data: IMUReading, dt: float):
@@ -118,52 +158,42 @@ class ExtendedKalmanFilter:
             imu_data: IMU reading
             dt: Time step (seconds)
         """
-        # Extract state
-        pos = self.state[0:3]
-        vel = self.state[3:6]
-        quat = self.state[6:10]
-        accel_bias = self.state[10:13]
-        gyro_bias = self.state[13:16] if len(self.state) > 15 else np.zeros(3)  # Handle 15-state
-        
-        # IMU measurements (remove bias)
-        accel = np.array([imu_data.accel_x, imu_data.accel_y, imu_data.accel_z]) - accel_bias
-        gyro = np.array([imu_data.roll_rate, imu_data.pitch_rate, imu_data.yaw_rate]) - gyro_bias
+        # IMU measurements into the preallocated buffers (bias removed inside the kernel)
+        accel, gyro = self._imu_accel, self._imu_gyro
+        accel[0], accel[1], accel[2] = imu_data.accel_x, imu_data.accel_y, imu_data.accel_z
+        gyro[0], gyro[1], gyro[2] = imu_data.roll_rate, imu_data.pitch_rate, imu_data.yaw_rate
         
-        # Normalize quaternion
-        quat = quat / np.linalg.norm(quat)
+        # State prediction + covariance P = F P F^T + Q in one compiled call
+        _predict_kernel(self.state, self.P, accel, gyro, dt, self.Q)
+        self._cache_dirty = True
         
-        # Rotation matrix từ quaternion
-        R = self._quat_to_rot(quat)
+        self._predict_count += 1
+        if self._predict_count >= self._symmetrize_interval:
+            self._predict_count = 0
+            np.add(self.P, self.P.T, out=self._tmp15)
+            np.multiply(self._tmp15, 0.5, out=self.P)
         
-        # Transform acceleration từ body frame sang NED frame
-        accel_ned = R @ accel
-        accel_ned[2] += 9.81  # Add gravity
-        
-        # State prediction
-        # Position: p = p + v*dt + 0.5*a*dt^2
-        pos_pred = pos + vel * dt + 0.5 * accel_ned * dt**2
-        
-        # Velocity: v = v + a*dt
-        vel_pred = vel + accel_ned * dt
-        
-        # Attitude: quaternion integration
-        quat_pred = self._integrate_quaternion(quat, gyro, dt)
-        
-        # Bias prediction (assume constant)
-        accel_bias_pred = accel_bias
-        
-        # Update state
-        self.state[0:3] = pos_pred
-        self.state[3:6] = vel_pred
-        self.state[6:10] = quat_pred
-        self.state[10:13] = accel_bias_pred
-        # Note: gyro_bias at indices 13:16 if state size > 15
+        self.last_update = time.time()
+    
+    @staticmethod
+    def predict_batch(states: np.ndarray, covariances: np.ndarray, imu: np.ndarray,
+                      dts: np.ndarray, Q: np.ndarray):
+        """
+        Prediction cho nhiều EKF độc lập cùng lúc (replay log IMU, Monte-Carlo tuning)
         
-        # Update covariance (simplified)
-        F = self._compute_jacobian(quat, accel, gyro, dt)
-        self.P = F @ self.P @ F.T + self.Q
+        Mỗi filter giống hệt predict(); các filter chạy song song trên nhiều core khi có Numba
         
-        self.last_update = time.time()
+        Args:
+            states: (B, 15) float64 C-contiguous, cập nhật tại chỗ
+            covariances: (B, 15, 15) float64 C-contiguous, cập nhật tại chỗ
+            imu: (B, 10) IMU readings theo thứ tự field của IMUReading
+            dts: (B,) time steps (seconds)
+            Q: (15, 15) process noise covariance
+        """
+        _predict_batch_kernel(states, covariances,
+                              np.ascontiguousarray(imu, dtype=np.float64),
+                              np.ascontiguousarray(dts, dtype=np.float64),
+                              np.ascontiguousarray(Q, dtype=np.float64))
     
     def update_gps(self, gps_data: GPSReading):
         """
@@ -174,23 +204,11 @@ class ExtendedKalmanFilter:
         """
         # Convert GPS to NED (simplified - need proper conversion)
         # For now, assume direct measurement
-        z_pos = np.array([0, 0, -gps_data.alt])  # Simplified
+        z_pos = self._z_gps  # [0, 0, -alt] - Simplified
+        z_pos[2] = -gps_data.alt
         
         # Measurement model: H = [I3x3, 0]
-        H = np.zeros((3, 15))
-        H[0:3, 0:3] = np.eye(3)
-        
-        # Innovation
-        y = z_pos - self.state[0:3]
-        S = H @ self.P @ H.T + self.R_gps
-        K = self.P @ H.T @ np.linalg.inv(S)
-        
-        # Update state and covariance
-        self.state = self.state + K @ y
-        self.P = (np.eye(15) - K @ H) @ self.P
-        
-        # Normalize quaternion
-        self.state[6:10] = self.state[6:10] / np.linalg.norm(self.state[6:10])
+        self._block_update(z_pos, 0, self.R_gps)
     
     def update_velocity(self, velocity_ned: np.ndarray):
         """
@@ -199,35 +217,46 @@ class ExtendedKalmanFilter:
         Args:
             velocity_ned: Velocity in NED frame [vn, ve, vd]
         """
-        H = np.zeros((3, 15))
-        H[0:3, 3:6] = np.eye(3)
-        
-        y = velocity_ned - self.state[3:6]
-        S = H @ self.P @ H.T + self.R_vel
-        K = self.P @ H.T @ np.linalg.inv(S)
-        
-        self.state = self.state + K @ y
-        self.P = (np.eye(15) - K @ H) @ self.P
-        self.state[6:10] = self.state[6:10] / np.linalg.norm(self.state[6:10])
+        # Measurement model: H = [0, I3x3, 0]
+        self._block_update(velocity_ned, 3, self.R_vel)
     
-    def update_magnetometer(self, mag_ned: np.ndarray):
+    def update_magnetometer(self, mag_body: np.ndarray):
         """
         Update step với magnetometer data
         
+        Measurement model: h(q) = R(q)^T * mag_reference (trường từ trong body frame),
+        so sánh theo hướng (phép đo được chuẩn hóa, không phụ thuộc đơn vị µT/gauss)
+        
         Args:
-            mag_ned: Magnetic field in NED frame
+            mag_body: Magnetic field đo được trong body frame
         """
-        # Simplified - actual implementation needs proper magnetometer model
-        H = np.zeros((3, 15))
-        H[0:3, 6:9] = np.eye(3) * 0.1  # Affect quaternion
+        # H = dh/dq (3x4, chỉ cột quaternion 6:10) -> 3 update vô hướng rank-1, không nghịch đảo 3x3
+        _mag_update_kernel(self.state, self.P, np.asarray(mag_body, dtype=np.float64),
+                           self.mag_reference, self.R_mag, self._tmp15)
+        self._cache_dirty = True
+    
+    def _block_update(self, z: np.ndarray, offset: int, R: np.ndarray):
+        """
+        Update chung cho phép đo 3 chiều của state[offset:offset+3]
         
-        y = mag_ned - self.state[6:9]
-        S = H @ self.P @ H.T + self.R_mag
-        K = self.P @ H.T @ np.linalg.inv(S)
+        H = [0 .. I3x3 .. 0] chỉ là selector -> kernel dùng slice của P thay vì
+        nhân ma trận H 3x15 dày (~98% phần tử bằng 0)
+        """
+        # Innovation, gain and state/covariance update (quaternion normalized in _finalize)
+        _update_kernel(self.state, self.P, np.asarray(z, dtype=np.float64), offset, R,
+                       self._PHt, self._K, self._S, self._HP, self._tmp15)
+        self._cache_dirty = True
+    
+    def _finalize(self):
+        """
+        Chuẩn hóa quaternion một lần sau tất cả các update trong một chu kỳ
         
-        self.state = self.state + K @ y
-        self.P = (np.eye(15) - K @ H) @ self.P
-        self.state[6:10] = self.state[6:10] / np.linalg.norm(self.state[6:10])
+        Các update_* không tự chuẩn hóa (GPS + velocity cùng chu kỳ -> một lần thay vì hai).
+        predict() chuẩn hóa quaternion đầu vào, nên vòng 50 Hz không cần gọi thêm;
+        caller phải gọi _finalize() trước khi đọc attitude nếu đã update mà chưa predict
+        """
+        _qnormalize(self.state[6:10])
+        self._cache_dirty = True
     
     def get_position(self) -> Tuple[float, float, float]:
         """Get estimated position (lat, lon, alt)"""
@@ -241,14 +270,9 @@ class ExtendedKalmanFilter:
     
     def get_attitude(self) -> Tuple[float, float, float]:
         """Get estimated attitude (roll, pitch, yaw) in radians"""
-        q0, q1, q2, q3 = self.state[6:10]
-        
-        # Convert quaternion to Euler angles
-        roll = math.atan2(2*(q0*q1 + q2*q3), 1 - 2*(q1**2 + q2**2))
-        pitch = math.asin(2*(q0*q2 - q3*q1))
-        yaw = math.atan2(2*(q0*q3 + q1*q2), 1 - 2*(q2**2 + q3**2))
-        
-        return (roll, pitch, yaw)
+        if self._cache_dirty:
+            self._refresh_cache()
+        return self._cached_attitude
     
     def get_wind_estimate(self) -> Tuple[float, float]:
         """
@@ -270,69 +294,27 @@ class ExtendedKalmanFilter:
         
         Dựa trên covariance matrix trace
         """
-        pos_cov = np.trace(self.P[0:3, 0:3])
-        max_pos_cov = 100.0  # meters^2
-        confidence = max(0.0, 1.0 - pos_cov / max_pos_cov)
-        return min(1.0, confidence)
+        if self._cache_dirty:
+            self._refresh_cache()
+        return self._cached_confidence
     
-    def _quat_to_rot(self, q: np.ndarray) -> np.ndarray:
-        """Convert quaternion to rotation matrix"""
-        q0, q1, q2, q3 = q
-        
-        R = np.array([
-            [1 - 2*(q2**2 + q3**2), 2*(q1*q2 - q0*q3), 2*(q1*q3 + q0*q2)],
-            [2*(q1*q2 + q0*q3), 1 - 2*(q1**2 + q3**2), 2*(q2*q3 - q0*q1)],
-            [2*(q1*q3 - q0*q2), 2*(q2*q3 + q0*q1), 1 - 2*(q1**2 + q2**2)]
-        ])
-        
-        return R
-    
-    def _integrate_quaternion(self, q: np.ndarray, omega: np.ndarray, dt: float) -> np.ndarray:
-        """Integrate quaternion với angular velocity"""
-        omega_norm = np.linalg.norm(omega)
-        if omega_norm < 1e-6:
-            return q
+    def _refresh_cache(self):
+        """Tính lại các đại lượng dẫn xuất (attitude, confidence) sau predict/update"""
+        state, P = self.state, self.P
         
-        axis = omega / omega_norm
-        angle = omega_norm * dt
-        
-        # Quaternion delta
-        dq0 = math.cos(angle / 2)
-        dq_vec = axis * math.sin(angle / 2)
-        dq = np.array([dq0, dq_vec[0], dq_vec[1], dq_vec[2]])
-        
-        # Quaternion multiplication
-        q0, q1, q2, q3 = q
-        dq0, dq1, dq2, dq3 = dq
+        # Convert quaternion to Euler angles
+        self._cached_attitude = _quat_to_euler(state[6], state[7], state[8], state[9])
         
-        q_new = np.array([
-            dq0*q0 - dq1*q1 - dq2*q2 - dq3*q3,
-            dq0*q1 + dq1*q0 + dq2*q3 - dq3*q2,
-            dq0*q2 - dq1*q3 + dq2*q0 + dq3*q1,
-            dq0*q3 + dq1*q2 - dq2*q1 + dq3*q0
-        ])
+        pos_cov = P[0, 0] + P[1, 1] + P[2, 2]
+        max_pos_cov = 100.0  # meters^2
+        confidence = max(0.0, 1.0 - pos_cov / max_pos_cov)
+        self._cached_confidence = min(1.0, confidence)
         
-        return q_new / np.linalg.norm(q_new)
+        self._cache_dirty = False
     
-    def _compute_jacobian(self, q: np.ndarray, accel: np.ndarray, gyro: np.ndarray, dt: float) -> np.ndarray:
-        """
-        Compute state transition Jacobian (simplified)
-        
-        In real implementation, need proper Jacobian
-        """
-        F = np.eye(15)
-        
-        # Position depends on velocity
-        F[0:3, 3:6] = np.eye(3) * dt
-        
-        # Velocity depends on attitude (through rotation matrix)
-        # Simplified linearization
-        F[3:6, 6:10] = np.eye(3, 4) * 0.1 * dt
-        
-        # Attitude depends on gyro
-        F[6:10, 13:16] = np.eye(4, 3) * 0.5 * dt
-        
-        return F
+    def _quat_to_rot(self, q: np.ndarray) -> np.ndarray:
+        """Convert quaternion to rotation matrix"""
+        return _quat_to_rot(np.asarray(q, dtype=np.float64))
 
 
 class EKFIntegratedDeadReckoningNavigator(DeadReckoningNavigator):
@@ -355,6 +337,9 @@ class EKFIntegratedDeadReckoningNavigator(DeadReckoningNavigator):
         self.error_growth_rate = 0.5  # m/s (reduced from 2.0)
         self.confidence_decay_rate = 0.01  # per second (reduced from 0.02)
         
+        # Thời điểm log vị trí tiếp theo (mỗi 5 s) - một phép so sánh float mỗi tick 50 Hz
+        self._next_log_time = 0.0
+        
         logger.info("EKF-Integrated Dead Reckoning Navigator initialized")
     
     def start_dead_reckoning(self, last_gps: GPSReading, 
@@ -377,6 +362,10 @@ class EKFIntegratedDeadReckoningNavigator(DeadReckoningNavigator):
         yaw = heading_rad
         cy, sy = math.cos(yaw/2), math.sin(yaw/2)
         self.ekf.state[6:10] = np.array([cy, 0, 0, sy])  # Quaternion for yaw only
+        self.ekf._cache_dirty = True
+        
+        # Log ngay lần update đầu tiên của đợt DR mới
+        self._next_log_time = 0.0
         
         logger.info("EKF initialized for Dead Reckoning")
     
@@ -398,7 +387,8 @@ class EKFIntegratedDeadReckoningNavigator(DeadReckoningNavigator):
         dt = 0.02  # 50Hz
         
         if self.use_ekf:
-            # Update EKF prediction với IMU
+            # Update EKF prediction với IMU (predict chuẩn hóa quaternion - một lần mỗi chu kỳ 20 ms,
+            # gồm cả các update đo được gộp vào từ chu kỳ trước)
             self.ekf.predict(imu, dt)
             
             # Get EKF estimates
@@ -434,10 +424,11 @@ class EKFIntegratedDeadReckoningNavigator(DeadReckoningNavigator):
             # Fallback to original DR nếu không dùng EKF
             return super().update(imu, airspeed)
         
-        # Log periodically
-        if int(self.time_since_gps) % 5 == 0 and int(self.time_since_gps * 10) % 50 == 0:
+        # Log periodically (every 5 s)
+        if current_time >= self._next_log_time:
             logger.info(f"EKF-DR Position: ({self.current_lat:.6f}, {self.current_lon:.6f}), "
                        f"Error: ±{self.estimated_error:.0f}m, Confidence: {self.confidence:.0%}")
+            self._next_log_time = current_time + 5.0
         
         return DeadReckonPosition(
             lat=self.current_lat,
@@ -548,6 +539,7 @@ class EKFIntegratedGPSDenialHandler:
         
         # Update EKF với GPS
         self.ekf.update_gps(reading)
+        self.ekf._finalize()
         
         # Check for anomalies
         is_anomaly, score, reason = self.detector.update_gps(reading)
@@ -686,11 +678,13 @@ class EKFIntegratedGPSDenialHandler:
         if self.current_event:
             self.current_event.end_time = time.time()
             self.current_event.recovered = True
+            self.current_event.end_position = (gps.lat, gps.lon, gps.alt)
             self.denial_events.append(self.current_event)
             self.current_event = None
         
-        # Update EKF với recovered GPS
+        # Update EKF với recovered GPS (cùng với update trong stop_dead_reckoning: chuẩn hóa một lần)
         self.ekf.update_gps(gps)
+        self.ekf._finalize()
         
         # Alert pilot với EKF performance
         duration = time.time() - self.navigator.dr_start_time if self.navigator.dr_start_time else 0
@@ -755,6 +749,10 @@ class EKFIntegratedGPSDenialHandler:
             "dr_time": time.time() - self.navigator.dr_start_time if self.navigator.is_active else 0,
             "total_denial_events": len(self.denial_events)
         }
+    
+    def get_denial_summary(self) -> Dict:
+        """Tổng hợp các denial event đã kết thúc (phân tích sau bay)"""
+        return summarize_denial_events(self.denial_events)
 
 
 # ============================================================================
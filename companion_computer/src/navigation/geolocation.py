@@ -16,8 +16,15 @@ Các giả định này có thể được thay đổi trong các hằng số b
 """
 
 import math
+import numbers
 import numpy as np
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, List
+
+# Try relative import first, then absolute (direct execution)
+try:
+    from ._geo_kernels import _geolocate_ray, _geolocate_frame, _INV_EARTH_R_DEG
+except ImportError:
+    from _geo_kernels import _geolocate_ray, _geolocate_frame, _INV_EARTH_R_DEG
 
 # --- Cấu hình có thể thay đổi ---
 # Thông số camera (cho Raspberry Pi Camera Module v1)
@@ -30,6 +37,10 @@ CAMERA_ROLL_DEG = 0.0
 CAMERA_YAW_DEG = 0.0
 # ---------------------------------
 
+# FOV theo radian - tính một lần lúc import (như ma trận gắn camera bên dưới)
+_HFOV_RAD = math.radians(CAMERA_HFOV_DEG)
+_VFOV_RAD = math.radians(CAMERA_VFOV_DEG)
+
 def get_target_geolocation(
     detection_result: Dict[str, Any],
     uav_telemetry: Dict[str, Any],
@@ -48,94 +59,132 @@ def get_target_geolocation(
     Returns:
         Một dict chứa 'lat' và 'lon' của mục tiêu, hoặc None nếu không thể tính toán.
     """
-    try:
-        # Lấy các giá trị cần thiết từ telemetry
-        uav_lat = uav_telemetry.get('lat')
-        uav_lon = uav_telemetry.get('lon')
-        uav_alt_msl = uav_telemetry.get('alt') # Altitude Mean Sea Level
-        
-        # Radian
-        uav_roll_rad = math.radians(uav_telemetry.get('roll', 0))
-        uav_pitch_rad = math.radians(uav_telemetry.get('pitch', 0))
-        uav_yaw_rad = math.radians(uav_telemetry.get('yaw', 0))
-        
-        if any(v is None for v in [uav_lat, uav_lon, uav_alt_msl]):
-            return None
-
-        # Lấy trung tâm của bounding box làm điểm mục tiêu trong ảnh
-        bbox = detection_result['bbox']
-        target_px = (bbox[0] + bbox[2]) / 2
-        target_py = (bbox[1] + bbox[3]) / 2
-
-        # 1. Chuyển đổi tọa độ pixel thành góc trong hệ quy chiếu camera
-        # Góc lệch ngang và dọc so với quang tâm của camera
-        angle_x_rad = math.radians(((target_px / image_width) - 0.5) * CAMERA_HFOV_DEG)
-        angle_y_rad = math.radians(((target_py / image_height) - 0.5) * CAMERA_VFOV_DEG)
-
-        # 2. Tạo vector chỉ hướng từ camera đến mục tiêu trong hệ quy chiếu camera
-        # (X: phải, Y: dưới, Z: trước)
-        cam_vector = np.array([
-            math.tan(angle_x_rad),
-            math.tan(angle_y_rad),
-            1.0
-        ])
-        cam_vector /= np.linalg.norm(cam_vector)
-
-        # 3. Xoay vector từ hệ quy chiếu camera sang hệ quy chiếu thân máy bay (body frame)
-        # (X: trước, Y: phải, Z: dưới)
-        
-        # Ma trận xoay cho góc gắn camera
-        cam_pitch_rad = math.radians(CAMERA_PITCH_DEG)
-        cam_roll_rad = math.radians(CAMERA_ROLL_DEG)
-        cam_yaw_rad = math.radians(CAMERA_YAW_DEG)
-
-        R_cam_to_body = _euler_to_rotation_matrix(cam_roll_rad, cam_pitch_rad, cam_yaw_rad)
-        
-        # Chuyển đổi hệ quy chiếu từ camera (OpenCV) sang body (aerospace)
-        # OpenCV (X-phải, Y-dưới, Z-trước) -> Aerospace (X-trước, Y-phải, Z-dưới)
-        # x_aero = z_cv, y_aero = x_cv, z_aero = y_cv
-        cam_vector_aerospace = np.array([cam_vector[2], cam_vector[0], cam_vector[1]])
-        
-        body_vector = R_cam_to_body @ cam_vector_aerospace
-
-        # 4. Xoay vector từ hệ quy chiếu thân máy bay sang hệ quy chiếu Trái Đất (NED: North-East-Down)
-        R_body_to_ned = _euler_to_rotation_matrix(uav_roll_rad, uav_pitch_rad, uav_yaw_rad)
-        ned_vector = R_body_to_ned @ body_vector
-
-        # 5. Tính toán giao điểm của vector chỉ hướng và mặt đất
-        # Giả định mặt đất ở độ cao 0m so với mực nước biển (MSL)
-        target_alt_msl = 0.0
-        
-        # Kiểm tra xem vector có hướng xuống không, nếu không sẽ không bao giờ cắt mặt đất
-        if ned_vector[2] <= 0:
-            return None # Vector hướng lên hoặc song song mặt đất
-
-        # Tính khoảng cách trên mặt đất (ground distance)
-        # d = h / cos(theta) = h / (vector_z)
-        # scale = h / vector_z
-        scale = (uav_alt_msl - target_alt_msl) / ned_vector[2]
-        
-        # Giao điểm trong hệ NED so với UAV
-        north_offset = ned_vector[0] * scale
-        east_offset = ned_vector[1] * scale
-
-        # 6. Chuyển đổi offset (mét) thành chênh lệch lat/lon
-        earth_radius = 6378137.0
-        
-        d_lat = north_offset / earth_radius
-        d_lon = east_offset / (earth_radius * math.cos(math.radians(uav_lat)))
-
-        # 7. Tính tọa độ GPS cuối cùng của mục tiêu
-        target_lat = uav_lat + math.degrees(d_lat)
-        target_lon = uav_lon + math.degrees(d_lon)
-
-        return {'lat': target_lat, 'lon': target_lon}
-
-    except Exception as e:
-        # Ghi log lỗi nếu có vấn đề trong quá trình tính toán
-        # import traceback; traceback.print_exc()
+    # Kiểm tra tường minh các trường hợp không tính được (không bọc try/except ở hot path:
+    # lỗi thật như kiểu dữ liệu sai sẽ được báo thay vì bị nuốt thành None)
+    bbox = detection_result.get('bbox')
+    if bbox is None or len(bbox) < 4:
         return None
 
+    # Telemetry thiếu/không phải số hoặc kích thước ảnh không hợp lệ -> geolocate_bbox trả về None
+    return geolocate_bbox(bbox, *_unpack_telemetry(uav_telemetry), image_width, image_height)
+
+
+def _unpack_telemetry(uav_telemetry: Dict[str, Any]) -> Tuple:
+    """
+    Đọc telemetry dict một lần -> (lat, lon, alt, roll, pitch, yaw) (độ, alt là MSL).
+    Attitude thiếu -> 0; các entry point theo frame gọi một lần rồi chỉ truyền scalar xuống.
+    """
+    get = uav_telemetry.get
+    return (get('lat'), get('lon'), get('alt'),
+            get('roll') or 0, get('pitch') or 0, get('yaw') or 0)
+
+
+def _valid_inputs(uav_lat, uav_lon, uav_alt_msl, uav_roll_deg, uav_pitch_deg, uav_yaw_deg,
+                  image_width, image_height) -> bool:
+    """
+    Kiểm tra đầu vào trước khi gọi kernel: lat/lon/alt và attitude là số thực
+    (attitude None coi như 0), kích thước ảnh là số dương.
+    Kernel Numba có signature cố định -> kiểu sai sẽ ném TypeError, ảnh 0 pixel -> chia cho 0
+    """
+    for value in (uav_lat, uav_lon, uav_alt_msl):
+        if not isinstance(value, numbers.Real):
+            return False
+    for value in (uav_roll_deg, uav_pitch_deg, uav_yaw_deg):
+        if value is not None and not isinstance(value, numbers.Real):
+            return False
+    return (isinstance(image_width, numbers.Real) and isinstance(image_height, numbers.Real)
+            and image_width > 0 and image_height > 0)
+
+
+def get_target_geolocations_for_frame(
+    detection_results: List[Dict[str, Any]],
+    uav_telemetry: Dict[str, Any],
+    image_width: int,
+    image_height: int
+) -> List[Optional[Dict[str, float]]]:
+    """
+    get_target_geolocation cho tất cả detections của một frame.
+
+    Attitude UAV dùng chung cho cả frame -> ma trận camera->NED
+    (R_body_to_ned @ _R_CAM_TO_BODY_PERM) chỉ dựng một lần, mỗi detection chỉ còn
+    một phép xoay 3x3 trong kernel _geolocate_frame.
+
+    Returns:
+        List cùng thứ tự với detection_results: dict {'lat', 'lon'} hoặc None
+        (thiếu bbox, tia không cắt mặt đất, telemetry thiếu/không phải số
+        hoặc kích thước ảnh không hợp lệ)
+    """
+    uav_lat, uav_lon, uav_alt_msl, roll_deg, pitch_deg, yaw_deg = _unpack_telemetry(uav_telemetry)
+    if not _valid_inputs(uav_lat, uav_lon, uav_alt_msl, roll_deg, pitch_deg, yaw_deg,
+                         image_width, image_height):
+        return [None] * len(detection_results)
+
+    indices = [k for k, det in enumerate(detection_results) if det.get('bbox') is not None]
+    results: List[Optional[Dict[str, float]]] = [None] * len(detection_results)
+    if not indices:
+        return results
+
+    bboxes = np.array([detection_results[k]['bbox'] for k in indices], dtype=np.float64).reshape(-1, 4)
+    target_px = (bboxes[:, 0] + bboxes[:, 2]) * 0.5
+    target_py = (bboxes[:, 1] + bboxes[:, 3]) * 0.5
+
+    R_total = _euler_to_rotation_matrix(
+        math.radians(roll_deg), math.radians(pitch_deg), math.radians(yaw_deg)) @ _R_CAM_TO_BODY_PERM
+
+    out = np.empty((len(indices), 2))
+    _geolocate_frame(target_px, target_py, float(image_width), float(image_height),
+                     _HFOV_RAD, _VFOV_RAD,
+                     float(uav_lat), float(uav_lon), float(uav_alt_msl), R_total, out)
+
+    for k, (lat, lon) in zip(indices, out.tolist()):
+        if lat == lat:  # NaN -> tia không cắt mặt đất
+            results[k] = {'lat': lat, 'lon': lon}
+    return results
+
+
+def geolocate_bbox(
+    bbox,
+    uav_lat: float,
+    uav_lon: float,
+    uav_alt_msl: float,
+    uav_roll_deg: float,
+    uav_pitch_deg: float,
+    uav_yaw_deg: float,
+    image_width: int,
+    image_height: int
+) -> Optional[Dict[str, float]]:
+    """
+    Tính vị trí GPS của mục tiêu từ các giá trị telemetry dạng scalar
+    (không cần dựng dict telemetry ở hot path).
+
+    Returns:
+        dict {'lat': ..., 'lon': ...} hoặc None nếu không tính được
+        (telemetry thiếu/không phải số, kích thước ảnh <= 0, tia không cắt mặt đất)
+    """
+    if not _valid_inputs(uav_lat, uav_lon, uav_alt_msl, uav_roll_deg, uav_pitch_deg, uav_yaw_deg,
+                         image_width, image_height):
+        return None
+
+    # Lấy trung tâm của bounding box làm điểm mục tiêu trong ảnh
+    target_px = (bbox[0] + bbox[2]) / 2
+    target_py = (bbox[1] + bbox[3]) / 2
+
+    # Gọi thẳng kernel native (Numba): toàn bộ góc pixel -> tia camera -> body -> NED
+    # -> giao mặt đất nằm trong một lần gọi, không qua lớp wrapper / float() từng tham số
+    target_lat, target_lon, ok = _geolocate_ray(
+        target_px, target_py, image_width, image_height,
+        _HFOV_RAD, _VFOV_RAD,
+        uav_lat, uav_lon, uav_alt_msl,
+        math.radians(uav_roll_deg or 0),
+        math.radians(uav_pitch_deg or 0),
+        math.radians(uav_yaw_deg or 0),
+        _R_CAM_TO_BODY_PERM
+    )
+    if not ok:
+        return None  # Vector hướng lên hoặc song song mặt đất
+
+    return {'lat': target_lat, 'lon': target_lon}
+
 
 def _euler_to_rotation_matrix(roll: float, pitch: float, yaw: float) -> np.ndarray:
     """Tạo ma trận xoay từ các góc Euler (rad)."""
@@ -144,12 +193,26 @@ def _euler_to_rotation_matrix(roll: float, pitch: float, yaw: float) -> np.ndarr
     cos_p, sin_p = math.cos(pitch), math.sin(pitch)
     cos_y, sin_y = math.cos(yaw), math.sin(yaw)
 
-    R_x = np.array([[1, 0, 0], [0, cos_r, -sin_r], [0, sin_r, cos_r]]) # Roll
-    R_y = np.array([[cos_p, 0, sin_p], [0, 1, 0], [-sin_p, 0, cos_p]]) # Pitch
-    R_z = np.array([[cos_y, -sin_y, 0], [sin_y, cos_y, 0], [0, 0, 1]])   # Yaw
+    # Thứ tự xoay Z-Y-X (Yaw, Pitch, Roll) cho hệ body-to-NED: R_z @ R_y @ R_x
+    # viết dạng đóng - không dựng 3 ma trận trung gian và 2 phép nhân 3x3
+    return np.array([
+        [cos_y * cos_p, cos_y * sin_p * sin_r - sin_y * cos_r, cos_y * sin_p * cos_r + sin_y * sin_r],
+        [sin_y * cos_p, sin_y * sin_p * sin_r + cos_y * cos_r, sin_y * sin_p * cos_r - cos_y * sin_r],
+        [-sin_p, cos_p * sin_r, cos_p * cos_r]
+    ])
+
+
+# Ma trận xoay theo góc gắn camera - các góc là hằng số nên chỉ tính một lần lúc import
+_R_CAM_TO_BODY = _euler_to_rotation_matrix(
+    math.radians(CAMERA_ROLL_DEG), math.radians(CAMERA_PITCH_DEG), math.radians(CAMERA_YAW_DEG))
+
+# Hoán vị trục camera (OpenCV) -> aerospace:
+# OpenCV (X-phải, Y-dưới, Z-trước) -> Aerospace (X-trước, Y-phải, Z-dưới)
+# x_aero = z_cv, y_aero = x_cv, z_aero = y_cv
+_P_CV_TO_AERO = np.array([[0, 0, 1], [1, 0, 0], [0, 1, 0]], dtype=np.float64)
 
-    # Thứ tự xoay Z-Y-X (Yaw, Pitch, Roll) cho hệ body-to-NED
-    return R_z @ R_y @ R_x
+# Gộp: body_vector = _R_CAM_TO_BODY_PERM @ cam_vector (vector theo trục OpenCV)
+_R_CAM_TO_BODY_PERM = _R_CAM_TO_BODY @ _P_CV_TO_AERO
 
 def calculate_target_geolocation(bbox, uav_telemetry, image_width, image_height):
     """
@@ -168,3 +231,170 @@ def calculate_target_geolocation(bbox, uav_telemetry, image_width, image_height)
     """
     detection_result = {'bbox': bbox}
     return get_target_geolocation(detection_result, uav_telemetry, image_width, image_height)
+
+
+def calculate_target_geolocations(bboxes, uav_telemetry, image_width, image_height) -> np.ndarray:
+    """
+    Phiên bản batch của calculate_target_geolocation cho toàn bộ detections trong một frame.
+
+    Args:
+        bboxes: array-like (N, 4) các bounding box (x1, y1, x2, y2) (pixels)
+        uav_telemetry: dict chứa lat, lon, alt, roll, pitch, yaw của UAV
+        image_width: chiều rộng ảnh (pixels)
+        image_height: chiều cao ảnh (pixels)
+    Returns:
+        np.ndarray (N, 2) các cặp (lat, lon); hàng NaN nếu tia không cắt mặt đất
+        hoặc telemetry thiếu lat/lon/alt
+    """
+    return geolocate_bboxes(bboxes, *_unpack_telemetry(uav_telemetry), image_width, image_height)
+
+
+def geolocate_bboxes(
+    bboxes,
+    uav_lat: float,
+    uav_lon: float,
+    uav_alt_msl: float,
+    uav_roll_deg: float,
+    uav_pitch_deg: float,
+    uav_yaw_deg: float,
+    image_width: int,
+    image_height: int
+) -> np.ndarray:
+    """
+    Phiên bản batch của geolocate_bbox: N bounding box, telemetry dạng scalar.
+
+    Ma trận xoay camera->body->NED chỉ dựng một lần cho cả frame, sau đó N tia
+    được xoay bằng một phép nhân ma trận (N,3)x(3,3) và giao với mặt đất dạng vector.
+
+    Returns:
+        np.ndarray (N, 2) các cặp (lat, lon); hàng NaN nếu tia không cắt mặt đất
+        hoặc thiếu lat/lon/alt
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    result = np.full((bboxes.shape[0], 2), np.nan)
+
+    if uav_lat is None or uav_lon is None or uav_alt_msl is None or bboxes.shape[0] == 0:
+        return result
+
+    R_body_to_ned = _euler_to_rotation_matrix(
+        math.radians(uav_roll_deg or 0),
+        math.radians(uav_pitch_deg or 0),
+        math.radians(uav_yaw_deg or 0))
+    R_cam_to_ned = R_body_to_ned @ _R_CAM_TO_BODY
+
+    # Mỗi hàng: R @ ray == ray @ R^T -> một matmul cho cả frame
+    ned = _bbox_rays(bboxes, image_width, image_height) @ R_cam_to_ned.T
+
+    return _ground_points(ned, uav_lat, uav_lon, uav_alt_msl, result)
+
+
+def geolocate_bbox_series(
+    bboxes,
+    uav_lats,
+    uav_lons,
+    uav_alts_msl,
+    uav_rolls_deg,
+    uav_pitches_deg,
+    uav_yaws_deg,
+    image_width: int,
+    image_height: int
+) -> np.ndarray:
+    """
+    Geolocation cho chuỗi detection, mỗi hàng có telemetry riêng
+    (replay log bay, phân tích nhiều frame cùng lúc).
+
+    Ma trận xoay body->NED của N attitude dựng cùng lúc dạng vector (N,3,3),
+    không vòng lặp Python theo từng frame.
+
+    Args:
+        bboxes: array-like (N, 4) các bounding box (x1, y1, x2, y2) (pixels)
+        uav_lats, uav_lons, uav_alts_msl: array-like (N,) vị trí UAV tại mỗi detection
+        uav_rolls_deg, uav_pitches_deg, uav_yaws_deg: array-like (N,) attitude (độ)
+    Returns:
+        np.ndarray (N, 2) các cặp (lat, lon); hàng NaN nếu tia không cắt mặt đất
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    result = np.full((bboxes.shape[0], 2), np.nan)
+    if bboxes.shape[0] == 0:
+        return result
+
+    # Góc attitude ở float32: sin/cos float32 của NumPy là SIMD, nhanh hơn float64 hàng chục lần;
+    # sai số ~1e-7 rad nhỏ hơn nhiều so với nhiễu cảm biến attitude. Phần còn lại vẫn float64
+    R_body_to_ned = _euler_to_rotation_matrices(
+        np.radians(np.asarray(uav_rolls_deg, dtype=np.float32)),
+        np.radians(np.asarray(uav_pitches_deg, dtype=np.float32)),
+        np.radians(np.asarray(uav_yaws_deg, dtype=np.float32)))
+
+    body = _bbox_rays(bboxes, image_width, image_height) @ _R_CAM_TO_BODY.T
+    ned = np.einsum('nij,nj->ni', R_body_to_ned, body)
+
+    return _ground_points(ned,
+                          np.asarray(uav_lats, dtype=np.float64),
+                          np.asarray(uav_lons, dtype=np.float64),
+                          np.asarray(uav_alts_msl, dtype=np.float64),
+                          result)
+
+
+def _bbox_rays(bboxes: np.ndarray, image_width: int, image_height: int) -> np.ndarray:
+    """
+    Tia camera (N, 3) qua tâm các bbox, theo trục aerospace (X-trước, Y-phải, Z-dưới)
+    Lưu theo thành phần (3, N) và trả về view chuyển vị -> (tan_x, tan_y) liền nhau trong bộ nhớ
+    """
+    rays = np.empty((3, bboxes.shape[0]))
+    rays[0] = 1.0
+
+    # Tâm bbox -> góc lệch so với quang tâm
+    rays[1] = ((bboxes[:, 0] + bboxes[:, 2]) * 0.5 / image_width - 0.5) * _HFOV_RAD
+    rays[2] = ((bboxes[:, 1] + bboxes[:, 3]) * 0.5 / image_height - 0.5) * _VFOV_RAD
+
+    # Tia (1, tan_x, tan_y): một lần np.tan (SIMD) trên khối (2, N) liên tục cho cả hai trục.
+    # Không cần chuẩn hóa vì scale = h / z triệt tiêu độ dài vector.
+    np.tan(rays[1:], out=rays[1:])
+    return rays.T
+
+
+def _ground_points(ned: np.ndarray, uav_lat, uav_lon, uav_alt_msl, result: np.ndarray) -> np.ndarray:
+    """
+    Giao các tia NED (N, 3) với mặt đất (MSL = 0), ghi (lat, lon) vào result (N, 2);
+    hàng NaN nếu tia không cắt mặt đất (lọc bằng ~np.isnan(result[:, 0])).
+    uav_lat/lon/alt: scalar (một frame) hoặc array (N,) (mỗi tia một vị trí UAV).
+    """
+    # Chỉ tia hướng xuống mới cắt mặt đất (MSL = 0): scale = h / z, NaN cho các tia còn lại
+    # -> toàn bộ N tia đi cùng một đường vector, không tách nhánh / lọc theo mask
+    scale = np.divide(uav_alt_msl, ned[:, 2], out=np.full(ned.shape[0], np.nan), where=ned[:, 2] > 0)
+    north_offset = ned[:, 0] * scale
+    east_offset = ned[:, 1] * scale
+
+    # Mét -> độ bằng hằng số nhân; cos(lat) chỉ tính một lần khi cả frame chung một vị trí UAV
+    lon_deg_per_meter = _INV_EARTH_R_DEG / np.cos(np.radians(uav_lat))
+    result[:, 0] = uav_lat + north_offset * _INV_EARTH_R_DEG
+    result[:, 1] = uav_lon + east_offset * lon_deg_per_meter
+    return result
+
+
+def _euler_to_rotation_matrices(roll: np.ndarray, pitch: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    """
+    Phiên bản vector của _euler_to_rotation_matrix: N bộ góc Euler (rad) -> (N, 3, 3) float64
+    Góc có thể là float32 (chỉ sin/cos tính ở float32), các phần tử ma trận luôn tính ở float64
+    """
+    cos_r, sin_r = _cos_sin(roll)
+    cos_p, sin_p = _cos_sin(pitch)
+    cos_y, sin_y = _cos_sin(yaw)
+
+    R = np.empty(np.shape(roll) + (3, 3))
+    R[..., 0, 0] = cos_y * cos_p
+    R[..., 0, 1] = cos_y * sin_p * sin_r - sin_y * cos_r
+    R[..., 0, 2] = cos_y * sin_p * cos_r + sin_y * sin_r
+    R[..., 1, 0] = sin_y * cos_p
+    R[..., 1, 1] = sin_y * sin_p * sin_r + cos_y * cos_r
+    R[..., 1, 2] = sin_y * sin_p * cos_r - cos_y * sin_r
+    R[..., 2, 0] = -sin_p
+    R[..., 2, 1] = cos_p * sin_r
+    R[..., 2, 2] = cos_p * cos_r
+    return R
+
+
+def _cos_sin(angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """cos, sin theo độ chính xác của angles, trả về float64 (không copy nếu đã là float64)"""
+    return (np.cos(angles).astype(np.float64, copy=False),
+            np.sin(angles).astype(np.float64, copy=False))
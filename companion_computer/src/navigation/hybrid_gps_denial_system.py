@@ -42,13 +42,15 @@ Ngày: 2025-12-01
 
 import time
 import math
+import gzip
 import numpy as np
-from typing import Optional, Tuple, List, Dict, Callable
+from typing import Optional, Tuple, Dict, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import deque
 from loguru import logger
 import threading
+import queue
 import json
 
 # Try imports with fallbacks
@@ -64,6 +66,7 @@ try:
         EKFIntegratedGPSDenialHandler,
         GPSDenialEvent
     )
+    from ._ml_kernels import _standardize_samples
 except ImportError:
     import sys
     import os
@@ -79,6 +82,14 @@ except ImportError:
         EKFIntegratedGPSDenialHandler,
         GPSDenialEvent
     )
+    from navigation._ml_kernels import _standardize_samples
+
+# msgpack cho upload training data dạng nhị phân (CÓ THỂ BỎ QUA - fallback JSON)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
 
 
 class NavigationMode(Enum):
@@ -185,13 +196,55 @@ class MS4525DOAirspeedSensor:
         
         # Air density at sea level, 15°C
         self.air_density = 1.225  # kg/m³
+        self._two_over_rho = 2.0 / self.air_density  # Hệ số Bernoulli, cập nhật cùng air_density
         
         # Calibration state
         self.is_calibrated = False
-        self.calibration_samples: List[float] = []
+        self.calibration_samples: np.ndarray = np.empty(0)
+        
+        # Background polling (start_polling): thread đọc I2C ở tần số cố định và ghi mẫu mới nhất
+        # vào một slot; read() chỉ trả slot đó (gán/đọc một tham chiếu là atomic dưới GIL).
+        # _bus_lock giữ bus cho một transaction của poller, hoặc cho cả quá trình calibrate
+        self._latest: Optional[AirspeedReading] = None
+        self._bus_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._poll_thread: Optional[threading.Thread] = None
         
         logger.info("MS4525DO Airspeed Sensor initialized")
     
+    def start_polling(self, rate_hz: float = 50.0):
+        """Bắt đầu đọc cảm biến trên background thread (read() không còn chờ I2C)"""
+        if self._poll_thread is not None:
+            return
+        
+        self._stop_event.clear()
+        self._poll_thread = threading.Thread(target=self._poller, args=(1.0 / rate_hz,), daemon=True)
+        self._poll_thread.start()
+        logger.info(f"Airspeed polling started ({rate_hz:.0f} Hz)")
+    
+    def stop_polling(self):
+        """Dừng background polling, read() quay lại đọc I2C trực tiếp"""
+        if self._poll_thread is None:
+            return
+        
+        self._stop_event.set()
+        self._poll_thread.join(timeout=1.0)
+        self._poll_thread = None
+    
+    def _poller(self, period: float):
+        """Background thread worker: đọc cảm biến theo deadline monotonic, ghi vào slot"""
+        deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            with self._bus_lock:
+                self._latest = self._sample()
+            
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                deadline = time.monotonic()  # Trễ lịch (vd. chờ calibrate) -> không đọc dồn bù
+    
     def calibrate(self, samples: int = 50) -> bool:
         """
         Hiệu chỉnh offset zero (gọi khi UAV đứng yên)
@@ -209,15 +262,14 @@ class MS4525DOAirspeedSensor:
         """
         logger.info(f"Calibrating airspeed sensor ({samples} samples)...")
         
-        self.calibration_samples = []
-        for _ in range(samples):
-            reading = self._read_raw_pressure()
-            if reading is not None:
-                self.calibration_samples.append(reading)
-            time.sleep(0.02)  # 50Hz
+        # Đọc cả batch rồi giải mã vector hóa (không parse từng mẫu trong vòng lặp Python);
+        # giữ bus suốt quá trình -> poller (nếu đang chạy) tạm dừng
+        with self._bus_lock:
+            self.calibration_samples = self._read_raw_pressure_batch(samples)
+        n = len(self.calibration_samples)
         
-        if len(self.calibration_samples) >= samples * 0.8:
-            self.calibration_offset = np.mean(self.calibration_samples)
+        if n >= samples * 0.8:
+            self.calibration_offset = float(self.calibration_samples.mean())
             self.is_calibrated = True
             logger.success(f"Airspeed calibrated: offset = {self.calibration_offset:.2f} Pa")
             return True
@@ -229,23 +281,30 @@ class MS4525DOAirspeedSensor:
         """
         Đọc tốc độ không khí từ cảm biến
         
+        Khi đang polling: trả mẫu mới nhất của poller, không chờ I2C
+        
         Returns:
             AirspeedReading object chứa dữ liệu đọc được
             None nếu đọc thất bại
         """
-        raw_pressure = self._read_raw_pressure()
-        temperature = self._read_temperature()
-        
-        if raw_pressure is None:
+        if self._poll_thread is not None:
+            return self._latest
+        return self._sample()
+    
+    def _sample(self) -> Optional[AirspeedReading]:
+        """One I2C read -> AirspeedReading (None nếu đọc thất bại)"""
+        block = self._read_pt_block()
+        if block is None:
             return None
+        raw_pressure, temperature = block
         
         # Apply calibration offset
         differential_pressure = raw_pressure - self.calibration_offset
         
         # Calculate airspeed using Bernoulli equation
-        # v = sqrt(2 * dP / rho)
+        # v = sqrt(2 * dP / rho) = sqrt(dP * (2 / rho)) - hệ số tính sẵn, chỉ còn một phép nhân + sqrt
         if differential_pressure > 0:
-            airspeed = math.sqrt(2.0 * differential_pressure / self.air_density)
+            airspeed = math.sqrt(differential_pressure * self._two_over_rho)
         else:
             airspeed = 0.0
         
@@ -262,46 +321,80 @@ class MS4525DOAirspeedSensor:
         
         return self.last_reading
     
-    def _read_raw_pressure(self) -> Optional[float]:
-        """Read raw pressure from I2C"""
+    def _read_raw_pressure_batch(self, n: int, period: float = 0.02) -> np.ndarray:
+        """
+        Read n raw pressure samples (calibration path)
+        
+        Các burst 4 byte được ghi vào buffer uint8 (n, 4) cấp phát sẵn, rồi giải mã cả batch
+        bằng phép bit trên ndarray thay vì shift từng byte trong Python
+        
+        Args:
+            n: Số lần đọc
+            period: Chu kỳ đọc (s), lịch theo deadline monotonic
+            
+        Returns:
+            Áp suất (Pa) của các mẫu hợp lệ (bỏ mẫu stale/lỗi)
+        """
+        if self.i2c is None:
+            # Simulation mode
+            return np.random.normal(100, 5, n)  # ~15 m/s
+        
+        # Lần đọc lỗi giữ status = 3 (fault) -> bị loại cùng mẫu stale khi giải mã
+        raw = np.full((n, 4), 0xC0, dtype=np.uint8)
+        
+        # Thời gian đọc I2C không cộng dồn vào chu kỳ
+        deadline = time.monotonic()
+        for k in range(n):
+            try:
+                raw[k] = self.i2c.read_i2c_block_data(self.I2C_ADDRESS, 0, 4)
+            except Exception as e:
+                logger.error(f"Airspeed read error: {e}")
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        
+        # Status (2 bit cao) và áp suất 14-bit, -1 to 1 PSI range
+        # (int32: phép trừ 8192 phía sau không bị tràn như với uint16)
+        valid = (raw[:, 0] >> 6) == 0
+        pressure_raw = ((raw[:, 0] & 0x3F).astype(np.int32) << 8) | raw[:, 1]
+        return (pressure_raw[valid] - 8192) * (self.PSI_TO_PA / 8192.0)
+    
+    def _read_pt_block(self) -> Optional[Tuple[float, float]]:
+        """
+        Read pressure and temperature from one I2C transaction
+        
+        MS4525DO trả về áp suất (byte 0-1) và nhiệt độ (byte 2-3) trong cùng một burst 4 byte
+        -> một lần đọc bus thay vì hai, và hai giá trị thuộc cùng một mẫu
+        
+        Returns:
+            (pressure_pa, temperature_c) hoặc None nếu đọc lỗi / dữ liệu stale
+        """
         if self.i2c is None:
             # Simulation mode
-            return np.random.normal(100, 5)  # ~15 m/s
+            return np.random.normal(100, 5), 25.0  # ~15 m/s
         
         try:
-            # Read 4 bytes from sensor
             data = self.i2c.read_i2c_block_data(self.I2C_ADDRESS, 0, 4)
             
-            # Parse pressure (14-bit)
             status = (data[0] >> 6) & 0x03
             if status != 0:
                 return None  # Stale or fault
             
+            # Pressure (14-bit), -1 to 1 PSI range
             pressure_raw = ((data[0] & 0x3F) << 8) | data[1]
+            pressure_pa = ((pressure_raw - 8192) / 8192.0) * self.PSI_TO_PA
             
-            # Convert to Pa (-1 to 1 PSI range)
-            pressure_psi = ((pressure_raw - 8192) / 8192.0)
-            pressure_pa = pressure_psi * self.PSI_TO_PA
+            # Temperature (11-bit)
+            temp_raw = ((data[2] << 8) | data[3]) >> 5
+            temperature = (temp_raw * 200.0 / 2047.0) - 50.0
             
-            return pressure_pa
+            return pressure_pa, temperature
             
         except Exception as e:
             logger.error(f"Airspeed read error: {e}")
             return None
     
-    def _read_temperature(self) -> float:
-        """Read temperature from sensor"""
-        if self.i2c is None:
-            return 25.0  # Simulation
-        
-        try:
-            data = self.i2c.read_i2c_block_data(self.I2C_ADDRESS, 0, 4)
-            temp_raw = ((data[2] << 8) | data[3]) >> 5
-            temperature = (temp_raw * 200.0 / 2047.0) - 50.0
-            return temperature
-        except:
-            return 25.0
-    
     def update_air_density(self, temperature: float, pressure_alt: float):
         """
         Cập nhật mật độ không khí dựa trên điều kiện môi trường
@@ -324,6 +417,7 @@ class MS4525DOAirspeedSensor:
         R = 287.05  # Gas constant for air
         
         self.air_density = P / (R * T)
+        self._two_over_rho = 2.0 / self.air_density
 
 
 class QuantumFilterComparator:
@@ -341,6 +435,10 @@ class QuantumFilterComparator:
     - Tối ưu hóa thuật toán cho phần cứng lượng tử tương lai
     """
     
+    HISTORY_SIZE = 1000  # Số mẫu so sánh giữ lại
+    STATE_DIM = 3        # So sánh vị trí (3 phần tử đầu của state)
+    QUEUE_SIZE = 100     # Mẫu chờ QKF; đầy thì bỏ mẫu mới (nghiên cứu, không phải critical path)
+    
     def __init__(self):
         self.qkf_available = False
         self.qkf = None
@@ -354,22 +452,33 @@ class QuantumFilterComparator:
         except ImportError:
             logger.warning("Quantum Kalman Filter not available")
         
-        # Comparison metrics
-        self.ekf_estimates: deque = deque(maxlen=1000)
-        self.qkf_estimates: deque = deque(maxlen=1000)
-        self.ground_truth: deque = deque(maxlen=1000)  # GPS when available
-        
-        # Performance comparison
-        self.ekf_errors: List[float] = []
-        self.qkf_errors: List[float] = []
-        self.ekf_times: List[float] = []
-        self.qkf_times: List[float] = []
+        # Comparison history: ring buffer dạng SoA (mỗi mẫu một hàng, ghi đè mẫu cũ nhất khi đầy)
+        # thay cho deque các dict {'time', 'state'} -> không cấp phát dict/array theo từng mẫu
+        n = self.HISTORY_SIZE
+        self.timestamps = np.empty(n)
+        self.ekf_states = np.empty((n, self.STATE_DIM))
+        self.qkf_states = np.empty((n, self.STATE_DIM))
+        self.gt_states = np.empty((n, self.STATE_DIM))  # GPS khi có, NaN khi không có ground truth
+        self.qkf_times = np.empty(n, dtype=np.float32)  # Thời gian QKF update (ms)
+        self.sample_count = 0  # Tổng số mẫu đã ghi (vị trí ghi = sample_count % HISTORY_SIZE)
+        
+        # Performance comparison: sai số vị trí và thời gian tính khi lấy thống kê từ các ring buffer
+        # trên (bị chặn ở HISTORY_SIZE, không còn list Python tăng mãi trong suốt chuyến bay)
+        
+        # QKF chạy trên background thread: luồng GPS chỉ enqueue mẫu, không chờ qkf.update().
+        # Worker chỉ khởi động ở mẫu đầu tiên khi có QKF (không có QKF -> không có thread); stop() để dừng
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._history_lock = threading.Lock()  # Ring buffer ghi ở worker, đọc ở get_comparison_stats
+        self._stop_event = threading.Event()
+        self._worker_thread: Optional[threading.Thread] = None
     
     def compare_update(self, measurement: np.ndarray, 
                        ekf_estimate: np.ndarray,
                        ground_truth: Optional[np.ndarray] = None):
         """
-        Run comparison update
+        Run comparison update (non-blocking)
+        
+        Chỉ đưa mẫu vào queue; QKF update và ghi ring buffer chạy trên _qkf_worker
         
         Args:
             measurement: Sensor measurement
@@ -379,56 +488,118 @@ class QuantumFilterComparator:
         if not self.qkf_available:
             return
         
-        timestamp = time.time()
-        
-        # Store EKF estimate
-        self.ekf_estimates.append({
-            'time': timestamp,
-            'state': ekf_estimate.copy()
-        })
+        if self._worker_thread is None:
+            self._stop_event.clear()
+            self._worker_thread = threading.Thread(target=self._qkf_worker, daemon=True)
+            self._worker_thread.start()
         
-        # Run QKF update
+        # Copy tại biên EKF -> worker thành mảng C-contiguous float64 của riêng mẫu: ekf_estimate
+        # thường là view vào state EKF đang cập nhật, và QKF/ring buffer không phải copy lại theo layout.
+        # (float64, không float32: lat/lon ở float32 chỉ còn ~1 m độ phân giải)
+        dim = self.STATE_DIM
+        try:
+            self._queue.put_nowait((
+                time.time(),
+                np.array(measurement, dtype=np.float64),
+                np.array(ekf_estimate[:dim], dtype=np.float64),
+                None if ground_truth is None else np.array(ground_truth[:dim], dtype=np.float64)
+            ))
+        except queue.Full:
+            logger.debug("QKF comparison queue full - dropping sample")
+    
+    def _qkf_worker(self):
+        """
+        Background thread worker cho QKF
+        Lấy mẫu từ queue, chạy QKF update và ghi kết quả vào ring buffer
+        """
+        while not self._stop_event.is_set():
+            # Timeout 0.1s để check stop_event
+            try:
+                timestamp, measurement, ekf_estimate, ground_truth = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            try:
+                self._process_sample(timestamp, measurement, ekf_estimate, ground_truth)
+            finally:
+                self._queue.task_done()
+    
+    def _process_sample(self, timestamp: float, measurement: np.ndarray,
+                        ekf_estimate: np.ndarray, ground_truth: Optional[np.ndarray]):
+        """Run QKF update for one queued sample and record it"""
         try:
             start = time.perf_counter()
             qkf_estimate = self.qkf.update(measurement)
             qkf_time = (time.perf_counter() - start) * 1000
             
-            self.qkf_estimates.append({
-                'time': timestamp,
-                'state': qkf_estimate
-            })
-            self.qkf_times.append(qkf_time)
-            
         except Exception as e:
             logger.error(f"QKF update failed: {e}")
             return
         
-        # If ground truth available, compute errors
-        if ground_truth is not None:
-            self.ground_truth.append({
-                'time': timestamp,
-                'state': ground_truth
-            })
+        # Ghi mẫu vào hàng i của các ring buffer
+        dim = self.STATE_DIM
+        with self._history_lock:
+            i = self.sample_count % self.HISTORY_SIZE
+            self.timestamps[i] = timestamp
+            self.ekf_states[i] = ekf_estimate
+            self.qkf_states[i] = qkf_estimate[:dim]
+            self.qkf_times[i] = qkf_time
             
-            ekf_error = np.linalg.norm(ekf_estimate[:3] - ground_truth[:3])
-            qkf_error = np.linalg.norm(qkf_estimate[:3] - ground_truth[:3])
-            
-            self.ekf_errors.append(ekf_error)
-            self.qkf_errors.append(qkf_error)
+            # Ground truth chỉ được lưu; sai số tính gộp trong get_comparison_stats
+            if ground_truth is not None:
+                self.gt_states[i] = ground_truth
+            else:
+                self.gt_states[i] = np.nan
+            self.sample_count += 1
+    
+    def flush(self):
+        """Chờ worker xử lý hết các mẫu đang trong queue"""
+        self._queue.join()
+    
+    def stop(self):
+        """Dừng background QKF thread (compare_update sau đó sẽ khởi động lại)"""
+        if self._worker_thread is None:
+            return
+        
+        self._stop_event.set()
+        self._worker_thread.join(timeout=1.0)
+        self._worker_thread = None
+    
+    def _position_errors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sai số vị trí EKF và QKF so với ground truth cho các mẫu trong ring buffer có GPS
+        Một phép vector cho cả cửa sổ thay vì np.linalg.norm trên vector 3 phần tử mỗi lần update
+        """
+        with self._history_lock:
+            n = min(self.sample_count, self.HISTORY_SIZE)
+            has_truth = ~np.isnan(self.gt_states[:n, 0])
+            gt = self.gt_states[:n][has_truth]
+            ekf = self.ekf_states[:n][has_truth]
+            qkf = self.qkf_states[:n][has_truth]
+        
+        ekf_errors = np.sqrt(((ekf - gt) ** 2).sum(axis=1))
+        qkf_errors = np.sqrt(((qkf - gt) ** 2).sum(axis=1))
+        return ekf_errors, qkf_errors
     
     def get_comparison_stats(self) -> Dict:
-        """Get comparison statistics"""
-        if not self.ekf_errors:
+        """Get comparison statistics (over the last HISTORY_SIZE samples)"""
+        ekf_errors, qkf_errors = self._position_errors()
+        if ekf_errors.size == 0:
             return {"status": "No data"}
         
+        with self._history_lock:
+            qkf_mean_time = float(self.qkf_times[:min(self.sample_count, self.HISTORY_SIZE)].mean())
+        
+        ekf_mean = float(ekf_errors.mean())
+        qkf_mean = float(qkf_errors.mean())
         return {
-            "ekf_mean_error": np.mean(self.ekf_errors),
-            "ekf_std_error": np.std(self.ekf_errors),
-            "qkf_mean_error": np.mean(self.qkf_errors) if self.qkf_errors else None,
-            "qkf_std_error": np.std(self.qkf_errors) if self.qkf_errors else None,
-            "qkf_mean_time_ms": np.mean(self.qkf_times) if self.qkf_times else None,
-            "samples": len(self.ekf_errors),
-            "qkf_improvement": (np.mean(self.ekf_errors) - np.mean(self.qkf_errors)) / np.mean(self.ekf_errors) * 100 if self.qkf_errors else None
+            "ekf_mean_error": ekf_mean,
+            "ekf_std_error": float(ekf_errors.std()),
+            "qkf_mean_error": qkf_mean,
+            "qkf_std_error": float(qkf_errors.std()),
+            "qkf_mean_time_ms": qkf_mean_time,
+            "samples": int(ekf_errors.size),
+            "qkf_improvement": (ekf_mean - qkf_mean) / ekf_mean * 100 if ekf_mean > 0 else None
         }
 
 
@@ -460,14 +631,32 @@ class MLAdaptiveTuner:
     # Lưu ý: RPi 3B+ có 1GB RAM, 4 cores @ 1.4GHz
     # Cần cân bằng giữa ML và các tác vụ khác (camera, MAVLink, EKF)
     
+    # Thứ tự cột của ma trận feature (giống ground_station/ml_server.py)
+    FEATURE_NAMES = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z',
+                     'gps_valid', 'airspeed')
+    
     def __init__(self, compute_location: ComputeLocation = ComputeLocation.HYBRID):
         self.compute_location = compute_location
         self.model = None
         self.is_trained = False
         
-        # Training data
-        self.training_data: List[Dict] = []
+        # Training data: ring buffer dạng SoA (mỗi mẫu một hàng FEATURE_NAMES + một target),
+        # ghi đè mẫu cũ nhất khi đầy - thay cho list các dict lồng nhau
         self.max_training_samples = 10000
+        self._features = np.empty((self.max_training_samples, len(self.FEATURE_NAMES)), dtype=np.float32)
+        self._targets = np.empty(self.max_training_samples, dtype=np.float32)  # DR error, NaN nếu không có
+        self.sample_count = 0  # Tổng số mẫu đã thu (vị trí ghi = sample_count % max_training_samples)
+        
+        # Inference: buffer feature (1, 8) dùng lại mỗi lần predict, chuẩn hóa in-place
+        # bằng mean/scale của scaler cache sau khi train (không cấp phát theo từng lần gọi)
+        self._pred_buf = np.empty((1, len(self.FEATURE_NAMES)), dtype=np.float32)
+        self._scaler_mean: Optional[np.ndarray] = None
+        self._scaler_scale: Optional[np.ndarray] = None
+        
+        # Hệ số Ridge (coef_, intercept_) cache sau khi train: predict là một dot product,
+        # không qua validation/dispatch của sklearn
+        self._w: Optional[np.ndarray] = None
+        self._b = 0.0
         
         # Current parameters
         self.current_params = {
@@ -484,6 +673,7 @@ class MLAdaptiveTuner:
         # Server communication
         self.server_url: Optional[str] = None
         self.server_connected = False
+        self.server_accepts_msgpack = MSGPACK_AVAILABLE  # False sau khi server trả 415 (không có msgpack)
         
         logger.info(f"ML Adaptive Tuner initialized (compute: {compute_location.value})")
     
@@ -526,38 +716,38 @@ class MLAdaptiveTuner:
         """
         Thu thập mẫu dữ liệu cho training
         
-        Mỗi mẫu bao gồm:
-        - Dữ liệu cảm biến (IMU, GPS, Airspeed)
-        - Trạng thái EKF hiện tại
-        - Lỗi Dead Reckoning ước tính
-        - Tham số hiện tại
+        Mỗi mẫu là một hàng của buffer SoA:
+        - Features (FEATURE_NAMES): IMU accel/gyro, GPS hợp lệ, airspeed (mặc định 15 m/s)
+        - Target: Lỗi Dead Reckoning ước tính
         
         Args:
             imu: Đọc dữ liệu IMU
             gps: Đọc dữ liệu GPS (None nếu không có)
             airspeed: Đọc dữ liệu tốc độ không khí
-            ekf_state: Trạng thái EKF hiện tại
+            ekf_state: Trạng thái EKF hiện tại (không dùng làm feature)
             dr_error: Lỗi Dead Reckoning ước tính
-            params: Tham số hiện tại
+            params: Tham số hiện tại (không lưu theo mẫu)
         """
-        sample = {
-            'timestamp': time.time(),
-            'imu': {
-                'accel': [imu.accel_x, imu.accel_y, imu.accel_z],
-                'gyro': [imu.roll_rate, imu.pitch_rate, imu.yaw_rate]
-            },
-            'gps_valid': gps is not None and gps.fix_type >= 3,
-            'airspeed': airspeed.airspeed if airspeed else None,
-            'ekf_confidence': float(np.trace(ekf_state[0:3])),  # Simplified
-            'dr_error': dr_error,
-            'params': params.copy()
-        }
-        
-        self.training_data.append(sample)
-        
-        # Limit size
-        if len(self.training_data) > self.max_training_samples:
-            self.training_data.pop(0)
+        i = self.sample_count % self.max_training_samples
+        self._features[i] = (
+            imu.accel_x, imu.accel_y, imu.accel_z,
+            imu.roll_rate, imu.pitch_rate, imu.yaw_rate,
+            1.0 if gps is not None and gps.fix_type >= 3 else 0.0,
+            airspeed.airspeed if airspeed else 15.0
+        )
+        self._targets[i] = dr_error if dr_error is not None else np.nan
+        self.sample_count += 1
+    
+    @property
+    def n_samples(self) -> int:
+        """Số mẫu đang có trong buffer"""
+        return min(self.sample_count, self.max_training_samples)
+    
+    def _recent_samples(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """count mẫu mới nhất theo thứ tự thời gian: (features (k, 8), targets (k,))"""
+        k = min(count, self.n_samples)
+        idx = np.arange(self.sample_count - k, self.sample_count) % self.max_training_samples
+        return self._features[idx], self._targets[idx]
     
     def train_model(self, metrics: SystemPerformanceMetrics) -> bool:
         """
@@ -574,7 +764,7 @@ class MLAdaptiveTuner:
         Returns:
             True nếu huấn luyện thành công, False nếu thất bại
         """
-        if len(self.training_data) < 100:
+        if self.n_samples < 100:
             logger.warning("Insufficient training data")
             return False
         
@@ -609,40 +799,21 @@ class MLAdaptiveTuner:
             # Use lightweight model for RPi
             # Linear regression or small decision tree
             from sklearn.linear_model import Ridge
-            from sklearn.preprocessing import StandardScaler
-            
-            # Prepare features
-            X = []
-            y = []
-            
-            for sample in self.training_data:
-                if sample['dr_error'] is not None:
-                    features = [
-                        sample['imu']['accel'][0],
-                        sample['imu']['accel'][1],
-                        sample['imu']['accel'][2],
-                        sample['imu']['gyro'][0],
-                        sample['imu']['gyro'][1],
-                        sample['imu']['gyro'][2],
-                        1.0 if sample['gps_valid'] else 0.0,
-                        sample['airspeed'] if sample['airspeed'] else 15.0
-                    ]
-                    X.append(features)
-                    y.append(sample['dr_error'])
             
-            if len(X) < 50:
+            # Lọc mẫu có target + chuẩn hóa (thay StandardScaler) trong một kernel JIT,
+            # đọc thẳng từ buffer SoA (hàng đã ghi, thứ tự không quan trọng)
+            n = self.n_samples
+            X_scaled, y, mean, scale = _standardize_samples(self._features[:n], self._targets[:n])
+            if len(y) < 50:
                 return False
             
-            X = np.array(X)
-            y = np.array(y)
-            
             # Train simple model
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
-            
             self.model = Ridge(alpha=1.0)
             self.model.fit(X_scaled, y)
-            self.scaler = scaler
+            self._scaler_mean = mean.astype(np.float32)
+            self._scaler_scale = scale.astype(np.float32)
+            self._w = self.model.coef_.astype(np.float32)
+            self._b = float(self.model.intercept_)
             self.is_trained = True
             
             logger.success("Edge ML model trained successfully")
@@ -677,14 +848,51 @@ class MLAdaptiveTuner:
         try:
             import requests
             
-            response = requests.post(
-                f"{self.server_url}/api/ml/train",
-                json={
-                    'training_data': self.training_data[-1000:],  # Last 1000 samples
+            # Last 1000 samples
+            features, targets = self._recent_samples(1000)
+            
+            url = f"{self.server_url}/api/ml/train"
+            response = None
+            
+            if self.server_accepts_msgpack:
+                # Gửi nguyên buffer float32 (msgpack + gzip) thay vì list dict JSON
+                payload = gzip.compress(msgpack.packb({
+                    'features': features.tobytes(),
+                    'targets': targets.tobytes(),
+                    'shape': features.shape,
                     'current_params': self.current_params
-                },
-                timeout=30
-            )
+                }))
+                response = requests.post(
+                    url,
+                    data=payload,
+                    headers={'Content-Type': 'application/x-msgpack+gzip'},
+                    timeout=30
+                )
+                if response.status_code == 415:
+                    # Server không có msgpack -> gửi lại bằng JSON, dùng JSON cho các lần sau
+                    logger.warning("ML server does not accept msgpack uploads, falling back to JSON")
+                    self.server_accepts_msgpack = False
+                    response = None
+            
+            if response is None:
+                # JSON theo định dạng sample của server
+                training_data = [
+                    {
+                        'imu': {'accel': f[0:3], 'gyro': f[3:6]},
+                        'gps_valid': f[6] > 0.5,
+                        'airspeed': f[7],
+                        'dr_error': None if t != t else t  # NaN -> không có target
+                    }
+                    for f, t in zip(features.tolist(), targets.tolist())
+                ]
+                response = requests.post(
+                    url,
+                    json={
+                        'training_data': training_data,
+                        'current_params': self.current_params
+                    },
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -702,23 +910,27 @@ class MLAdaptiveTuner:
     
     def predict_optimal_params(self, current_state: Dict) -> Dict:
         """Predict optimal parameters for current conditions"""
-        if not self.is_trained or self.model is None:
+        if not self.is_trained or self._w is None:
             return self.current_params
         
         try:
-            features = np.array([[
-                current_state.get('accel_x', 0),
-                current_state.get('accel_y', 0),
-                current_state.get('accel_z', -9.8),
-                current_state.get('gyro_x', 0),
-                current_state.get('gyro_y', 0),
-                current_state.get('gyro_z', 0),
-                1.0 if current_state.get('gps_valid', False) else 0.0,
-                current_state.get('airspeed', 15.0)
-            ]])
+            b = self._pred_buf
+            row = b[0]
+            row[0] = current_state.get('accel_x', 0)
+            row[1] = current_state.get('accel_y', 0)
+            row[2] = current_state.get('accel_z', -9.8)
+            row[3] = current_state.get('gyro_x', 0)
+            row[4] = current_state.get('gyro_y', 0)
+            row[5] = current_state.get('gyro_z', 0)
+            row[6] = 1.0 if current_state.get('gps_valid', False) else 0.0
+            row[7] = current_state.get('airspeed', 15.0)
+            
+            # StandardScaler.transform thủ công, ghi đè lên buffer
+            np.subtract(b, self._scaler_mean, out=b)
+            np.divide(b, self._scaler_scale, out=b)
             
-            features_scaled = self.scaler.transform(features)
-            predicted_error = self.model.predict(features_scaled)[0]
+            # Ridge.predict thủ công: w . x + b
+            predicted_error = float(self._w @ row) + self._b
             
             # Adjust parameters based on predicted error
             adjusted_params = self.current_params.copy()
@@ -739,6 +951,7 @@ class MLAdaptiveTuner:
     def set_server(self, url: str):
         """Set ground station server URL"""
         self.server_url = url
+        self.server_accepts_msgpack = MSGPACK_AVAILABLE  # Server mới: thử lại msgpack
         logger.info(f"ML server set to: {url}")
 
 
@@ -845,8 +1058,12 @@ class HybridGPSDenialSystem:
         
         # Update both handlers
         self.basic_handler.detector.update_gps(reading)
+        # EKF predict/update chạy trong kernel JIT (navigation._ekf_kernels, compile sẵn lúc import
+        # nhờ signature tường minh -> tick đầu tiên không trả chi phí compile); đo thời gian thực tế
+        start = time.perf_counter()
         self.ekf_handler.update_gps(lat, lon, alt, ground_speed, heading,
                                     satellites, hdop, fix_type)
+        self.performance_metrics.ekf_update_time_ms = (time.perf_counter() - start) * 1000
         
         # Check GPS state
         gps_state = self.basic_handler.detector.get_state()
@@ -881,9 +1098,11 @@ class HybridGPSDenialSystem:
         
         # Update active handler
         if self.current_mode == NavigationMode.EKF_DEAD_RECKONING:
+            start = time.perf_counter()
             self.ekf_handler.update_imu(roll, pitch, yaw,
                                         roll_rate, pitch_rate, yaw_rate,
                                         accel_x, accel_y, accel_z)
+            self.performance_metrics.ekf_update_time_ms = (time.perf_counter() - start) * 1000
             
             # Use airspeed in DR
             if self.ekf_handler.navigator.is_active:
@@ -1016,6 +1235,17 @@ class HybridGPSDenialSystem:
             return False
         return self.ml_tuner.train_model(self.performance_metrics)
     
+    def start(self, airspeed_poll_hz: float = 50.0):
+        """Khởi động airspeed polling: update_imu chỉ đọc mẫu cache, không chờ I2C"""
+        self.airspeed_sensor.start_polling(airspeed_poll_hz)
+    
+    def stop(self):
+        """Dừng các background thread của hệ thống (airspeed poller, QKF comparator)"""
+        self.airspeed_sensor.stop_polling()
+        if self.quantum_comparator:
+            self.quantum_comparator.stop()
+        logger.info("Hybrid GPS denial system stopped")
+    
     def get_status(self) -> Dict:
         """Get comprehensive system status"""
         status = {
@@ -1044,7 +1274,7 @@ class HybridGPSDenialSystem:
         
         if self.ml_tuner:
             status["ml_trained"] = self.ml_tuner.is_trained
-            status["ml_samples"] = len(self.ml_tuner.training_data)
+            status["ml_samples"] = self.ml_tuner.n_samples
         
         return status
 
@@ -1183,6 +1413,7 @@ if __name__ == "__main__":
     
     system.set_home(21.028, 105.804, 10)
     system.calibrate_airspeed()
+    system.start()
     
     print("\n1. Normal GPS operation...")
     for i in range(5):
@@ -1207,6 +1438,8 @@ if __name__ == "__main__":
     system.update_gps(21.029, 105.805, 80, 15, 225, 14, 0.7, 3)
     print(f"Status: {system.get_status()['mode']}")
     
+    system.stop()
+    
     print("\n" + "=" * 70)
     print("✅ HYBRID SYSTEM READY FOR DEPLOYMENT!")
     print("=" * 70)
@@ -183,9 +183,8 @@ class QuantumKalmanFilter:
             K_quantum = self.covariance @ np.eye(4) * quantum_gain
             self.state += K_quantum @ innovation
             
-            # Cập nhật ma trận hiệp phương sai
-            I = np.eye(4)
-            self.covariance = (I - K_quantum) @ self.covariance
+            # Cập nhật ma trận hiệp phương sai: P - K P == (I - K) P, không dựng ma trận đơn vị
+            self.covariance = self.covariance - K_quantum @ self.covariance
             
             processing_time = time.time() - start_time
             logger.debug(f"Cập nhật lượng tử hoàn thành trong {processing_time:.4f}s")
@@ -206,9 +205,8 @@ class QuantumKalmanFilter:
         innovation = measurement - self.state
         self.state += K @ innovation
         
-        # Covariance update
-        I = np.eye(4)
-        self.covariance = (I - K) @ self.covariance
+        # Covariance update: H = I -> P - K (H P) = P - K P, no identity matrix
+        self.covariance = self.covariance - K @ self.covariance
         
         return self.state.copy()
     
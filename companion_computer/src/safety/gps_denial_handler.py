@@ -36,8 +36,10 @@ from typing import Optional, Tuple, List, Dict, Deque
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import deque
+from itertools import islice
 from loguru import logger
 import threading
+import numpy as np
 
 
 class GPSState(Enum):
@@ -113,6 +115,7 @@ class GPSDenialEvent:
     escape_action: EscapeAction
     max_dr_error: float
     recovered: bool
+    end_position: Optional[Tuple[float, float, float]] = None  # lat, lon, alt khi GPS phục hồi
 
 
 class GPSAnomalyDetector:
@@ -226,8 +229,8 @@ class GPSAnomalyDetector:
         if len(self.imu_history) < 2:
             return 0.0
         
-        # Lấy acceleration trung bình
-        recent_imu = list(self.imu_history)[-10:]
+        # Lấy acceleration trung bình (10 mẫu mới nhất - không copy cả history 500 mẫu)
+        recent_imu = list(islice(reversed(self.imu_history), 10))
         avg_accel_x = sum(r.accel_x for r in recent_imu) / len(recent_imu)
         avg_accel_y = sum(r.accel_y for r in recent_imu) / len(recent_imu)
         
@@ -474,6 +477,22 @@ class DeadReckoningNavigator:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
     
+    @staticmethod
+    def _haversine_batch(lats1: np.ndarray, lons1: np.ndarray,
+                         lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+        """
+        Khoảng cách (meters) giữa từng cặp điểm, tính vector hóa bằng NumPy
+        
+        Cho phân tích sau bay (nhiều denial event một lần); vòng real-time vẫn dùng _haversine
+        """
+        R = 6371000
+        lat1_rad, lat2_rad = np.radians(lats1), np.radians(lats2)
+        dlat = lat2_rad - lat1_rad
+        dlon = np.radians(np.subtract(lons2, lons1))
+        
+        a = np.sin(dlat / 2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2
+        return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    
     @staticmethod
     def _calculate_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Tính bearing từ điểm 1 đến điểm 2 (degrees)"""
@@ -488,6 +507,33 @@ class DeadReckoningNavigator:
         return (math.degrees(bearing) + 360) % 360
 
 
+def summarize_denial_events(events: List[GPSDenialEvent]) -> Dict:
+    """
+    Tổng hợp các denial event sau bay
+    
+    Khoảng cách từ điểm mất GPS đến điểm phục hồi của mọi event tính trong một lần gọi
+    DeadReckoningNavigator._haversine_batch
+    """
+    recovered = [e for e in events if e.recovered and e.end_position is not None]
+    
+    displacement = np.zeros(0)
+    if recovered:
+        start = np.array([e.start_position[:2] for e in recovered])
+        end = np.array([e.end_position[:2] for e in recovered])
+        displacement = DeadReckoningNavigator._haversine_batch(
+            start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+        )
+    
+    return {
+        "total_events": len(events),
+        "recovered_events": len(recovered),
+        "total_duration": sum(e.end_time - e.start_time for e in events if e.end_time is not None),
+        "max_dr_error": max((e.max_dr_error for e in events), default=0.0),
+        "mean_displacement": float(displacement.mean()) if len(displacement) else 0.0,
+        "max_displacement": float(displacement.max()) if len(displacement) else 0.0
+    }
+
+
 class GPSDenialHandler:
     """
     Main handler cho GPS denial situations
@@ -693,6 +739,7 @@ class GPSDenialHandler:
         if self.current_event:
             self.current_event.end_time = time.time()
             self.current_event.recovered = True
+            self.current_event.end_position = (gps.lat, gps.lon, gps.alt)
             self.denial_events.append(self.current_event)
             self.current_event = None
         
@@ -758,6 +805,10 @@ class GPSDenialHandler:
             "dr_time": time.time() - self.navigator.dr_start_time if self.navigator.is_active else 0,
             "total_denial_events": len(self.denial_events)
         }
+    
+    def get_denial_summary(self) -> Dict:
+        """Tổng hợp các denial event đã kết thúc (phân tích sau bay)"""
+        return summarize_denial_events(self.denial_events)
 
 
 # ============================================================================
@@ -45,7 +45,7 @@ def main():
     
     try:
         while True:
-            frame = cam.read_frame()
+            frame, _ = cam.read_frame()
             
             if frame is not None:
                 cv2.imshow("Android Camera Feed", frame)
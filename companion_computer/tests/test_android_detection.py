@@ -65,7 +65,7 @@ def main():
     
     try:
         while True:
-            frame = cam.read_frame()
+            frame, _ = cam.read_frame()
             
             if frame is not None:
                 start_time = time.time()
@@ -0,0 +1,231 @@
+"""
+Test Autonomous Navigation
+Kiểm tra các thuật toán dẫn đường (distance/bearing, tránh vật cản)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import copy
+import pickle
+import numpy as np
+
+from navigation.autonomous import (
+    Position,
+    Velocity,
+    NavigationAlgorithms,
+    PathFollower,
+    LoiterController,
+    ObstacleAvoidance,
+    WindEstimator
+)
+
+CURRENT = Position(21.0285, 105.8045, 45.0)
+
+POINTS = [
+    Position(21.0287, 105.8047, 50.0),
+    Position(21.0280, 105.8040, 50.0),
+    Position(21.0300, 105.8100, 50.0),
+    Position(21.0285, 105.8046, 50.0),
+]
+
+
+def test_distance_bearing_batch_match_scalar():
+    """distance_batch / bearing_batch khớp với từng lần gọi distance / bearing"""
+    lats = np.array([p.lat for p in POINTS])
+    lons = np.array([p.lon for p in POINTS])
+
+    distances = NavigationAlgorithms.distance_batch(CURRENT.lat, CURRENT.lon, lats, lons)
+    bearings = NavigationAlgorithms.bearing_batch(CURRENT.lat, CURRENT.lon, lats, lons)
+
+    for p, d, b in zip(POINTS, distances, bearings):
+        assert abs(d - NavigationAlgorithms.distance(CURRENT, p)) < 1e-6
+        assert abs(b - NavigationAlgorithms.bearing(CURRENT, p)) < 1e-6
+
+
+def test_distance_local_close_to_haversine():
+    """Ở khoảng cách < 1 km, equirectangular sai lệch < 1 cm so với haversine"""
+    for p in POINTS:
+        assert abs(NavigationAlgorithms.distance_local(CURRENT, p) -
+                   NavigationAlgorithms.distance(CURRENT, p)) < 0.01
+
+
+def test_cross_and_along_track():
+    """Track hướng bắc, UAV lệch sang đông -> cross-track dương, along-track = quãng đã bay"""
+    start = Position(21.0, 105.0, 50.0)
+    end = Position(21.01, 105.0, 50.0)
+    current = Position(21.005, 105.0001, 50.0)
+
+    xte, atd = NavigationAlgorithms.cross_and_along_track(current, start, end)
+
+    assert abs(xte - NavigationAlgorithms.distance(Position(21.005, 105.0, 50.0), current)) < 0.01
+    assert abs(atd - NavigationAlgorithms.distance(start, Position(21.005, 105.0, 50.0))) < 0.01
+    assert xte == NavigationAlgorithms.cross_track_error(current, start, end)
+    assert atd == NavigationAlgorithms.along_track_distance(current, start, end)
+
+
+def test_path_follower_cache_bounded_and_reaches_waypoints():
+    """Cache heading theo thời gian: sai lệch < 0.6 độ, vẫn chuyển waypoint đúng lúc như khi tắt cache"""
+    waypoints = [Position(21.0300, 105.8060, 50.0), Position(21.0310, 105.8045, 60.0)]
+    cached, exact = PathFollower(), PathFollower(cache_radius=0.0)
+    cached.set_waypoints(waypoints)
+    exact.set_waypoints(waypoints)
+
+    lat, lon = CURRENT.lat, CURRENT.lon
+    velocity = Velocity(10.0, 10.0, 0.0)
+    for _ in range(5000):
+        target = waypoints[min(exact.current_waypoint_index, len(waypoints) - 1)]
+        lat += (target.lat - lat) * 0.002 + 1e-7
+        lon += (target.lon - lon) * 0.002
+        pos = Position(lat, lon, 45.0)
+
+        heading_c, bank_c = cached.calculate_steering(pos, velocity)
+        heading_e, bank_e = exact.calculate_steering(pos, velocity)
+
+        assert cached.current_waypoint_index == exact.current_waypoint_index
+        assert abs(heading_c - heading_e) < 0.6
+        assert abs(bank_c - bank_e) < 0.3
+
+    assert exact.current_waypoint_index == len(waypoints)
+
+
+def test_path_follower_waypoint_assignment_rebuilds_path():
+    """Gán lại waypoints (thêm điểm mới) -> steering/altitude theo điểm mới; list nội bộ không sửa tại chỗ được"""
+    follower = PathFollower()
+    follower.set_waypoints([CURRENT])
+    velocity = Velocity(10.0, 0.0, 0.0)
+    assert follower.calculate_steering(CURRENT, velocity) == (0.0, 0.0)  # đã tới waypoint duy nhất
+
+    follower.waypoints = follower.waypoints + (POINTS[0],)
+    expected = PathFollower()
+    expected.set_waypoints([POINTS[0]])
+
+    assert follower.calculate_steering(CURRENT, velocity) == expected.calculate_steering(CURRENT, velocity)
+    assert follower.calculate_altitude_command(CURRENT) == POINTS[0].alt
+
+    try:
+        follower.waypoints.append(POINTS[1])
+        assert False, "waypoints phải là tuple chỉ đọc"
+    except AttributeError:
+        pass
+
+
+def test_loiter_parameter_changes_match_new_instance():
+    """Đổi center/radius/clockwise sau khi tạo -> cùng kết quả với LoiterController mới"""
+    loiter = LoiterController(POINTS[0], radius=50.0, clockwise=True)
+    loiter.calculate_steering(CURRENT)
+
+    loiter.center = POINTS[1]
+    loiter.radius = 120.0
+    loiter.clockwise = False
+
+    fresh = LoiterController(POINTS[1], radius=120.0, clockwise=False)
+    assert loiter.calculate_steering(CURRENT) == fresh.calculate_steering(CURRENT)
+
+
+def test_avoidance_points_away_from_obstacle():
+    """Vật cản phía bắc trong ngưỡng -> lực đẩy hướng về nam (|góc| lớn bị kẹp ở max)"""
+    avoider = ObstacleAvoidance(obstacle_threshold=30.0, max_avoidance_angle=45.0)
+    obstacle = Position(CURRENT.lat + 0.0001, CURRENT.lon, CURRENT.alt)  # ~11 m về phía bắc
+
+    correction, urgency = avoider.calculate_avoidance_vector(CURRENT, [obstacle])
+
+    assert abs(abs(correction) - 45.0) < 1e-9
+    assert 0.0 < urgency <= 1.0
+
+
+def test_avoidance_ignores_far_obstacles():
+    """Vật cản ngoài ngưỡng không tạo lực"""
+    avoider = ObstacleAvoidance(obstacle_threshold=30.0)
+    assert avoider.calculate_avoidance_vector(CURRENT, [POINTS[2]]) == (0.0, 0.0)
+    assert avoider.calculate_avoidance_vector(CURRENT, []) == (0.0, 0.0)
+
+
+def test_avoidance_sees_in_place_obstacle_replacement():
+    """Cùng list, thay phần tử tại chỗ (vật cản xa -> gần) -> avoider dùng lại vẫn thấy vật cản mới"""
+    avoider = ObstacleAvoidance(obstacle_threshold=30.0, max_avoidance_angle=45.0)
+    obstacles = [POINTS[2]]
+    assert avoider.calculate_avoidance_vector(CURRENT, obstacles) == (0.0, 0.0)
+
+    obstacles[0] = Position(CURRENT.lat + 0.0001, CURRENT.lon, CURRENT.alt)  # ~11 m về phía bắc
+    expected = ObstacleAvoidance(obstacle_threshold=30.0, max_avoidance_angle=45.0) \
+        .calculate_avoidance_vector(CURRENT, obstacles)
+
+    assert expected != (0.0, 0.0)
+    assert avoider.calculate_avoidance_vector(CURRENT, obstacles) == expected
+
+
+def test_avoidance_accepts_soa_arrays():
+    """Truyền obstacles dạng mảng (lats, lons, alts) cho cùng kết quả với List[Position]"""
+    obstacles = [POINTS[0], POINTS[1], POINTS[3]]
+    arrays = (np.array([p.lat for p in obstacles]),
+              np.array([p.lon for p in obstacles]),
+              np.array([p.alt for p in obstacles]))
+
+    expected = ObstacleAvoidance().calculate_avoidance_vector(CURRENT, obstacles)
+    result = ObstacleAvoidance().calculate_avoidance_vector(CURRENT, arrays)
+
+    assert abs(result[0] - expected[0]) < 1e-9
+    assert abs(result[1] - expected[1]) < 1e-12
+
+
+def test_position_velocity_copy_and_pickle():
+    """Position/Velocity frozen + __slots__ vẫn copy, deepcopy và pickle được (giữ các trường dẫn xuất)"""
+    for value in (CURRENT, Velocity(15.0, -3.0, 0.5)):
+        for clone in (copy.copy(value), copy.deepcopy(value), pickle.loads(pickle.dumps(value))):
+            assert clone == value and type(clone) is type(value)
+
+    clone = pickle.loads(pickle.dumps(CURRENT))
+    assert (clone.lat_rad, clone.lon_rad, clone.sin_lat, clone.cos_lat) == \
+        (CURRENT.lat_rad, CURRENT.lon_rad, CURRENT.sin_lat, CURRENT.cos_lat)
+
+
+def test_wind_estimator_moving_average():
+    """Trung bình trượt 10 mẫu: sau khi gió đổi, ước lượng hội tụ đúng về giá trị mới"""
+    estimator = WindEstimator()
+    for _ in range(2500):
+        estimator.update(Velocity(15.0, 3.0, 0.0), airspeed=15.0, heading=0.0)  # gió đông 3 m/s
+    for _ in range(10):
+        estimator.update(Velocity(12.0, 0.0, 0.0), airspeed=15.0, heading=0.0)  # gió bắc -3 m/s
+
+    speed, direction = estimator.get_wind_speed_direction()
+    assert abs(estimator.wind_vx + 3.0) < 1e-9
+    assert abs(estimator.wind_vy) < 1e-9
+    assert abs(speed - 3.0) < 1e-9
+    assert abs(direction - 180.0) < 1e-6
+
+
+def test_wind_estimator_batch_matches_scalar():
+    """update_batch cho cùng kết quả với gọi update() tuần tự"""
+    rng = np.random.default_rng(0)
+    scalar, batch = WindEstimator(), WindEstimator()
+
+    for count in (3, 14, 1, 0, 7):
+        ground = rng.uniform(-20.0, 20.0, (count, 2))
+        airspeed = rng.uniform(10.0, 20.0, count)
+        heading = rng.uniform(0.0, 360.0, count)
+
+        for k in range(count):
+            scalar.update(Velocity(ground[k, 0], ground[k, 1], 0.0), airspeed[k], heading[k])
+        batch.update_batch(ground[:, 0], ground[:, 1], airspeed, heading)
+
+        assert abs(scalar.wind_vx - batch.wind_vx) < 1e-9
+        assert abs(scalar.wind_vy - batch.wind_vy) < 1e-9
+
+
+if __name__ == "__main__":
+    test_distance_bearing_batch_match_scalar()
+    test_distance_local_close_to_haversine()
+    test_cross_and_along_track()
+    test_path_follower_cache_bounded_and_reaches_waypoints()
+    test_path_follower_waypoint_assignment_rebuilds_path()
+    test_loiter_parameter_changes_match_new_instance()
+    test_avoidance_points_away_from_obstacle()
+    test_avoidance_ignores_far_obstacles()
+    test_avoidance_sees_in_place_obstacle_replacement()
+    test_avoidance_accepts_soa_arrays()
+    test_position_velocity_copy_and_pickle()
+    test_wind_estimator_moving_average()
+    test_wind_estimator_batch_matches_scalar()
+    print("✅ All autonomous navigation tests passed")
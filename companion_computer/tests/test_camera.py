@@ -50,7 +50,7 @@ def test_camera_capture(camera):
         
         # Capture frames
         for i in range(5):
-            frame = camera.read_frame()
+            frame, _ = camera.read_frame()
             if frame is not None:
                 print(f"✅ Frame {i+1}: shape={frame.shape}")
             else:
@@ -78,7 +78,7 @@ def test_camera_fps(camera):
         start = time.time()
         frames = 0
         while time.time() - start < 2.0:
-            frame = camera.read_frame()
+            frame, _ = camera.read_frame()
             if frame is not None:
                 frames += 1
         
@@ -0,0 +1,195 @@
+"""
+Test EKF
+Kiểm tra Extended Kalman Filter 15 trạng thái (predict/update)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import math
+import numpy as np
+
+from navigation.ekf_integrated_gps_denial import ExtendedKalmanFilter
+from navigation._ekf_kernels import _compute_jacobian, _propagate_covariance, _quat_to_rot
+from safety.gps_denial_handler import IMUReading, GPSReading
+
+LEVEL_IMU = IMUReading(timestamp=0.0, roll=0.0, pitch=0.0, yaw=0.0,
+                       roll_rate=0.0, pitch_rate=0.0, yaw_rate=0.0,
+                       accel_x=0.0, accel_y=0.0, accel_z=-9.81)
+
+
+def test_predict_level_flight_keeps_velocity():
+    """Bay ngang, IMU chỉ đo trọng lực -> vận tốc giữ nguyên, vị trí tăng đều, P tăng"""
+    ekf = ExtendedKalmanFilter()
+    ekf.state[3:6] = [15.0, 0.0, 0.0]
+    p_trace = np.trace(ekf.P)
+
+    for _ in range(50):
+        ekf.predict(LEVEL_IMU, 0.02)
+
+    assert np.allclose(ekf.state[3:6], [15.0, 0.0, 0.0], atol=1e-9)
+    assert abs(ekf.state[0] - 15.0) < 1e-9
+    assert np.trace(ekf.P) > p_trace
+
+
+def test_silent_propagation_precision():
+    """60 s propagate không có phép đo (50 Hz, 15 m/s) -> vị trí lệch < 1 cm so với lời giải chính xác"""
+    ekf = ExtendedKalmanFilter()
+    ekf.state[3:6] = [15.0, 3.0, 0.0]
+
+    for _ in range(3000):
+        ekf.predict(LEVEL_IMU, 0.02)
+
+    assert ekf.state.dtype == np.float64 and ekf.P.dtype == np.float64
+    assert np.all(np.abs(ekf.state[0:3] - [900.0, 180.0, 0.0]) < 0.01)
+
+
+def test_blocked_covariance_matches_dense():
+    """Propagate covariance theo khối cho cùng kết quả với F P F^T + Q dạng ma trận đầy đủ"""
+    rng = np.random.default_rng(1)
+    A = rng.normal(size=(15, 15))
+    P = A @ A.T
+    Q = np.diag(rng.uniform(0.0, 0.1, 15))
+    dt = 0.02
+
+    F = np.eye(15)
+    _compute_jacobian(F, dt)
+    expected = F @ P @ F.T + Q
+
+    _propagate_covariance(P, dt, Q)
+    assert np.allclose(P, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_predict_yaw_rate_integrates_heading():
+    """Yaw rate 0.5 rad/s trong 1 s -> yaw tăng 0.5 rad, quaternion vẫn chuẩn hóa"""
+    ekf = ExtendedKalmanFilter()
+    imu = IMUReading(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.0, 0.0, -9.81)
+
+    for _ in range(50):
+        ekf.predict(imu, 0.02)
+
+    roll, pitch, yaw = ekf.get_attitude()
+    assert abs(yaw - 0.5) < 1e-9
+    assert abs(roll) < 1e-9 and abs(pitch) < 1e-9
+    assert abs(np.linalg.norm(ekf.state[6:10]) - 1.0) < 1e-12
+
+
+def test_updates_reduce_covariance():
+    """Mỗi lần update GPS/vận tốc kéo state về phía phép đo và giảm covariance tương ứng"""
+    ekf = ExtendedKalmanFilter()
+    gps = GPSReading(0.0, 21.0, 105.0, 50.0, 15.0, 0.0, 12, 0.8, 3)
+
+    ekf.update_gps(gps)
+    assert -50.0 < ekf.state[2] < 0.0
+    assert np.all(np.diag(ekf.P)[0:3] < 0.1)
+
+    ekf.update_velocity(np.array([10.0, 0.0, 0.0]))
+    assert 0.0 < ekf.state[3] < 10.0
+    assert np.all(np.diag(ekf.P)[3:6] < 0.1)
+
+    assert np.allclose(ekf.P, ekf.P.T, atol=1e-12)
+    assert ekf.get_confidence() > 0.99
+
+    ekf._finalize()
+    assert abs(np.linalg.norm(ekf.state[6:10]) - 1.0) < 1e-12
+
+
+def test_cached_status_follows_updates():
+    """get_confidence/get_attitude dùng cache nhưng luôn phản ánh predict/update mới nhất"""
+    ekf = ExtendedKalmanFilter()
+    imu = IMUReading(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.0, 0.0, -9.81)
+
+    before = ekf.get_confidence()
+    assert ekf.get_confidence() == before
+    ekf.predict(imu, 0.02)
+    assert ekf.get_confidence() < before
+    assert abs(ekf.get_attitude()[2] - 0.01) < 1e-12
+
+    ekf.update_gps(GPSReading(0.0, 21.0, 105.0, 50.0, 15.0, 0.0, 12, 0.8, 3))
+    assert ekf.get_confidence() == 1.0 - np.trace(ekf.P[0:3, 0:3]) / 100.0
+
+
+def test_magnetometer_update_matches_dense_ekf():
+    """Update magnetometer (3 update rank-1) khớp với update EKF 3 chiều dạng dày, H = dh/dq sai phân"""
+    rng = np.random.default_rng(2)
+    ekf = ExtendedKalmanFilter()
+    q = rng.normal(size=4)
+    ekf.state[6:10] = q / np.linalg.norm(q)
+    A = rng.normal(size=(15, 15))
+    ekf.P = A @ A.T * 0.01 + np.eye(15) * 0.1
+    mag = np.array([0.3, -0.5, 0.8])
+
+    state, P, m = ekf.state.copy(), ekf.P.copy(), ekf.mag_reference
+
+    def h(x):
+        return _quat_to_rot(x[6:10]).T @ m
+
+    H = np.zeros((3, 15))
+    for i in range(6, 10):
+        dx = np.zeros(15)
+        dx[i] = 1e-6
+        H[:, i] = (h(state + dx) - h(state - dx)) / 2e-6
+
+    K = P @ H.T @ np.linalg.inv(H @ P @ H.T + ekf.R_mag)
+    expected_state = state + K @ (mag / np.linalg.norm(mag) - h(state))
+    expected_state[6:10] /= np.linalg.norm(expected_state[6:10])
+    expected_P = P - K @ H @ P
+
+    ekf.update_magnetometer(mag)
+    ekf._finalize()
+    assert np.allclose(ekf.state, expected_state, atol=1e-7)
+    assert np.allclose(ekf.P, expected_P, atol=1e-7)
+
+
+def test_magnetometer_corrects_heading():
+    """
+    Yaw ước lượng sai 0.3 rad -> sau 2 s với magnetometer 50 Hz, hướng trường dự đoán khớp phép đo
+    (một vector đo không quan sát được phép quay quanh chính nó, nên chỉ yêu cầu sai số yaw giảm mạnh)
+    """
+    ekf = ExtendedKalmanFilter()
+    true_q = np.array([math.cos(0.15), 0.0, 0.0, math.sin(0.15)])
+    field = _quat_to_rot(true_q).T @ ekf.mag_reference
+
+    for _ in range(100):
+        ekf.predict(LEVEL_IMU, 0.02)
+        ekf.update_magnetometer(field * 40.0)  # µT - chỉ hướng trường được dùng
+    ekf._finalize()
+
+    predicted = _quat_to_rot(ekf.state[6:10]).T @ ekf.mag_reference
+    assert np.allclose(predicted, field, atol=1e-6)
+    assert abs(ekf.get_attitude()[2] - 0.3) < 0.1
+
+
+def test_predict_batch_matches_predict():
+    """predict_batch cho nhiều filter cho cùng kết quả với gọi predict() từng filter"""
+    rng = np.random.default_rng(0)
+    filters = [ExtendedKalmanFilter() for _ in range(4)]
+    states = np.stack([ekf.state for ekf in filters])
+    covariances = np.stack([ekf.P for ekf in filters])
+
+    for _ in range(5):
+        imu = rng.normal(0.0, 0.5, (4, 10))
+        imu[:, 9] -= 9.81
+        dts = rng.uniform(0.01, 0.05, 4)
+
+        for ekf, row, dt in zip(filters, imu, dts):
+            ekf.predict(IMUReading(*row), dt)
+        ExtendedKalmanFilter.predict_batch(states, covariances, imu, dts, filters[0].Q)
+
+    for ekf, state, P in zip(filters, states, covariances):
+        assert np.allclose(state, ekf.state, rtol=0.0, atol=1e-12)
+        assert np.allclose(P, ekf.P, rtol=0.0, atol=1e-12)
+
+
+if __name__ == "__main__":
+    test_predict_level_flight_keeps_velocity()
+    test_silent_propagation_precision()
+    test_blocked_covariance_matches_dense()
+    test_predict_yaw_rate_integrates_heading()
+    test_updates_reduce_covariance()
+    test_cached_status_follows_updates()
+    test_magnetometer_update_matches_dense_ekf()
+    test_magnetometer_corrects_heading()
+    test_predict_batch_matches_predict()
+    print("✅ All EKF tests passed")
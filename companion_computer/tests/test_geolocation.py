@@ -0,0 +1,200 @@
+"""
+Test Geolocation
+Kiểm tra tính toán vị trí GPS của mục tiêu từ bounding box + telemetry
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import math
+import numpy as np
+
+from navigation.geolocation import (
+    calculate_target_geolocation,
+    calculate_target_geolocations,
+    get_target_geolocation,
+    get_target_geolocations_for_frame,
+    geolocate_bbox,
+    geolocate_bboxes,
+    geolocate_bbox_series
+)
+
+IMAGE_WIDTH = 640
+IMAGE_HEIGHT = 480
+
+TELEMETRY = {
+    'lat': 10.762622,
+    'lon': 106.660172,
+    'alt': 100.0,
+    'roll': 5.0,
+    'pitch': -3.0,
+    'yaw': 45.0,
+}
+
+BBOXES = [
+    (300, 200, 340, 240),
+    (0, 0, 40, 40),
+    (600, 440, 640, 480),
+    (100, 300, 180, 380),
+]
+
+
+def test_center_target_ahead_of_uav():
+    """Camera chúi -20 độ, UAV bay ngang hướng bắc -> mục tiêu ở tâm ảnh nằm phía bắc"""
+    telemetry = dict(TELEMETRY, roll=0.0, pitch=0.0, yaw=0.0)
+    bbox = (IMAGE_WIDTH / 2 - 10, IMAGE_HEIGHT / 2 - 10, IMAGE_WIDTH / 2 + 10, IMAGE_HEIGHT / 2 + 10)
+    result = calculate_target_geolocation(bbox, telemetry, IMAGE_WIDTH, IMAGE_HEIGHT)
+
+    assert result is not None
+    # Khoảng cách mặt đất = h / tan(20°)
+    expected_north_m = telemetry['alt'] / math.tan(math.radians(20.0))
+    north_m = math.radians(result['lat'] - telemetry['lat']) * 6378137.0
+    assert abs(north_m - expected_north_m) < 1e-6
+    assert abs(result['lon'] - telemetry['lon']) < 1e-12
+
+
+def test_ray_above_horizon_returns_none():
+    """Tia hướng lên trời không cắt mặt đất"""
+    telemetry = dict(TELEMETRY, roll=0.0, pitch=45.0)
+    result = calculate_target_geolocation((300, 0, 340, 10), telemetry, IMAGE_WIDTH, IMAGE_HEIGHT)
+    assert result is None
+
+
+def test_missing_telemetry_returns_none():
+    """Thiếu lat/lon/alt -> None"""
+    telemetry = dict(TELEMETRY, alt=None)
+    assert calculate_target_geolocation(BBOXES[0], telemetry, IMAGE_WIDTH, IMAGE_HEIGHT) is None
+
+
+def test_invalid_image_size_or_telemetry_type_returns_none():
+    """Ảnh 0 pixel hoặc telemetry không phải số -> None (không ZeroDivisionError/TypeError)"""
+    assert calculate_target_geolocation(BBOXES[0], TELEMETRY, 0, IMAGE_HEIGHT) is None
+    assert calculate_target_geolocation(BBOXES[0], TELEMETRY, IMAGE_WIDTH, -1) is None
+    assert geolocate_bbox(BBOXES[0], 10.0, 106.0, 100.0, 0.0, 0.0, 0.0, IMAGE_WIDTH, 0) is None
+
+    for key in ('lat', 'lon', 'alt', 'roll', 'pitch', 'yaw'):
+        telemetry = dict(TELEMETRY, **{key: '12.5'})
+        assert calculate_target_geolocation(BBOXES[0], telemetry, IMAGE_WIDTH, IMAGE_HEIGHT) is None
+        assert get_target_geolocations_for_frame(
+            [{'bbox': BBOXES[0]}], telemetry, IMAGE_WIDTH, IMAGE_HEIGHT) == [None]
+
+    # Kiểu số NumPy vẫn hợp lệ
+    telemetry = {key: np.float32(value) for key, value in TELEMETRY.items()}
+    assert calculate_target_geolocation(BBOXES[0], telemetry, IMAGE_WIDTH, IMAGE_HEIGHT) is not None
+
+
+def test_batch_matches_single():
+    """calculate_target_geolocations cho cùng kết quả với từng lần gọi đơn lẻ"""
+    batch = calculate_target_geolocations(BBOXES, TELEMETRY, IMAGE_WIDTH, IMAGE_HEIGHT)
+    assert batch.shape == (len(BBOXES), 2)
+
+    for bbox, row in zip(BBOXES, batch):
+        single = calculate_target_geolocation(bbox, TELEMETRY, IMAGE_WIDTH, IMAGE_HEIGHT)
+        if single is None:
+            assert np.isnan(row).all()
+        else:
+            assert abs(row[0] - single['lat']) < 1e-9
+            assert abs(row[1] - single['lon']) < 1e-9
+
+
+def test_scalar_batch_core_matches_single():
+    """geolocate_bboxes (telemetry scalar, N=64 bbox) khớp với geolocate_bbox từng bbox"""
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, [IMAGE_WIDTH, IMAGE_HEIGHT], (64, 2))
+    bboxes = np.hstack([corners, corners + 20.0])
+    args = (TELEMETRY['lat'], TELEMETRY['lon'], TELEMETRY['alt'],
+            TELEMETRY['roll'], TELEMETRY['pitch'], TELEMETRY['yaw'], IMAGE_WIDTH, IMAGE_HEIGHT)
+
+    batch = geolocate_bboxes(bboxes, *args)
+
+    for bbox, row in zip(bboxes, batch):
+        single = geolocate_bbox(bbox, *args)
+        assert single is not None
+        assert abs(row[0] - single['lat']) < 1e-9
+        assert abs(row[1] - single['lon']) < 1e-9
+
+
+def test_frame_matches_single_detection():
+    """get_target_geolocations_for_frame khớp get_target_geolocation từng detection (kể cả None)"""
+    telemetry = dict(TELEMETRY, pitch=18.0)
+    detections = [{'bbox': bbox} for bbox in BBOXES] + [{'bbox': (300, 0, 340, 10)}, {'score': 0.9}]
+
+    results = get_target_geolocations_for_frame(detections, telemetry, IMAGE_WIDTH, IMAGE_HEIGHT)
+    assert len(results) == len(detections)
+    assert results[-1] is None
+
+    for det, result in zip(detections[:-1], results):
+        single = get_target_geolocation(det, telemetry, IMAGE_WIDTH, IMAGE_HEIGHT)
+        if single is None:
+            assert result is None
+        else:
+            assert abs(result['lat'] - single['lat']) < 1e-9
+            assert abs(result['lon'] - single['lon']) < 1e-9
+    assert any(r is None for r in results[:-1]) and any(r is not None for r in results)
+
+
+def test_series_matches_single_per_row_telemetry():
+    """geolocate_bbox_series (mỗi hàng một telemetry) khớp geolocate_bbox từng hàng, NaN khi trượt"""
+    rng = np.random.default_rng(1)
+    n = 50
+    corners = rng.uniform(0, [IMAGE_WIDTH, IMAGE_HEIGHT], (n, 2))
+    bboxes = np.hstack([corners, corners + 20.0])
+    lats = rng.uniform(-60.0, 60.0, n)
+    lons = rng.uniform(-180.0, 180.0, n)
+    alts = rng.uniform(20.0, 300.0, n)
+    rolls, pitches = rng.uniform(-30.0, 30.0, (2, n))
+    yaws = rng.uniform(-180.0, 180.0, n)
+
+    series = geolocate_bbox_series(bboxes, lats, lons, alts, rolls, pitches, yaws,
+                                   IMAGE_WIDTH, IMAGE_HEIGHT)
+
+    for k in range(n):
+        single = geolocate_bbox(bboxes[k], lats[k], lons[k], alts[k], rolls[k], pitches[k], yaws[k],
+                                IMAGE_WIDTH, IMAGE_HEIGHT)
+        if single is None:
+            assert np.isnan(series[k]).all()
+        else:
+            # sin/cos attitude float32 -> sai số tương đối ~1e-7 theo khoảng cách tới mục tiêu
+            tol = 1e-9 + 1e-6 * (abs(single['lat'] - lats[k]) + abs(single['lon'] - lons[k]))
+            assert abs(series[k, 0] - single['lat']) < tol
+            assert abs(series[k, 1] - single['lon']) < tol
+
+
+def test_near_level_scalar_matches_batch():
+    """Roll/pitch rất nhỏ (~1e-3 rad): geolocate_bbox và geolocate_bboxes khớp tới mm, ở mọi độ cao"""
+    corners = np.array([[100.0, 200.0], [300.0, 220.0], [600.0, 460.0], [310.0, 230.0]])
+    bboxes = np.hstack([corners, corners + 20.0])
+
+    # độ; 0.0572° ~ 0.9983e-3 rad và 0.0573° ~ 1.0001e-3 rad (hai phía của ngưỡng 1e-3 rad cũ)
+    for alt in (100.0, 300.0, 500.0):
+        args = (TELEMETRY['lat'], TELEMETRY['lon'], alt)
+        for roll, pitch in ((0.0, 0.0), (0.0572, -0.0572), (0.0573, 0.0573)):
+            batch = geolocate_bboxes(bboxes, *args, roll, pitch, 37.0, IMAGE_WIDTH, IMAGE_HEIGHT)
+            for bbox, row in zip(bboxes, batch):
+                single = geolocate_bbox(bbox, *args, roll, pitch, 37.0, IMAGE_WIDTH, IMAGE_HEIGHT)
+                assert abs(row[0] - single['lat']) < 1e-8  # 1e-8° ~ 1 mm
+                assert abs(row[1] - single['lon']) < 1e-8
+
+
+def test_batch_marks_sky_rays_nan():
+    """Trong batch, tia không cắt mặt đất trả về NaN, các tia khác vẫn hợp lệ"""
+    telemetry = dict(TELEMETRY, roll=0.0, pitch=18.0, yaw=0.0)
+    batch = calculate_target_geolocations(
+        [(300, 0, 340, 10), (300, 470, 340, 480)], telemetry, IMAGE_WIDTH, IMAGE_HEIGHT)
+    assert np.isnan(batch[0]).all()
+    assert not np.isnan(batch[1]).any()
+
+
+if __name__ == "__main__":
+    test_center_target_ahead_of_uav()
+    test_ray_above_horizon_returns_none()
+    test_missing_telemetry_returns_none()
+    test_invalid_image_size_or_telemetry_type_returns_none()
+    test_batch_matches_single()
+    test_scalar_batch_core_matches_single()
+    test_frame_matches_single_detection()
+    test_series_matches_single_per_row_telemetry()
+    test_near_level_scalar_matches_batch()
+    test_batch_marks_sky_rays_nan()
+    print("✅ All geolocation tests passed")
@@ -0,0 +1,61 @@
+"""
+Test GPS Denial Handler
+Kiểm tra khoảng cách vector hóa và tổng hợp denial event sau bay
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from safety.gps_denial_handler import (
+    DeadReckoningNavigator,
+    GPSDenialEvent,
+    GPSState,
+    EscapeAction,
+    summarize_denial_events
+)
+
+
+def test_haversine_batch_matches_scalar():
+    """_haversine_batch khớp với từng lần gọi _haversine"""
+    rng = np.random.default_rng(0)
+    lats1, lats2 = rng.uniform(-60.0, 60.0, (2, 50))
+    lons1, lons2 = rng.uniform(-180.0, 180.0, (2, 50))
+
+    distances = DeadReckoningNavigator._haversine_batch(lats1, lons1, lats2, lons2)
+
+    for k in range(50):
+        expected = DeadReckoningNavigator._haversine(lats1[k], lons1[k], lats2[k], lons2[k])
+        assert abs(distances[k] - expected) < 1e-6
+
+
+def test_summarize_denial_events():
+    """Tổng hợp: chỉ event đã phục hồi có khoảng cách; event đang diễn ra không tính thời lượng"""
+    def event(start, end, start_pos, end_pos, error):
+        return GPSDenialEvent(start, end, start_pos, GPSState.CONFIRMED_JAM,
+                              EscapeAction.CLIMB_AND_REVERSE, error, end_pos is not None, end_pos)
+
+    events = [
+        event(0.0, 30.0, (21.0, 105.0, 50.0), (21.001, 105.0, 60.0), 12.0),
+        event(100.0, 110.0, (21.0, 105.0, 50.0), (21.0, 105.0, 50.0), 3.0),
+        event(200.0, None, (21.0, 105.0, 50.0), None, 40.0),
+    ]
+
+    summary = summarize_denial_events(events)
+
+    d = DeadReckoningNavigator._haversine(21.0, 105.0, 21.001, 105.0)
+    assert summary["total_events"] == 3
+    assert summary["recovered_events"] == 2
+    assert summary["total_duration"] == 40.0
+    assert summary["max_dr_error"] == 40.0
+    assert abs(summary["max_displacement"] - d) < 1e-6
+    assert abs(summary["mean_displacement"] - d / 2) < 1e-6
+    assert summarize_denial_events([])["max_displacement"] == 0.0
+
+
+if __name__ == "__main__":
+    test_haversine_batch_matches_scalar()
+    test_summarize_denial_events()
+    print("✅ All GPS denial handler tests passed")
@@ -0,0 +1,287 @@
+"""
+Test Hybrid GPS Denial System
+Kiểm tra bộ so sánh QKF/EKF, ML tuner và cảm biến airspeed (chế độ simulation)
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from navigation.hybrid_gps_denial_system import (
+    QuantumFilterComparator,
+    MS4525DOAirspeedSensor,
+    MLAdaptiveTuner,
+    HybridGPSDenialSystem,
+    AirspeedReading,
+    ComputeLocation
+)
+from navigation._ml_kernels import _standardize_samples
+from safety.gps_denial_handler import IMUReading, GPSReading
+
+
+class FakeI2CBus:
+    """Bus I2C giả: luôn trả về cùng một burst 4 byte, đếm số transaction"""
+    def __init__(self, data):
+        self.data = list(data)
+        self.transactions = 0
+
+    def read_i2c_block_data(self, address, register, length):
+        self.transactions += 1
+        return self.data[:length]
+
+
+class OffsetFilter:
+    """QKF giả: ước lượng = phép đo + offset cố định"""
+    def __init__(self, offset):
+        self.offset = np.asarray(offset, dtype=np.float64)
+
+    def update(self, measurement):
+        return measurement + self.offset
+
+
+def make_comparator(offset=(3.0, 4.0, 0.0)):
+    comparator = QuantumFilterComparator()
+    comparator.qkf = OffsetFilter(offset)
+    comparator.qkf_available = True
+    return comparator
+
+
+def test_comparator_ring_buffer_keeps_latest_samples():
+    """Ring buffer SoA giữ HISTORY_SIZE mẫu mới nhất, mẫu không có ground truth là NaN"""
+    comparator = make_comparator()
+    n = comparator.HISTORY_SIZE + 10
+
+    for k in range(n):
+        truth = np.array([k, 0.0, 0.0]) if k % 2 == 0 else None
+        comparator.compare_update(np.array([k, 0.0, 0.0]), np.array([k, 1.0, 0.0]), truth)
+        comparator.flush()
+
+    assert comparator.sample_count == n
+    # Mẫu mới nhất (k = n - 1) nằm ở hàng (n - 1) % HISTORY_SIZE
+    last = (n - 1) % comparator.HISTORY_SIZE
+    assert np.array_equal(comparator.ekf_states[last], [n - 1, 1.0, 0.0])
+    assert np.array_equal(comparator.qkf_states[last], [n + 2, 4.0, 0.0])
+    assert np.isnan(comparator.gt_states[last]).all()  # n - 1 lẻ -> không có ground truth
+    assert np.array_equal(comparator.gt_states[last - 1], [n - 2, 0.0, 0.0])
+    comparator.stop()
+
+
+def test_comparison_stats_only_use_ground_truth_samples():
+    """Thống kê sai số chỉ tính trên mẫu có ground truth: EKF lệch 1 m, QKF lệch 5 m"""
+    comparator = make_comparator()
+    assert comparator.get_comparison_stats() == {"status": "No data"}
+
+    for k in range(20):
+        truth = np.array([k, 0.0, 0.0]) if k < 15 else None
+        comparator.compare_update(np.array([k, 0.0, 0.0]), np.array([k, 1.0, 0.0]), truth)
+    comparator.flush()
+
+    stats = comparator.get_comparison_stats()
+    assert stats["samples"] == 15
+    assert abs(stats["ekf_mean_error"] - 1.0) < 1e-12 and stats["ekf_std_error"] < 1e-12
+    assert abs(stats["qkf_mean_error"] - 5.0) < 1e-12
+    assert abs(stats["qkf_improvement"] + 400.0) < 1e-9
+    assert 0.0 <= stats["qkf_mean_time_ms"] < 100.0
+    assert comparator.qkf_times.dtype == np.float32 and comparator.qkf_times.shape == (comparator.HISTORY_SIZE,)
+    comparator.stop()
+
+
+def test_compare_update_runs_qkf_off_caller_thread():
+    """compare_update chỉ enqueue: QKF chậm chạy trên worker, các mảng đầu vào được copy khi enqueue"""
+    class SlowFilter(OffsetFilter):
+        def update(self, measurement):
+            time.sleep(0.05)
+            return super().update(measurement)
+
+    comparator = make_comparator()
+    comparator.qkf = SlowFilter((0.0, 0.0, 0.0))
+    assert comparator._worker_thread is None  # worker chỉ khởi động ở mẫu đầu tiên
+    state = np.array([1.0, 2.0, 3.0, 9.0])
+
+    start = time.perf_counter()
+    comparator.compare_update(state[:3], state[:3], state[:3])
+    assert time.perf_counter() - start < 0.04
+    state[:3] = 0.0  # EKF cập nhật state sau khi enqueue
+
+    comparator.flush()
+    assert comparator.sample_count == 1
+    assert np.array_equal(comparator.ekf_states[0], [1.0, 2.0, 3.0])
+    assert np.array_equal(comparator.qkf_states[0], [1.0, 2.0, 3.0])
+    assert np.array_equal(comparator.gt_states[0], [1.0, 2.0, 3.0])
+
+    worker = comparator._worker_thread
+    comparator.stop()
+    assert not worker.is_alive() and comparator._worker_thread is None
+
+
+def test_comparator_without_qkf_starts_no_thread():
+    """Không có QKF -> compare_update bỏ qua mẫu và không tạo worker thread"""
+    comparator = QuantumFilterComparator()
+    comparator.qkf_available = False
+    comparator.compare_update(np.zeros(3), np.zeros(3), np.zeros(3))
+    assert comparator._worker_thread is None and comparator.sample_count == 0
+    comparator.stop()
+
+
+def test_airspeed_read_single_transaction():
+    """read() lấy áp suất và nhiệt độ từ cùng một burst 4 byte (một transaction I2C)"""
+    # pressure_raw = 0x2100 = 8448 -> (256 / 8192) PSI; temp_raw = 0x6660 >> 5 = 819
+    bus = FakeI2CBus([0x21, 0x00, 0x66, 0x60])
+    sensor = MS4525DOAirspeedSensor(bus)
+
+    reading = sensor.read()
+    assert bus.transactions == 1
+    pressure_pa = 256 / 8192.0 * MS4525DOAirspeedSensor.PSI_TO_PA
+    assert abs(reading.differential_pressure - pressure_pa) < 1e-9
+    assert abs(reading.temperature - (819 * 200.0 / 2047.0 - 50.0)) < 1e-9
+    assert abs(reading.airspeed - (2.0 * pressure_pa / sensor.air_density) ** 0.5) < 1e-6
+
+    # Mật độ không khí thay đổi -> airspeed dùng hệ số mới
+    sensor.update_air_density(35.0, 1500.0)
+    assert abs(sensor.read().airspeed - (2.0 * pressure_pa / sensor.air_density) ** 0.5) < 1e-6
+
+    bus.data[0] |= 0x80  # status != 0 -> stale
+    assert sensor.read() is None
+
+
+def test_airspeed_calibration_batch_decode():
+    """calibrate() giải mã cả batch burst I2C; toàn mẫu stale -> hiệu chỉnh thất bại"""
+    bus = FakeI2CBus([0x21, 0x00, 0x66, 0x60])
+    sensor = MS4525DOAirspeedSensor(bus)
+
+    assert sensor.calibrate(samples=5)
+    assert bus.transactions == 5 and len(sensor.calibration_samples) == 5
+    assert abs(sensor.calibration_offset - 256 / 8192.0 * MS4525DOAirspeedSensor.PSI_TO_PA) < 1e-9
+
+    # Áp suất âm (pressure_raw < 8192) không bị tràn số
+    bus.data[0] = 0x1F
+    pressures = sensor._read_raw_pressure_batch(2, period=0.0)
+    assert np.allclose(pressures, (0x1F00 - 8192) / 8192.0 * MS4525DOAirspeedSensor.PSI_TO_PA)
+
+    bus.data[0] |= 0x80  # status != 0 -> stale
+    assert not sensor.calibrate(samples=5)
+    assert len(sensor.calibration_samples) == 0
+
+
+def test_airspeed_polling_serves_cached_reading():
+    """Khi polling: read() trả mẫu cache của poller; calibrate tạm dừng poller; stop -> đọc trực tiếp"""
+    bus = FakeI2CBus([0x21, 0x00, 0x66, 0x60])
+    sensor = MS4525DOAirspeedSensor(bus)
+    sensor.start_polling(rate_hz=200.0)
+    time.sleep(0.05)
+
+    reading = sensor.read()
+    assert reading is not None and bus.transactions > 0
+    assert abs(reading.differential_pressure - 256 / 8192.0 * MS4525DOAirspeedSensor.PSI_TO_PA) < 1e-9
+
+    # Calibrate giữ bus trong lúc poller chạy; sau đó mẫu cache dùng offset mới
+    assert sensor.calibrate(samples=5)
+    time.sleep(0.05)
+    assert abs(sensor.read().differential_pressure) < 1e-9
+
+    sensor.stop_polling()
+    before = bus.transactions
+    time.sleep(0.03)
+    assert bus.transactions == before
+    sensor.read()
+    assert bus.transactions == before + 1
+
+
+def test_system_start_stop_owns_background_threads():
+    """Constructor không tạo thread; start() bật airspeed polling, stop() dừng tất cả"""
+    system = HybridGPSDenialSystem(object(), enable_quantum=True, enable_ml=False)
+    assert system.airspeed_sensor._poll_thread is None
+
+    system.start(airspeed_poll_hz=200.0)
+    poller = system.airspeed_sensor._poll_thread
+    assert poller.is_alive()
+
+    system.stop()
+    assert not poller.is_alive() and system.airspeed_sensor._poll_thread is None
+
+
+def test_ml_samples_stored_as_soa_rows():
+    """collect_sample ghi một hàng feature float32 + target; buffer đầy thì ghi đè mẫu cũ nhất"""
+    tuner = MLAdaptiveTuner(ComputeLocation.EDGE)
+    tuner.max_training_samples = 8  # buffer nhỏ để kiểm tra ghi đè
+    tuner._features = tuner._features[:8]
+    tuner._targets = tuner._targets[:8]
+    gps = GPSReading(0.0, 21.0, 105.0, 50.0, 15.0, 0.0, 12, 0.8, 3)
+
+    for k in range(11):
+        imu = IMUReading(0.0, 0.0, 0.0, 0.0, 0.1, 0.2, 0.3, k, 2.0, -9.8)
+        airspeed = AirspeedReading(0.0, 100.0, 25.0, 12.5, True) if k % 2 else None
+        tuner.collect_sample(imu, gps if k < 5 else None, airspeed, None, float(k), {})
+
+    assert tuner.n_samples == 8 and tuner.sample_count == 11
+    features, targets = tuner._recent_samples(3)
+    assert features.dtype == np.float32 and features.shape == (3, 8)
+    assert np.array_equal(targets, [8.0, 9.0, 10.0])
+    assert np.allclose(features[:, 0], [8.0, 9.0, 10.0])
+    assert np.allclose(features[1], [9.0, 2.0, -9.8, 0.1, 0.2, 0.3, 0.0, 12.5])
+    assert features[0, 7] == 15.0  # không có airspeed -> 15 m/s
+
+
+def test_predict_uses_cached_ridge_coefficients():
+    """predict_optimal_params = (x - mean) / scale . w + b với hệ số cache, không gọi sklearn"""
+    tuner = MLAdaptiveTuner(ComputeLocation.EDGE)
+    base = dict(tuner.current_params)
+    assert tuner.predict_optimal_params({}) == base  # chưa train
+
+    tuner.is_trained = True
+    tuner._scaler_mean = np.zeros(8, dtype=np.float32)
+    tuner._scaler_scale = np.full(8, 2.0, dtype=np.float32)
+    tuner._w = np.array([1, 0, 0, 0, 0, 0, 0, 1], dtype=np.float32)
+    tuner._b = 1.0
+
+    # (4 / 2) + (15 / 2) + 1 = 10.5 -> sai số dự đoán cao
+    high = tuner.predict_optimal_params({'accel_x': 4.0, 'airspeed': 15.0})
+    assert abs(high['process_noise'] - base['process_noise'] * 1.2) < 1e-12
+
+    # (-4 / 2) + (2 / 2) + 1 = 0 -> sai số dự đoán thấp; buffer được ghi đè hoàn toàn mỗi lần gọi
+    low = tuner.predict_optimal_params({'accel_x': -4.0, 'airspeed': 2.0})
+    assert abs(low['process_noise'] - base['process_noise'] * 0.9) < 1e-12
+    assert tuner.current_params == base
+
+
+def test_standardize_samples_matches_standard_scaler():
+    """Kernel chuẩn hóa: bỏ hàng target NaN, mean/std quần thể như StandardScaler, cột hằng -> scale 1"""
+    rng = np.random.default_rng(3)
+    features = rng.normal(5.0, 2.0, (200, 8)).astype(np.float32)
+    features[:, 6] = 1.0  # gps_valid hằng
+    targets = rng.uniform(0.0, 20.0, 200).astype(np.float32)
+    targets[::7] = np.nan
+
+    X, y, mean, scale = _standardize_samples(features, targets)
+
+    keep = ~np.isnan(targets)
+    ref = features[keep].astype(np.float64)
+    expected_scale = ref.std(axis=0)
+    expected_scale[6] = 1.0
+    assert X.dtype == np.float32 and X.flags.c_contiguous  # Ridge.fit nhận thẳng, không copy lại
+    assert y.dtype == np.float32 and y.flags.c_contiguous
+    assert np.array_equal(y, targets[keep])
+    assert np.allclose(mean, ref.mean(axis=0), rtol=1e-12)
+    assert np.allclose(scale, expected_scale, rtol=1e-9)
+    assert np.allclose(X, (ref - ref.mean(axis=0)) / expected_scale, atol=1e-5)
+
+    X, y, _, _ = _standardize_samples(features[:0], targets[:0])
+    assert X.shape == (0, 8) and y.shape == (0,)
+
+
+if __name__ == "__main__":
+    test_comparator_ring_buffer_keeps_latest_samples()
+    test_comparison_stats_only_use_ground_truth_samples()
+    test_compare_update_runs_qkf_off_caller_thread()
+    test_comparator_without_qkf_starts_no_thread()
+    test_airspeed_read_single_transaction()
+    test_airspeed_calibration_batch_decode()
+    test_airspeed_polling_serves_cached_reading()
+    test_system_start_stop_owns_background_threads()
+    test_ml_samples_stored_as_soa_rows()
+    test_predict_uses_cached_ridge_coefficients()
+    test_standardize_samples_matches_standard_scaler()
+    print("✅ All hybrid GPS denial system tests passed")
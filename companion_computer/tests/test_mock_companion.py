@@ -26,7 +26,7 @@ def test_camera_mock():
         logger.success("Camera started")
         
         for i in range(10):
-            frame = camera.read_frame()
+            frame, _ = camera.read_frame()
             if frame is not None:
                 logger.info(f"Frame {i+1}: {frame.shape}")
             else:
@@ -28,7 +28,7 @@ try:
         
         # Read a few frames
         for i in range(3):
-            frame = camera.read_frame()
+            frame, _ = camera.read_frame()
             if frame is not None:
                 print(f"   ✅ Frame {i+1} captured: {frame.shape}")
             else:
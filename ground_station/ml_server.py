@@ -22,6 +22,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
+import zlib
 import numpy as np
 
 # Flask for REST API
@@ -53,6 +54,13 @@ try:
 except ImportError:
     PYTORCH_AVAILABLE = False
 
+# Optional: msgpack for binary training uploads (falls back to JSON)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 
 # ==============================================================================
 # Configuration
@@ -127,6 +135,40 @@ class FlightDataStore:
         print(f"📥 Received {len(samples)} samples from UAV {uav_id}")
         return len(samples)
     
+    # Decompressed size limit for binary uploads (10000 samples x 9 float32 is ~360 KB)
+    MAX_PACKED_BYTES = 16 * 1024 * 1024
+    
+    @classmethod
+    def decode_packed_samples(cls, body: bytes) -> Dict:
+        """
+        Decode a msgpack+gzip upload (raw float32 feature/target buffers)
+        into the same dict format as JSON uploads
+        
+        Raises ValueError if the body decompresses beyond MAX_PACKED_BYTES or is truncated
+        """
+        # Bounded gunzip (no gzip.decompress: a small body could expand without limit)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        raw = decompressor.decompress(body, cls.MAX_PACKED_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Packed upload exceeds {cls.MAX_PACKED_BYTES} bytes")
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip upload")
+        
+        data = msgpack.unpackb(raw)
+        features = np.frombuffer(data['features'], dtype=np.float32).reshape(data['shape'])
+        targets = np.frombuffer(data['targets'], dtype=np.float32)
+        
+        data['training_data'] = [
+            {
+                'imu': {'accel': f[0:3], 'gyro': f[3:6]},
+                'gps_valid': f[6] > 0.5,
+                'airspeed': f[7],
+                'dr_error': None if t != t else t  # NaN -> no target
+            }
+            for f, t in zip(features.tolist(), targets.tolist())
+        ]
+        return data
+    
     def get_training_data(self) -> tuple:
         """Get data ready for training"""
         if len(self.buffer) < 50:
@@ -416,8 +458,16 @@ def create_app(config: ServerConfig) -> Flask:
     def train_model():
         """Train model with uploaded data"""
         try:
-            # Also accept inline data
-            data = request.json or {}
+            # Also accept inline data (JSON or msgpack+gzip)
+            if request.mimetype == 'application/x-msgpack+gzip':
+                if not MSGPACK_AVAILABLE:
+                    return jsonify({"error": "msgpack not installed"}), 415
+                try:
+                    data = data_store.decode_packed_samples(request.get_data())
+                except (ValueError, zlib.error) as e:
+                    return jsonify({"error": f"Invalid packed upload: {e}"}), 400
+            else:
+                data = request.json or {}
             if 'training_data' in data:
                 samples = data['training_data']
                 data_store.add_samples(samples, data.get('uav_id', 'api'))